@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Индикатор уровня звука для Meeting Bot
+Считает RMS/пик по коротким окнам потока PCM и замечает цифровую тишину во время записи
+"""
+
+import math
+import time
+import threading
+from typing import Any, Dict
+
+import numpy as np
+
+# Ниже этого уровня окно считается тишиной (-60 dBFS ~ шум выключенного устройства)
+SILENCE_DBFS = -60.0
+
+
+def to_dbfs(value: float) -> float:
+    """Амплитуда (0..1) в dBFS"""
+    return 20 * math.log10(value) if value > 1e-10 else -200.0
+
+
+class AudioLevelMeter:
+    """Уровень звука по окнам потока float32 PCM (f32le)"""
+
+    def __init__(self, sample_rate: int = 8000, window_sec: float = 0.5,
+                 silence_dbfs: float = SILENCE_DBFS):
+        self.sample_rate = sample_rate
+        self.window = max(1, int(sample_rate * window_sec))
+        self.silence_dbfs = silence_dbfs
+        self.rms_dbfs = -200.0
+        self.peak_dbfs = -200.0
+        self.max_peak_dbfs = -200.0
+        self.samples = 0
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._remainder = b''
+        self._sound_at = time.monotonic()  # Последнее окно громче порога тишины
+        self._lock = threading.Lock()
+
+    def feed(self, data: bytes):
+        """Добавить байты f32le из пайпа ffmpeg"""
+        data = self._remainder + data
+        usable = len(data) - len(data) % 4
+        self._remainder = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=np.float32)
+        with self._lock:
+            self.samples += len(samples)
+            pending = np.concatenate((self._pending, samples)) if len(self._pending) else samples
+            windows = len(pending) // self.window
+            if windows:
+                frames = pending[:windows * self.window].reshape(windows, self.window)
+                rms = np.sqrt(np.square(frames, dtype=np.float64).mean(axis=1))
+                peak = np.abs(frames).max(axis=1)
+                self.rms_dbfs = to_dbfs(float(rms[-1]))
+                self.peak_dbfs = to_dbfs(float(peak[-1]))
+                loudest = to_dbfs(float(peak.max()))
+                self.max_peak_dbfs = max(self.max_peak_dbfs, loudest)
+                if loudest > self.silence_dbfs:
+                    self._sound_at = time.monotonic()
+            self._pending = pending[windows * self.window:].copy()
+
+    def silent_for(self) -> float:
+        """Сколько секунд подряд в потоке только тишина"""
+        return time.monotonic() - self._sound_at
+
+    def reset(self):
+        """Начать отсчет тишины заново (например, после смены источника)"""
+        with self._lock:
+            self._sound_at = time.monotonic()
+
+    def level(self) -> Dict[str, Any]:
+        return {
+            'rms_dbfs': self.rms_dbfs,
+            'peak_dbfs': self.peak_dbfs,
+            'max_peak_dbfs': self.max_peak_dbfs,
+            'silent_sec': self.silent_for(),
+        }
+
+    def describe(self) -> str:
+        """Текущий уровень для информации о встрече"""
+        if not self.samples:
+            return "🔇 Уровень звука: нет данных"
+        # Шкала из 10 делений от -60 до 0 dBFS
+        filled = min(10, max(0, int((self.rms_dbfs - SILENCE_DBFS) / 6)))
+        bar = '█' * filled + '░' * (10 - filled)
+        text = f"🔊 Уровень звука: {bar} {self.rms_dbfs:.0f} dBFS (пик {self.peak_dbfs:.0f})"
+        silent = self.silent_for()
+        if silent >= 10:
+            text += f", тишина {silent:.0f} с"
+        return text
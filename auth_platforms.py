@@ -63,14 +63,15 @@ class PlatformAuth:
         """Сохранить sessionStorage и localStorage"""
         try:
             # Получаем sessionStorage
-            session_storage = driver.execute_script("return window.sessionStorage;")
+            session_storage = driver.execute_script("return Object.assign({}, window.sessionStorage);")
             
             # Получаем localStorage
-            local_storage = driver.execute_script("return window.localStorage;")
+            local_storage = driver.execute_script("return Object.assign({}, window.localStorage);")
             
             storage_data = {
                 "sessionStorage": session_storage,
                 "localStorage": local_storage,
+                "origin": driver.execute_script("return location.origin;"),
                 "timestamp": time.time()
             }
             
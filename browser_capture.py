@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Захват звука встречи прямо из вкладки Chrome для Meeting Bot
+Скрипт на странице сводит входящие WebRTC дорожки в AudioContext и кодирует их MediaRecorder'ом (webm/opus),
+Python забирает готовые куски через CDP и подает их в stdin ffmpeg - системные аудиоустройства не нужны
+"""
+
+import base64
+import logging
+import threading
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Аргументы ffmpeg: webm/opus из stdin
+BROWSER_INPUT_ARGS = ['-f', 'webm', '-i', 'pipe:0']
+
+# Выполняется до скриптов страницы (Page.addScriptToEvaluateOnNewDocument)
+HOOK_SCRIPT = r"""
+(() => {
+  if (window.__mbAudio) return;
+  const state = {
+    epoch: Math.random().toString(36).slice(2),
+    chunks: [],
+    tracks: 0,
+    recorder: null,
+    ctx: null,
+    dest: null,
+    pending: Promise.resolve(),
+  };
+  window.__mbAudio = state;
+
+  const mixer = () => {
+    if (!state.ctx) {
+      state.ctx = new AudioContext({sampleRate: 48000});
+      state.dest = state.ctx.createMediaStreamDestination();
+    }
+    return state.ctx;
+  };
+
+  const attach = (track) => {
+    if (!track || track.kind !== 'audio' || track.__mbAttached) return;
+    track.__mbAttached = true;
+    const ctx = mixer();
+    ctx.createMediaStreamSource(new MediaStream([track])).connect(state.dest);
+    state.tracks += 1;
+  };
+
+  const Native = window.RTCPeerConnection;
+  if (Native) {
+    window.RTCPeerConnection = function (...args) {
+      const pc = new Native(...args);
+      pc.addEventListener('track', (event) => attach(event.track));
+      return pc;
+    };
+    window.RTCPeerConnection.prototype = Native.prototype;
+    Object.setPrototypeOf(window.RTCPeerConnection, Native);
+  }
+
+  const toBase64 = (buffer) => {
+    const bytes = new Uint8Array(buffer);
+    let binary = '';
+    for (let i = 0; i < bytes.length; i += 0x8000) {
+      binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+    }
+    return btoa(binary);
+  };
+
+  window.__mbAudioStart = (timeslice) => {
+    if (state.recorder) return state.epoch;
+    const ctx = mixer();
+    ctx.resume();
+    state.recorder = new MediaRecorder(state.dest.stream, {mimeType: 'audio/webm;codecs=opus', audioBitsPerSecond: 32000});
+    state.recorder.ondataavailable = (event) => {
+      if (!event.data || !event.data.size) return;
+      // Цепочка промисов сохраняет порядок кусков
+      state.pending = state.pending
+        .then(() => event.data.arrayBuffer())
+        .then((buffer) => state.chunks.push(toBase64(buffer)));
+    };
+    state.recorder.start(timeslice);
+    return state.epoch;
+  };
+
+  window.__mbAudioDrain = () => {
+    const chunks = state.chunks;
+    state.chunks = [];
+    return {epoch: state.epoch, tracks: state.tracks, recording: !!state.recorder, chunks};
+  };
+})();
+"""
+
+
+def install_hook(driver) -> bool:
+    """Внедрить перехват WebRTC во все документы этого драйвера (до открытия встречи)"""
+    try:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': HOOK_SCRIPT})
+        return True
+    except Exception as e:
+        logger.warning(f"Не удалось внедрить захват звука из браузера: {e}")
+        return False
+
+
+class BrowserAudioCapture:
+    """Перекачка webm/opus кусков из вкладки в stdin ffmpeg"""
+
+    def __init__(self, driver, recorder, timeslice_ms: int = 1000, poll_sec: float = 1.0):
+        self.driver = driver
+        self.recorder = recorder
+        self.timeslice_ms = timeslice_ms
+        self.poll_sec = poll_sec
+        self.epoch: Optional[str] = None
+        self.tracks = 0
+        self.chunks = 0
+        self.bytes = 0
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _evaluate(self, expression: str) -> Any:
+        result = self.driver.execute_cdp_cmd('Runtime.evaluate', {
+            'expression': expression,
+            'returnByValue': True,
+            'awaitPromise': True,
+        })
+        if result.get('exceptionDetails'):
+            raise RuntimeError(result['exceptionDetails'].get('text', 'ошибка скрипта'))
+        return result.get('result', {}).get('value')
+
+    def _start_page_recorder(self) -> Optional[str]:
+        """Запустить MediaRecorder на странице; epoch документа или None (хук не внедрен)"""
+        return self._evaluate(
+            f"window.__mbAudioStart ? window.__mbAudioStart({int(self.timeslice_ms)}) : null"
+        )
+
+    def start(self) -> bool:
+        """Начать захват; False - на странице нет хука"""
+        try:
+            self.epoch = self._start_page_recorder()
+        except Exception as e:
+            logger.error(f"Ошибка запуска захвата звука в браузере: {e}")
+            return False
+        if not self.epoch:
+            logger.error("Хук захвата звука не найден на странице")
+            return False
+        self._thread = threading.Thread(target=self._run, daemon=True, name='browser-audio')
+        self._thread.start()
+        logger.info("🎧 Захват звука из вкладки запущен (WebRTC -> MediaRecorder -> ffmpeg)")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.poll_sec):
+            try:
+                self._drain()
+            except Exception as e:
+                self.errors += 1
+                logger.debug(f"Ошибка чтения звука из браузера: {e}")
+
+    def _drain(self):
+        state = self._evaluate("window.__mbAudioDrain ? window.__mbAudioDrain() : null")
+        if not state:
+            return
+        if not state['recording'] or state['epoch'] != self.epoch:
+            # Страница перезагрузилась: новый MediaRecorder - новый заголовок webm, нужен новый ffmpeg
+            logger.warning("Страница встречи перезагружена, перезапускаю захват звука")
+            self.epoch = self._start_page_recorder()
+            self.recorder.input_header = None
+            self.recorder.restart("новый поток из браузера")
+            return
+        self.tracks = state['tracks']
+        self._write(state['chunks'])
+
+    def _write(self, chunks: List[str]):
+        for encoded in chunks:
+            data = base64.b64decode(encoded)
+            if self.recorder.input_header is None:
+                # Первый кусок содержит заголовок webm - его повторяем каждому новому ffmpeg
+                self.recorder.input_header = data
+            self.recorder.write_input(data)
+            self.chunks += 1
+            self.bytes += len(data)
+
+    def stop(self):
+        """Остановить перекачку и дописать остаток"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_sec + 5)
+        try:
+            self._drain()
+        except Exception:
+            pass
+
+    def describe(self) -> str:
+        return (
+            f"🎧 Звук из браузера: дорожек {self.tracks}, кусков {self.chunks}, "
+            f"{self.bytes / 1024:.0f} КБ, ошибок {self.errors}"
+        )
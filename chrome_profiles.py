@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Шаблон профиля Chrome для Meeting Bot
+Полностью инициализированный профиль (без авторизации - она своя у каждой платформы) собирается один раз и копируется на сессию (reflink, где есть)
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Что не нужно переносить в копии: блокировки запущенного Chrome и кэши
+VOLATILE_ENTRIES = [
+    'SingletonLock', 'SingletonSocket', 'SingletonCookie', 'Crashpad', 'ShaderCache', 'GrShaderCache',
+    'Default/Cache', 'Default/Code Cache', 'Default/GPUCache', 'Default/Service Worker/CacheStorage',
+]
+
+READY_MARKER = '.template.json'
+OWNER_FILE = '.owner'
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class ProfileTemplateManager:
+    """Золотой профиль и его копии для сессий"""
+
+    def __init__(self, template_dir: str, sessions_dir: str, builder: Callable[[str], bool],
+                 max_age_sec: float = 24 * 3600):
+        # builder(path) запускает Chrome с профилем path (без авторизации) и корректно закрывает его
+        self.template_dir = template_dir
+        self.sessions_dir = sessions_dir
+        self.builder = builder
+        self.max_age_sec = max_age_sec
+        self.clones = 0
+        self.fallbacks = 0
+        self.builds = 0
+        self.collected = 0
+        self._lock = threading.Lock()
+        self._building = threading.Lock()
+        os.makedirs(self.sessions_dir, exist_ok=True)
+
+    def _built_at(self) -> Optional[float]:
+        try:
+            with open(os.path.join(self.template_dir, READY_MARKER), 'r', encoding='utf-8') as f:
+                return json.load(f)['built_at']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def is_fresh(self) -> bool:
+        """Шаблон есть и не старше max_age_sec (авторизации в нем нет - загрузка /auth его не старит)"""
+        built_at = self._built_at()
+        return built_at is not None and time.time() - built_at <= self.max_age_sec
+
+    def ensure(self, block: bool = False) -> bool:
+        """Пересобрать шаблон, если он устарел (в фоне, если не block)"""
+        if self.is_fresh():
+            return True
+        if block:
+            return self._build()
+        threading.Thread(target=self._build, daemon=True, name='profile-template').start()
+        return False
+
+    def _build(self) -> bool:
+        if not self._building.acquire(blocking=False):
+            return False  # Уже собирается
+        try:
+            building = f"{self.template_dir}.building"
+            shutil.rmtree(building, ignore_errors=True)
+            os.makedirs(building)
+            started = time.monotonic()
+            try:
+                ok = self.builder(building)
+            except Exception as e:
+                logger.error(f"Ошибка сборки шаблона профиля Chrome: {e}")
+                ok = False
+            if not ok:
+                shutil.rmtree(building, ignore_errors=True)
+                return False
+            for entry in VOLATILE_ENTRIES:
+                path = os.path.join(building, entry)
+                if os.path.islink(path) or os.path.isfile(path):
+                    os.remove(path)
+                elif os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+            with open(os.path.join(building, READY_MARKER), 'w', encoding='utf-8') as f:
+                json.dump({'built_at': time.time()}, f)
+            # Подмена под блокировкой: копирование шаблона не увидит его наполовину
+            with self._lock:
+                old = f"{self.template_dir}.old"
+                shutil.rmtree(old, ignore_errors=True)
+                if os.path.exists(self.template_dir):
+                    os.rename(self.template_dir, old)
+                os.rename(building, self.template_dir)
+                shutil.rmtree(old, ignore_errors=True)
+            self.builds += 1
+            logger.info(f"🧬 Шаблон профиля Chrome собран за {time.monotonic() - started:.1f} с")
+            return True
+        finally:
+            self._building.release()
+
+    def _new_session_dir(self) -> str:
+        path = tempfile.mkdtemp(prefix='session_', dir=self.sessions_dir)
+        with open(os.path.join(path, OWNER_FILE), 'w') as f:
+            f.write(str(os.getpid()))
+        return path
+
+    def clone(self) -> Optional[str]:
+        """Копия шаблона для новой сессии; None - шаблона еще нет"""
+        self.collect_garbage()
+        fresh = self.ensure()
+        if self._built_at() is None:
+            return None
+        if not fresh:
+            logger.info("Шаблон профиля устарел, пересобирается в фоне - используем текущий")
+        path = self._new_session_dir()
+        started = time.monotonic()
+        with self._lock:
+            # reflink на btrfs/xfs - копия почти бесплатна; иначе обычное копирование.
+            # Жесткие ссылки не годятся: Chrome меняет файлы профиля (SQLite) на месте
+            result = subprocess.run(
+                ['cp', '-a', '--reflink=auto', f"{self.template_dir}/.", path],
+                capture_output=True, text=True
+            )
+        if result.returncode != 0:
+            logger.warning(f"Не удалось скопировать шаблон профиля: {result.stderr.strip()}")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        self.clones += 1
+        logger.info(f"Профиль Chrome скопирован из шаблона за {time.monotonic() - started:.2f} с: {path}")
+        return path
+
+    def empty(self) -> str:
+        """Пустой профиль сессии (шаблона нет) - тоже под сборкой мусора"""
+        self.fallbacks += 1
+        return self._new_session_dir()
+
+    def collect_garbage(self) -> int:
+        """Удалить профили сессий, чей процесс-владелец завершился"""
+        removed = 0
+        try:
+            names = os.listdir(self.sessions_dir)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.sessions_dir, name)
+            try:
+                with open(os.path.join(path, OWNER_FILE), 'r') as f:
+                    owner = int(f.read().strip())
+            except (OSError, ValueError):
+                # Копирование еще идет или профиль без владельца - трогаем только старые
+                try:
+                    if time.time() - os.path.getmtime(path) < 3600:
+                        continue
+                except OSError:
+                    continue
+                owner = 0
+            if owner and _pid_alive(owner):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        if removed:
+            self.collected += removed
+            logger.info(f"Удалено оставшихся профилей Chrome: {removed}")
+        return removed
+
+    @staticmethod
+    def collect_legacy_tmp(max_age_sec: float = 24 * 3600) -> int:
+        """Старые meetingbot_chrome_* в /tmp от прежних версий и падений"""
+        removed = 0
+        root = tempfile.gettempdir()
+        for name in os.listdir(root):
+            if not name.startswith('meetingbot_chrome_'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                if time.time() - os.path.getmtime(path) > max_age_sec:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def describe(self) -> str:
+        built_at = self._built_at()
+        age = f"{(time.time() - built_at) / 3600:.1f} ч" if built_at else "нет"
+        return (
+            f"🧬 Шаблон профиля: возраст {age}, копий {self.clones}, без шаблона {self.fallbacks}, "
+            f"сборок {self.builds}, удалено старых {self.collected}"
+        )
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Диагностические скриншоты входа во встречу для Meeting Bot
+Снимки шагов делаются в фоне (CDP, JPEG, уменьшенные) в кольцевой буфер последних N шагов в памяти;
+на диск и админу они попадают только при неудачном входе, и место на диске ограничено бюджетом.
+Снимок идет через ту же сессию WebDriver, а chromedriver выполняет команды сессии по одной: следующая
+команда входа все равно ждет Page.captureScreenshot. В фон вынесены только ожидание, декодирование и запись
+"""
+
+import os
+import glob
+import time
+import base64
+import shutil
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ScreenshotRing:
+    """Последние capacity снимков шагов одной сессии браузера"""
+
+    def __init__(self, capacity: int = 8, max_width: int = 960, quality: int = 60):
+        self.capacity = capacity
+        self.max_width = max_width
+        self.quality = quality
+        self._frames: Deque[Dict[str, Any]] = deque(maxlen=max(1, capacity))
+        self._lock = threading.Lock()
+        self._pending = []
+        self._generation = 0  # Растет при clear(): снимки прошлого входа в новый буфер не попадают
+        # Один поток: снимки идут по порядку (chromedriver все равно выполняет их между командами входа)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='diag-shot')
+
+    def snap(self, driver, step: str):
+        """Снять страницу в фоне (не ждет снимка; команды входа встают в очередь chromedriver за ним)"""
+        if not driver or self.capacity <= 0:
+            return
+        with self._lock:
+            generation = self._generation
+        try:
+            future = self._executor.submit(self._capture, driver, step, time.time(), generation)
+        except RuntimeError:
+            return  # Сессия уже закрыта
+        with self._lock:
+            self._pending = [f for f in self._pending if not f.done()] + [future]
+
+    def _capture(self, driver, step: str, taken_at: float, generation: int):
+        with self._lock:
+            if generation != self._generation:
+                return  # Буфер очищен, пока снимок ждал очереди
+        try:
+            params: Dict[str, Any] = {'format': 'jpeg', 'quality': self.quality}
+            metrics = driver.execute_cdp_cmd('Page.getLayoutMetrics', {})
+            viewport = metrics.get('cssVisualViewport') or metrics.get('visualViewport') or {}
+            width, height = viewport.get('clientWidth'), viewport.get('clientHeight')
+            if width and height and width > self.max_width:
+                # Уменьшение на стороне Chrome: кодировать и передавать меньше
+                params['clip'] = {
+                    'x': viewport.get('pageX', 0), 'y': viewport.get('pageY', 0),
+                    'width': width, 'height': height, 'scale': self.max_width / width,
+                }
+            data = base64.b64decode(driver.execute_cdp_cmd('Page.captureScreenshot', params)['data'])
+            url = driver.current_url
+        except Exception as e:
+            logger.debug(f"Снимок шага '{step}' не получен: {e}")
+            return
+        with self._lock:
+            if generation == self._generation:
+                self._frames.append({'step': step, 'at': taken_at, 'url': url, 'jpeg': data})
+
+    def clear(self):
+        """Начать новый вход: снимки прошлого отбрасываются, в том числе еще не снятые"""
+        with self._lock:
+            self._generation += 1
+            self._frames.clear()
+            for future in self._pending:
+                future.cancel()
+            self._pending = []
+
+    def frames(self, timeout: float = 5.0) -> List[Dict[str, Any]]:
+        """Снимки буфера (дождавшись начатых, не дольше timeout)"""
+        with self._lock:
+            pending = list(self._pending)
+        if pending:
+            wait(pending, timeout=timeout)
+        with self._lock:
+            return list(self._frames)
+
+    def persist(self, root: str, tag: str, budget_mb: float, timeout: float = 5.0) -> List[str]:
+        """Записать буфер в root/<время>_<tag>/ в пределах бюджета; пути файлов"""
+        frames = self.frames(timeout)
+        if not frames:
+            return []
+        safe_tag = ''.join(c if c.isalnum() or c in '-_' else '_' for c in tag)[:40]
+        folder = os.path.join(root, f"{time.strftime('%Y%m%d_%H%M%S')}_{safe_tag}")
+        paths = []
+        try:
+            os.makedirs(folder, exist_ok=True)
+            for index, frame in enumerate(frames, 1):
+                step = ''.join(c if c.isalnum() or c in '-_' else '_' for c in frame['step'])[:40]
+                path = os.path.join(folder, f"{index:02d}_{step}.jpg")
+                with open(path, 'wb') as f:
+                    f.write(frame['jpeg'])
+                paths.append(path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить диагностические снимки: {e}")
+        enforce_disk_budget(root, budget_mb, keep=folder)
+        return [path for path in paths if os.path.exists(path)]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        self.clear()
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                continue
+    return total
+
+
+def enforce_disk_budget(root: str, budget_mb: float, keep: Optional[str] = None) -> int:
+    """Удалять самые старые папки снимков, пока root не уложится в budget_mb; сколько удалено"""
+    try:
+        folders = [os.path.join(root, name) for name in os.listdir(root)]
+    except OSError:
+        return 0
+    folders = sorted((path for path in folders if os.path.isdir(path)), key=os.path.getmtime)
+    sizes = {path: _dir_size(path) for path in folders}
+    total = sum(sizes.values())
+    budget = budget_mb * 1024 * 1024
+    removed = 0
+    for path in folders:
+        if total <= budget:
+            break
+        if path == keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= sizes[path]
+        removed += 1
+    if removed:
+        logger.info(f"Удалено старых диагностических снимков: {removed} (бюджет {budget_mb:.0f} МБ)")
+    return removed
+
+
+def collect_legacy_screenshots() -> int:
+    """PNG прежних версий в /tmp (meet_step*.png, meetingbot_*_fail_*.png) - их никто не удалял"""
+    removed = 0
+    for pattern in ('/tmp/meet_step*.png', '/tmp/meetingbot_*_fail_*.png'):
+        for path in glob.glob(pattern):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                continue
+    if removed:
+        logger.info(f"Удалено старых скриншотов из /tmp: {removed}")
+    return removed
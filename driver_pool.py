@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Пул заранее запущенных Chrome для Meeting Bot
+Готовый драйвер с авторизацией выдается сразу, пул пополняется в фоне и обновляет изношенные браузеры
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from process_tree import children_map
+
+logger = logging.getLogger(__name__)
+
+
+def process_tree_rss_mb(pid: int) -> float:
+    """Суммарная RSS процесса и всех его потомков (МБ)"""
+    children = children_map()
+    total_kb = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+
+def driver_rss_mb(driver) -> float:
+    """Память chromedriver и всего Chrome под ним"""
+    try:
+        return process_tree_rss_mb(driver.service.process.pid)
+    except Exception:
+        return 0.0
+
+
+class DriverPool:
+    """Пул сессий Chrome: сессия - dict с ключом 'driver' и данными фабрики"""
+
+    def __init__(self, factory: Callable[[], Dict[str, Any]], disposer: Callable[[Dict[str, Any]], None],
+                 size: int = 1, max_uses: int = 5, max_rss_mb: float = 1500.0):
+        self.factory = factory
+        self.disposer = disposer
+        self.size = size
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+
+        self.hits = 0
+        self.misses = 0
+        self.launched = 0
+        self.recycled = 0
+        self.launch_failures = 0
+        self.launch_time_total = 0.0
+
+        self._idle = deque()
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запустить фоновое пополнение пула"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._replenish_loop, daemon=True, name='driver-pool')
+        self._thread.start()
+        logger.info(f"🏊 Пул Chrome запущен (размер {self.size})")
+
+    def _replenish_loop(self):
+        while not self._stopping.is_set():
+            with self._lock:
+                missing = self.size - len(self._idle)
+            if missing <= 0:
+                self._wakeup.wait(30)
+                self._wakeup.clear()
+                continue
+            started = time.monotonic()
+            try:
+                session = self.factory()
+            except Exception as e:
+                self.launch_failures += 1
+                logger.error(f"Пул Chrome: не удалось запустить браузер: {e}")
+                self._stopping.wait(30)
+                continue
+            elapsed = time.monotonic() - started
+            session.update(uses=0, created_at=time.time())
+            with self._lock:
+                self.launched += 1
+                self.launch_time_total += elapsed
+                if self._stopping.is_set():
+                    stale = session
+                else:
+                    self._idle.append(session)
+                    stale = None
+            if stale:
+                self.disposer(stale)
+            else:
+                logger.info(f"🏊 Пул Chrome: готов браузер за {elapsed:.1f} с (свободно {len(self._idle)})")
+
+    @staticmethod
+    def _alive(session: Dict[str, Any]) -> bool:
+        try:
+            session['driver'].current_url
+            return True
+        except Exception:
+            return False
+
+    def acquire(self) -> Optional[Dict[str, Any]]:
+        """Взять готовую сессию; None - пул пуст (вызывающий запускает Chrome сам)"""
+        while True:
+            with self._lock:
+                session = self._idle.popleft() if self._idle else None
+                if session is None:
+                    self.misses += 1
+                    break
+            if self._alive(session):
+                with self._lock:
+                    self.hits += 1
+                    self._in_use += 1
+                break
+            logger.warning("Пул Chrome: браузер из пула не отвечает, выбрасываю")
+            self.disposer(session)
+        self._wakeup.set()
+        return session
+
+    def release(self, session: Dict[str, Any], reusable: bool = True):
+        """Вернуть сессию после встречи: в пул или на утилизацию"""
+        with self._lock:
+            self._in_use = max(0, self._in_use - 1)
+        session['uses'] = session.get('uses', 0) + 1
+        reason = None
+        if not reusable:
+            reason = "сессия повреждена"
+        elif session['uses'] >= self.max_uses:
+            reason = f"использован {session['uses']} раз"
+        else:
+            rss = driver_rss_mb(session['driver'])
+            if rss > self.max_rss_mb:
+                reason = f"память {rss:.0f} МБ"
+        if reason is None and not self._reset(session):
+            reason = "не удалось очистить вкладки"
+        with self._lock:
+            keep = reason is None and not self._stopping.is_set() and len(self._idle) < self.size
+            if keep:
+                self._idle.append(session)
+        if not keep:
+            with self._lock:
+                self.recycled += 1
+            logger.info(f"🏊 Пул Chrome: браузер утилизирован ({reason or 'пул полон'})")
+            self.disposer(session)
+        self._wakeup.set()
+
+    @staticmethod
+    def _reset(session: Dict[str, Any]) -> bool:
+        """Уйти со встречи и оставить одну пустую вкладку (авторизация сохраняется)"""
+        driver = session['driver']
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            driver.get('about:blank')
+            return True
+        except Exception:
+            return False
+
+    def shutdown(self):
+        """Закрыть все свободные браузеры"""
+        self._stopping.set()
+        self._wakeup.set()
+        with self._lock:
+            sessions = list(self._idle)
+            self._idle.clear()
+        for session in sessions:
+            self.disposer(session)
+
+    def describe(self) -> str:
+        """Статистика пула для статуса"""
+        requests_total = self.hits + self.misses
+        hit_rate = self.hits / requests_total * 100 if requests_total else 0.0
+        avg_launch = self.launch_time_total / self.launched if self.launched else 0.0
+        return (
+            f"🏊 Пул Chrome: свободно {len(self._idle)}/{self.size}, занято {self._in_use}, "
+            f"попаданий {self.hits}/{requests_total} ({hit_rate:.0f}%), "
+            f"запущено {self.launched} (~{avg_launch:.1f} с), утилизировано {self.recycled}"
+        )
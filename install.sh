@@ -33,6 +33,7 @@ apt-get install -y \
     git \
     ffmpeg \
     pulseaudio \
+    pulseaudio-utils \
     chromium-browser \
     chromium-chromedriver \
     wget \
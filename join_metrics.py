@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Метрики времени входа во встречу для Meeting Bot
+Каждый этап (запуск браузера, авторизация, загрузка, имя, медиа, кнопка входа, проверка звонка, запись)
+дает структурное событие: платформа, этап, исход, длительность. По ним - гистограммы и p50/p95/p99 на платформу
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Этапы входа в порядке выполнения (для вывода)
+PHASES = [
+    'setup_driver', 'auth', 'safe_get', 'name_fill', 'media_disable',
+    'join_click', 'in_call', 'recording_start', 'join_total',
+]
+
+# Границы корзин гистограммы, секунды (последняя корзина - все, что дольше)
+BUCKETS = [0.25, 0.5, 1, 2, 5, 10, 20, 30, 60]
+
+PERCENTILES = (50, 95, 99)
+
+# Исходы-неудачи (остальные - 'ok', 'miss' для необязательных шагов, 'pool', 'template' и т.п.)
+FAILED_OUTCOMES = ('fail', 'error', 'abandoned')
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Перцентиль по ближайшему рангу (значения уже отсортированы)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class PhaseTimer:
+    """Замер одного этапа: stop(исход) записывает событие ровно один раз"""
+
+    def __init__(self, metrics: 'JoinMetrics', platform: str, phase: str):
+        self.metrics = metrics
+        self.platform = platform
+        self.phase = phase
+        self.started = time.monotonic()
+        self.stopped = False
+
+    def stop(self, outcome: str = 'ok') -> float:
+        if self.stopped:
+            return 0.0
+        self.stopped = True
+        seconds = time.monotonic() - self.started
+        self.metrics.record(self.platform, self.phase, outcome, seconds)
+        return seconds
+
+
+class JoinMetrics:
+    """Последние max_samples замеров на (платформа, этап) и счетчики исходов"""
+
+    def __init__(self, path: Optional[str] = None, max_samples: int = 500):
+        self.path = path  # Куда выгружается сводка (и откуда подхватывается после перезапуска)
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._outcomes: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._load()
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for platform, phases in data.get('platforms', {}).items():
+            for phase, stats in phases.items():
+                key = (platform, phase)
+                self._samples[key] = deque(stats.get('samples', [])[-self.max_samples:], maxlen=self.max_samples)
+                self._outcomes[key] = dict(stats.get('outcomes', {}))
+
+    def start(self, platform: str, phase: str) -> PhaseTimer:
+        return PhaseTimer(self, platform or 'unknown', phase)
+
+    @contextmanager
+    def phase(self, platform: str, phase: str) -> Iterator[PhaseTimer]:
+        """Замер блока: исход 'error' при исключении, иначе 'ok' (если не остановлен раньше с другим)"""
+        timer = self.start(platform, phase)
+        try:
+            yield timer
+        except Exception:
+            timer.stop('error')
+            raise
+        timer.stop('ok')
+
+    def record(self, platform: str, phase: str, outcome: str, seconds: float):
+        key = (platform, phase)
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.max_samples)).append(round(seconds, 3))
+            outcomes = self._outcomes.setdefault(key, {})
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        # Структурное событие - одна JSON-строка, удобно грепать и разбирать
+        logger.info("📏 " + json.dumps(
+            {'event': 'join_phase', 'platform': platform, 'phase': phase,
+             'outcome': outcome, 'seconds': round(seconds, 3)},
+            ensure_ascii=False
+        ))
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """платформа -> этап -> {count, outcomes, p50, p95, p99, histogram, samples}"""
+        with self._lock:
+            snapshot = {key: (list(values), dict(self._outcomes.get(key, {})))
+                        for key, values in self._samples.items()}
+        result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (platform, phase), (values, outcomes) in snapshot.items():
+            ordered = sorted(values)
+            histogram = [0] * (len(BUCKETS) + 1)
+            for value in values:
+                histogram[next((i for i, bound in enumerate(BUCKETS) if value <= bound), len(BUCKETS))] += 1
+            stats = {'count': len(values), 'outcomes': outcomes, 'histogram': histogram, 'samples': values}
+            for pct in PERCENTILES:
+                stats[f"p{pct}"] = percentile(ordered, pct)
+            result.setdefault(platform, {})[phase] = stats
+        return result
+
+    def dump(self, path: Optional[str] = None) -> Optional[str]:
+        """Сводка в JSON (атомарно); путь к файлу или None"""
+        path = path or self.path
+        if not path:
+            return None
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'dumped_at': time.time(), 'buckets': BUCKETS, 'platforms': self.summary()},
+                          f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, path)
+            return path
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить метрики входа: {e}")
+            return None
+
+    def describe(self, platform: Optional[str] = None) -> str:
+        """Текстовая сводка p50/p95/p99 по этапам (для Telegram)"""
+        summary = self.summary()
+        if platform:
+            summary = {platform: summary.get(platform, {})}
+        lines = []
+        for name, phases in sorted(summary.items()):
+            if not phases:
+                continue
+            total = phases.get('join_total', {}).get('count', 0)
+            lines.append(f"📏 {name} (входов: {total})")
+            order = {phase: i for i, phase in enumerate(PHASES)}
+            for phase in sorted(phases, key=lambda p: (order.get(p, len(order)), p)):
+                stats = phases[phase]
+                failed = sum(count for outcome, count in stats['outcomes'].items() if outcome in FAILED_OUTCOMES)
+                lines.append(
+                    f"  {phase}: n={stats['count']} p50 {stats['p50']:.1f} / p95 {stats['p95']:.1f} / "
+                    f"p99 {stats['p99']:.1f} с" + (f", неудач: {failed}" if failed else "")
+                )
+        return '\n'.join(lines) if lines else "📏 Замеров входа еще нет"
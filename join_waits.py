@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Ожидания при входе во встречу для Meeting Bot
+Вместо фиксированных sleep - опрос конкретных условий (элемент виден, URL сменился, DOM затих, есть признак звонка)
+с таймаутом на каждый шаг: шаг заканчивается, как только условие выполнено
+"""
+
+import time
+import logging
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+from selenium.common.exceptions import WebDriverException
+
+from selector_registry import query
+
+logger = logging.getLogger(__name__)
+
+# Локатор: ('css' | 'xpath' | 'id', селектор) или кандидат из selector_registry
+Locator = Tuple[str, str]
+Condition = Callable[[Any], Any]
+
+# Время с последнего изменения DOM (наблюдатель ставится при первом вызове)
+_DOM_IDLE_SCRIPT = r"""
+if (!window.__mbMutations) {
+  window.__mbMutations = {last: performance.now()};
+  new MutationObserver(() => { window.__mbMutations.last = performance.now(); })
+    .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+  return 0;
+}
+return performance.now() - window.__mbMutations.last;
+"""
+
+
+def page_ready() -> Condition:
+    """document.readyState == 'complete'"""
+    return lambda driver: driver.execute_script("return document.readyState") == 'complete'
+
+
+def visible(locators: Sequence[Locator]) -> Condition:
+    """Первый видимый элемент из списка локаторов или кандидатов selector_registry (WebElement) или None"""
+    def check(driver):
+        results = query(driver, locators)
+        return results[0]['element'] if results else None
+    return check
+
+
+def url_changed(previous: str) -> Condition:
+    """URL отличается от previous"""
+    return lambda driver: driver.current_url != previous and driver.current_url
+
+
+def url_contains(*parts: str) -> Condition:
+    """URL содержит один из фрагментов"""
+    return lambda driver: any(part in driver.current_url for part in parts)
+
+
+def dom_quiet(quiet_sec: float = 1.0) -> Condition:
+    """В DOM не было изменений quiet_sec секунд (страница дорисовалась)"""
+    return lambda driver: (driver.execute_script(_DOM_IDLE_SCRIPT) or 0) >= quiet_sec * 1000
+
+
+def any_of(*conditions: Condition) -> Condition:
+    """Первое выполненное условие; результат - (номер условия, значение)"""
+    def check(driver):
+        for index, condition in enumerate(conditions):
+            value = condition(driver)
+            if value:
+                return index, value
+        return None
+    return check
+
+
+class JoinWaiter:
+    """Опрос условий на странице драйвера с таймаутом на шаг"""
+
+    def __init__(self, driver, tag: str = '', poll_sec: float = 0.25):
+        self.driver = driver
+        self.tag = tag
+        self.poll_sec = poll_sec
+        self.waited = 0.0  # Суммарное время ожидания всех шагов
+
+    def until(self, condition: Condition, timeout: float, step: str) -> Optional[Any]:
+        """Ждать условие не дольше timeout; значение условия или None по таймауту"""
+        started = time.monotonic()
+        deadline = started + timeout
+        value = None
+        while True:
+            try:
+                value = condition(self.driver)
+            except WebDriverException as e:
+                # Страница перезагружается или элемент исчез - продолжаем опрос
+                msg = str(e).lower()
+                if 'tab crashed' in msg or 'chrome not reachable' in msg or 'invalid session' in msg:
+                    raise
+                value = None
+            if value or time.monotonic() >= deadline:
+                break
+            time.sleep(self.poll_sec)
+        elapsed = time.monotonic() - started
+        self.waited += elapsed
+        prefix = f"[{self.tag}] " if self.tag else ""
+        if value:
+            logger.info(f"{prefix}⏱️ {step}: {elapsed:.1f} с")
+        else:
+            logger.info(f"{prefix}⏱️ {step}: не дождались за {timeout:.0f} с")
+        return value or None
+
+    def settle(self, quiet_sec: float = 1.0, timeout: float = 5.0, step: str = "страница затихла") -> bool:
+        """Дождаться, пока DOM перестанет меняться (после клика, закрытия окна и т.п.)"""
+        return bool(self.until(dom_quiet(quiet_sec), timeout, step))
@@ -7,7 +7,65 @@
 import os
 import json
 import time
-from typing import Dict, List, Optional
+import uuid
+import weakref
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Тип встречи (MeetingBot.detect_meeting_type) -> имя платформы в файлах
+# cookies_<имя>.json / storage_<имя>.json, которые сохраняет simple_auth.py
+PLATFORM_AUTH_NAMES = {
+    'google_meet': 'google_meet',
+    'zoom': 'zoom',
+    'yandex': 'яндекс_телемост',
+    'contour': 'контур.толк',
+    'teams': 'microsoft_teams',
+}
+
+# Origin страниц встреч: их storage очищается при возврате браузера в пул
+PLATFORM_ORIGINS = {
+    'google_meet': 'https://meet.google.com',
+    'zoom': 'https://zoom.us',
+    'yandex': 'https://telemost.yandex.ru',
+    'contour': 'https://talk.contour.ru',
+    'teams': 'https://teams.microsoft.com',
+}
+
+# Методы объекта Storage, попавшие в файлы при сериализации window.localStorage целиком
+STORAGE_JUNK_KEYS = {'clear', 'getItem', 'key', 'length', 'removeItem', 'setItem'}
+
+# Выполняется до скриптов страницы (Page.addScriptToEvaluateOnNewDocument): записи одного origin
+# одним JSON, без интерполяции значений в код. Результат - в window.__mbStorageRestore
+STORAGE_RESTORE_SCRIPT = r"""
+(() => {
+  const payload = __PAYLOAD__;
+  if (location.origin !== payload.origin) return;
+  const marker = '__mbStorageRestored:' + payload.id;
+  const result = {origin: payload.origin, applied: 0, failed: 0, repeated: false};
+  window.__mbStorageRestore = result;
+  try {
+    // Один раз на вкладку: после перезагрузки страницы не затираем то, что записало приложение
+    if (window.sessionStorage.getItem(marker)) {
+      result.repeated = true;
+      return;
+    }
+  } catch (e) {}
+  for (const area of ['localStorage', 'sessionStorage']) {
+    for (const [key, value] of Object.entries(payload[area] || {})) {
+      try {
+        window[area].setItem(key, value);
+        result.applied += 1;
+      } catch (e) {
+        result.failed += 1;
+      }
+    }
+  }
+  try {
+    window.sessionStorage.setItem(marker, '1');
+  } catch (e) {}
+})();
+"""
 
 class AuthDataLoader:
     """Класс для загрузки и применения сохраненных данных авторизации"""
@@ -16,7 +74,55 @@ class AuthDataLoader:
         self.cookies_path = "cookies.json"
         self.selenium_cookies_path = "selenium_cookies.json"
         self.storage_path = "storage.json"
+        # Разобранные JSON: путь -> (mtime, размер, данные); файл перечитывается, только если изменился
+        self._cache: Dict[str, Tuple[float, int, Any]] = {}
+        self._cache_lock = threading.Lock()
+        # Драйвер -> [(id скрипта восстановления storage, origin)]: снимаются при сбросе браузера из пула
+        self._storage_scripts = weakref.WeakKeyDictionary()
         
+    def _read_json(self, path: Optional[str], label: str) -> Optional[Any]:
+        """Прочитать JSON с кэшем в памяти по mtime и размеру файла"""
+        if not path:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            print(f"⚠️ Файл {path} не найден")
+            return None
+        with self._cache_lock:
+            cached = self._cache.get(path)
+            if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+                return cached[2]
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"❌ Ошибка загрузки {label}: {e}")
+            return None
+        with self._cache_lock:
+            self._cache[path] = (stat.st_mtime, stat.st_size, data)
+        print(f"✅ Загружены {label} из {path}")
+        return data
+    
+    @staticmethod
+    def platform_name(platform: Optional[str]) -> Optional[str]:
+        """Имя платформы в файлах авторизации по типу встречи"""
+        return PLATFORM_AUTH_NAMES.get(platform) if platform else None
+    
+    def platform_paths(self, platform: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        """(cookies, storage) платформы; общие selenium_cookies.json/storage.json - только если своих файлов нет совсем"""
+        name = self.platform_name(platform)
+        if name:
+            own = [f"cookies_{name}.json", f"storage_{name}.json"]
+            if any(os.path.exists(path) for path in own):
+                # Чужое состояние не подмешиваем: недостающая половина набора просто не применяется
+                return tuple(path if os.path.exists(path) else None for path in own)
+        return self.selenium_cookies_path, self.storage_path
+    
+    def has_platform_bundle(self, platform: Optional[str]) -> bool:
+        """Есть ли у платформы свои файлы авторизации (а не только общие)"""
+        return self.platform_paths(platform) != (self.selenium_cookies_path, self.storage_path)
+    
     def load_playwright_cookies(self) -> Optional[List[Dict]]:
         """Загрузить cookies для Playwright"""
         try:
@@ -32,45 +138,67 @@ class AuthDataLoader:
             print(f"❌ Ошибка загрузки Playwright cookies: {e}")
             return None
     
-    def load_selenium_cookies(self) -> Optional[List[Dict]]:
-        """Загрузить cookies для Selenium"""
-        try:
-            if os.path.exists(self.selenium_cookies_path):
-                with open(self.selenium_cookies_path, 'r', encoding='utf-8') as f:
-                    cookies = json.load(f)
-                print(f"✅ Загружены Selenium cookies: {len(cookies)} записей")
-                return cookies
-            else:
-                print(f"⚠️ Файл {self.selenium_cookies_path} не найден")
-                return None
-        except Exception as e:
-            print(f"❌ Ошибка загрузки Selenium cookies: {e}")
-            return None
+    def load_selenium_cookies(self, platform: Optional[str] = None) -> Optional[List[Dict]]:
+        """Загрузить cookies для Selenium (только платформы встречи, если для нее есть файл)"""
+        cookies = self._read_json(self.platform_paths(platform)[0], "Selenium cookies")
+        return cookies if isinstance(cookies, list) else None
     
-    def load_storage_data(self) -> Optional[Dict]:
-        """Загрузить данные storage"""
-        try:
-            if os.path.exists(self.storage_path):
-                with open(self.storage_path, 'r', encoding='utf-8') as f:
-                    storage = json.load(f)
-                print(f"✅ Загружены storage данные")
-                return storage
-            else:
-                print(f"⚠️ Файл {self.storage_path} не найден")
-                return None
-        except Exception as e:
-            print(f"❌ Ошибка загрузки storage данных: {e}")
-            return None
+    def load_storage_data(self, platform: Optional[str] = None) -> Optional[Dict]:
+        """Загрузить данные storage (только платформы встречи, если для нее есть файл)"""
+        storage = self._read_json(self.platform_paths(platform)[1], "storage данные")
+        return storage if isinstance(storage, dict) else None
     
-    def apply_selenium_cookies(self, driver) -> bool:
+    @staticmethod
+    def to_cdp_cookie(cookie: Dict) -> Optional[Dict]:
+        """Преобразовать cookie Selenium/Playwright в параметр Network.setCookies"""
+        if not cookie.get('name') or 'value' not in cookie or not cookie.get('domain'):
+            return None
+        cdp_cookie = {
+            'name': cookie['name'],
+            'value': str(cookie['value']),
+            'path': cookie.get('path') or '/',
+            'secure': bool(cookie.get('secure', False)),
+            'httpOnly': bool(cookie.get('httpOnly', False)),
+        }
+        domain = cookie['domain']
+        if domain.startswith('.'):
+            cdp_cookie['domain'] = domain
+        else:
+            # Cookie только для этого хоста (и __Host-) задается через url, без атрибута domain
+            cdp_cookie['url'] = f"https://{domain}{cdp_cookie['path']}"
+        same_site = str(cookie.get('sameSite') or '').lower()
+        same_site = {'strict': 'Strict', 'lax': 'Lax', 'none': 'None', 'no_restriction': 'None'}.get(same_site)
+        # SameSite=None без Secure Chrome отвергает - тогда оставляем значение по умолчанию
+        if same_site and (same_site != 'None' or cdp_cookie['secure']):
+            cdp_cookie['sameSite'] = same_site
+        expires = cookie.get('expiry', cookie.get('expires'))
+        if isinstance(expires, (int, float)) and expires > 0:
+            cdp_cookie['expires'] = expires
+        return cdp_cookie
+
+    def apply_cookies_cdp(self, driver, platform: Optional[str] = None) -> bool:
+        """Установить все cookies для всех доменов одним вызовом CDP, без загрузки страницы"""
+        cookies = self.load_selenium_cookies(platform)
+        if not cookies:
+            return False
+        cdp_cookies = [c for c in (self.to_cdp_cookie(cookie) for cookie in cookies) if c]
+        if not cdp_cookies:
+            return False
+        driver.execute_cdp_cmd('Network.setCookies', {'cookies': cdp_cookies})
+        domains = {cookie['domain'].lstrip('.') for cookie in cookies if cookie.get('domain')}
+        print(f"✅ Применено {len(cdp_cookies)} cookies через CDP ({len(domains)} доменов)")
+        return True
+
+    def apply_selenium_cookies(self, driver, platform: Optional[str] = None) -> bool:
         """Применить cookies к Selenium драйверу"""
         try:
-            cookies = self.load_selenium_cookies()
+            cookies = self.load_selenium_cookies(platform)
             if not cookies:
                 return False
             
-            # Сначала переходим на домен, чтобы установить cookies
-            driver.get("https://google.com")
+            # Сначала переходим на домен, чтобы установить cookies (основной домен платформы)
+            domains = Counter(c['domain'].lstrip('.') for c in cookies if c.get('domain'))
+            driver.get(f"https://{domains.most_common(1)[0][0]}" if domains else "https://google.com")
             time.sleep(1)
             
             applied_count = 0
@@ -95,63 +223,126 @@ class AuthDataLoader:
             print(f"❌ Ошибка применения cookies: {e}")
             return False
     
-    def apply_storage_data(self, driver) -> bool:
-        """Применить storage данные к драйверу"""
+    @staticmethod
+    def storage_by_origin(storage_data: Dict) -> Tuple[Dict[str, Dict[str, Dict[str, str]]], int]:
+        """origin -> {'localStorage': {...}, 'sessionStorage': {...}} и число отброшенных служебных записей.
+        Старые файлы без origin пропускаются: снимались на страницах входа, origin встречи по ним не угадать"""
+        if isinstance(storage_data.get('origins'), dict):
+            sources = storage_data['origins']
+        else:
+            origin = storage_data.get('origin')
+            sources = {origin: storage_data} if origin else {}
+        bundles = {}
+        dropped = 0
+        for origin, data in sources.items():
+            items = {}
+            for area in ('localStorage', 'sessionStorage'):
+                entries = data.get(area) or {}
+                # Значения Storage - всегда строки; {} и числа - это методы и length самого объекта
+                items[area] = {
+                    key: value for key, value in entries.items()
+                    if key not in STORAGE_JUNK_KEYS and isinstance(value, str)
+                }
+                dropped += len(entries) - len(items[area])
+            if items['localStorage'] or items['sessionStorage']:
+                bundles[origin.rstrip('/')] = items
+        return bundles, dropped
+    
+    def apply_storage_data(self, driver, platform: Optional[str] = None) -> bool:
+        """Зарегистрировать восстановление storage по origin: применится при открытии страницы этого origin"""
         try:
-            storage_data = self.load_storage_data()
+            storage_data = self.load_storage_data(platform)
             if not storage_data:
                 return False
             
-            # Применяем localStorage
-            if 'localStorage' in storage_data:
-                for key, value in storage_data['localStorage'].items():
-                    try:
-                        driver.execute_script(f"window.localStorage.setItem('{key}', '{value}');")
-                    except:
-                        continue
+            bundles, dropped = self.storage_by_origin(storage_data)
+            if not bundles:
+                if not storage_data.get('origin') and not isinstance(storage_data.get('origins'), dict):
+                    print(f"⚠️ В storage данных ({platform or 'общие'}) нет origin - восстановление пропущено. "
+                          "Переэкспортируйте авторизацию: auth_platforms.py и simple_auth.py сохраняют origin")
+                return False
             
-            # Применяем sessionStorage
-            if 'sessionStorage' in storage_data:
-                for key, value in storage_data['sessionStorage'].items():
-                    try:
-                        driver.execute_script(f"window.sessionStorage.setItem('{key}', '{value}');")
-                    except:
-                        continue
+            prepared = failed = 0
+            for origin, items in bundles.items():
+                count = len(items['localStorage']) + len(items['sessionStorage'])
+                payload = json.dumps({'id': uuid.uuid4().hex, 'origin': origin, **items}, ensure_ascii=False)
+                try:
+                    script = driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+                        'source': STORAGE_RESTORE_SCRIPT.replace('__PAYLOAD__', payload)
+                    })
+                    self._storage_scripts.setdefault(driver, []).append((script.get('identifier'), origin))
+                    prepared += count
+                except Exception as e:
+                    failed += count
+                    print(f"❌ Не удалось зарегистрировать storage для {origin}: {e}")
             
-            print("✅ Применены storage данные")
-            return True
+            print(f"✅ Storage: {prepared} записей для {len(bundles)} origin, ошибок {failed}, отброшено служебных {dropped}")
+            return prepared > 0
             
         except Exception as e:
             print(f"❌ Ошибка применения storage данных: {e}")
             return False
     
-    def check_auth_files_exist(self) -> Dict[str, bool]:
+    def reset_browser_state(self, driver) -> bool:
+        """Убрать авторизацию прошлой встречи из браузера (пул): cookies, storage платформ, скрипты восстановления"""
+        try:
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            origins = set(PLATFORM_ORIGINS.values())
+            for identifier, origin in self._storage_scripts.pop(driver, []):
+                origins.add(origin)
+                if identifier:
+                    driver.execute_cdp_cmd('Page.removeScriptToEvaluateOnNewDocument', {'identifier': identifier})
+            for origin in origins:
+                driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+                    'origin': origin, 'storageTypes': 'local_storage,indexeddb,cache_storage,service_workers'
+                })
+            return True
+        except Exception as e:
+            print(f"❌ Не удалось сбросить состояние браузера: {e}")
+            return False
+    
+    @staticmethod
+    def storage_report(driver) -> Optional[Dict]:
+        """Итог восстановления storage на текущей странице (None - для ее origin ничего не было)"""
+        try:
+            return driver.execute_script("return window.__mbStorageRestore || null;")
+        except Exception:
+            return None
+    
+    def check_auth_files_exist(self, platform: Optional[str] = None) -> Dict[str, bool]:
         """Проверить наличие файлов авторизации"""
+        cookies_path, storage_path = self.platform_paths(platform)
         return {
             'playwright_cookies': os.path.exists(self.cookies_path),
-            'selenium_cookies': os.path.exists(self.selenium_cookies_path),
-            'storage_data': os.path.exists(self.storage_path)
+            'selenium_cookies': bool(cookies_path) and os.path.exists(cookies_path),
+            'storage_data': bool(storage_path) and os.path.exists(storage_path)
         }
     
-    def get_auth_status(self) -> str:
+    def get_auth_status(self, platform: Optional[str] = None) -> str:
         """Получить статус авторизации"""
-        files_status = self.check_auth_files_exist()
+        files_status = self.check_auth_files_exist(platform)
         
-        if all(files_status.values()):
+        if self.has_platform_bundle(platform):
+            return f"✅ Авторизация платформы {self.platform_name(platform)}"
+        elif all(files_status.values()):
             return "✅ Полная авторизация доступна"
         elif files_status['selenium_cookies']:
             return "⚠️ Частичная авторизация (только cookies)"
         else:
             return "❌ Авторизация не настроена"
     
-    def setup_authenticated_driver(self, driver) -> bool:
-        """Настроить драйвер с авторизацией"""
+    def setup_authenticated_driver(self, driver, platform: Optional[str] = None) -> bool:
+        """Настроить драйвер с авторизацией платформы встречи (platform - тип из detect_meeting_type)"""
         try:
-            # Применяем cookies
-            cookies_applied = self.apply_selenium_cookies(driver)
+            # Применяем cookies: одним вызовом CDP, а если драйвер его не поддерживает - по одной
+            try:
+                cookies_applied = self.apply_cookies_cdp(driver, platform)
+            except Exception as e:
+                print(f"⚠️ CDP недоступен для cookies ({e}), применяем через WebDriver")
+                cookies_applied = self.apply_selenium_cookies(driver, platform)
             
             # Применяем storage данные
-            storage_applied = self.apply_storage_data(driver)
+            storage_applied = self.apply_storage_data(driver, platform)
             
             if cookies_applied or storage_applied:
                 print("✅ Драйвер настроен с авторизацией")
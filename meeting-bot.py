@@ -11,11 +11,12 @@ import json
 import asyncio
 import logging
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import subprocess
 import tempfile
 import re
 import time
+import threading
 from pathlib import Path
 
 # Selenium для автоматизации браузера
@@ -32,7 +33,23 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
 
 # Whisper для транскрипции
-from faster_whisper import WhisperModel
+from transcription import MultiPartWavSource, ClosedSegmentsSource, PcmRingBuffer, LiveTranscriber
+from transcription import DEFAULT_TRANSCRIBE_OPTIONS
+from transcription_service import TranscriptionService
+from transcript_cache import TranscriptCache
+from recorder import FfmpegRecorder, RecordingManifest, CaptureSourceResolver, get_record_format
+from recorder import PCM_SAMPLE_RATE
+from audio_level import AudioLevelMeter
+from browser_capture import BrowserAudioCapture, BROWSER_INPUT_ARGS, install_hook
+from driver_pool import DriverPool
+from process_tree import ProcessTree
+from chrome_profiles import ProfileTemplateManager
+from pulse_sink import PulseSink, pulse_available, cleanup_stale_sinks
+from join_waits import JoinWaiter, page_ready, visible, url_changed, url_contains, any_of
+from selector_registry import candidates, candidate_key, query, find_best, find_all, click_match, describe_match
+from strategy_stats import StrategyStats, ui_fingerprint
+from join_metrics import JoinMetrics
+from diagnostics import ScreenshotRing, enforce_disk_budget, collect_legacy_screenshots
 
 # GitHub
 from github import Github
@@ -51,9 +68,48 @@ TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', '')
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN', '')
 GITHUB_REPO = os.getenv('GITHUB_REPO', 'goqorhopar/b24')
 WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'medium')
+WHISPER_DEVICE = os.getenv('WHISPER_DEVICE', 'cpu')
+WHISPER_COMPUTE_TYPE = os.getenv('WHISPER_COMPUTE_TYPE', 'int8')
+WHISPER_PRELOAD = os.getenv('WHISPER_PRELOAD', '1') == '1'  # Загружать модель при старте
+TRANSCRIBE_WORKERS = int(os.getenv('TRANSCRIBE_WORKERS', '1'))  # Процессов транскрипции
+TRANSCRIBE_QUEUE = int(os.getenv('TRANSCRIBE_QUEUE', '8'))  # Максимум заданий в очереди
+TRANSCRIBE_POOL = os.getenv('TRANSCRIBE_POOL', 'process')  # process или thread
+TRANSCRIBE_BATCH_SIZE = int(os.getenv('TRANSCRIBE_BATCH_SIZE', '0'))  # 0 - без батчей
+TRANSCRIBE_BATCH_WINDOW_SEC = float(os.getenv('TRANSCRIBE_BATCH_WINDOW_SEC', '2'))  # Окно сбора батча
+PARALLEL_MIN_SEC = int(os.getenv('PARALLEL_MIN_SEC', '600'))  # С какой длины резать запись на куски
+PARALLEL_OVERLAP_SEC = float(os.getenv('PARALLEL_OVERLAP_SEC', '1'))  # Перекрытие соседних кусков
+TRANSCRIPT_CACHE_MB = int(os.getenv('TRANSCRIPT_CACHE_MB', '200'))  # Лимит кэша транскриптов
+RECORD_STALL_SEC = int(os.getenv('RECORD_STALL_SEC', '30'))  # Без прогресса ffmpeg столько секунд - перезапуск
+RECORD_FORMAT = os.getenv('RECORD_FORMAT', 'wav')  # wav (моно PCM), flac или opus
+RECORD_OPUS_BITRATE = os.getenv('RECORD_OPUS_BITRATE', '24k')  # Битрейт для RECORD_FORMAT=opus
+RECORD_SEGMENT_SEC = int(os.getenv('RECORD_SEGMENT_SEC', '300'))  # Длина сегмента записи, 0 - один файл
+RECORD_BACKEND = os.getenv('RECORD_BACKEND', 'device')  # device - аудиоустройство, browser - WebRTC из вкладки
+RECORD_CAPTURE = os.getenv('RECORD_CAPTURE', 'file')  # file - через файл, pipe - PCM из ffmpeg в память
+RECORD_ARCHIVE = os.getenv('RECORD_ARCHIVE', '1') == '1'  # В режиме pipe дополнительно сохранять запись
+PCM_BUFFER_SEC = int(os.getenv('PCM_BUFFER_SEC', '600'))  # Емкость буфера PCM в режиме pipe
+RECORD_RESUME_MIN = int(os.getenv('RECORD_RESUME_MIN', '30'))  # Сколько минут можно продолжить прерванную запись
 RECORD_DIR = os.getenv('RECORD_DIR', '/opt/meeting-bot/recordings')
+SILENCE_ALERT_SEC = int(os.getenv('SILENCE_ALERT_SEC', '60'))  # Тишина в записи столько секунд - тревога, 0 - выкл
+SILENCE_THRESHOLD_DBFS = float(os.getenv('SILENCE_THRESHOLD_DBFS', '-60'))  # Тише этого уровня - тишина
+AUDIO_ISOLATION = os.getenv('AUDIO_ISOLATION', '1') == '1'  # Свой PulseAudio sink на каждую встречу
 MEETING_TIMEOUT_MIN = int(os.getenv('MEETING_TIMEOUT_MIN', '180'))  # 3 часа по умолчанию
 CHROME_PROFILE_DIR = os.getenv('CHROME_PROFILE_DIR', '/opt/meeting-bot/chrome-profile')
+PROFILE_TEMPLATE = os.getenv('PROFILE_TEMPLATE', '1') == '1'  # Копировать профиль из готового шаблона с авторизацией
+CHROME_TEMPLATE_DIR = os.getenv('CHROME_TEMPLATE_DIR', '/opt/meeting-bot/chrome-template')
+CHROME_SESSIONS_DIR = os.getenv('CHROME_SESSIONS_DIR', '/opt/meeting-bot/chrome-sessions')
+PROFILE_TEMPLATE_MAX_AGE_H = float(os.getenv('PROFILE_TEMPLATE_MAX_AGE_H', '24'))  # Шаблон старше - пересобирается
+DRIVER_POOL_SIZE = int(os.getenv('DRIVER_POOL_SIZE', '0'))  # Сколько Chrome держать запущенными, 0 - без пула (каждый ~300-500 МБ)
+DRIVER_POOL_MAX_USES = int(os.getenv('DRIVER_POOL_MAX_USES', '5'))  # После стольких встреч браузер перезапускается
+DRIVER_POOL_MAX_RSS_MB = int(os.getenv('DRIVER_POOL_MAX_RSS_MB', '1500'))  # Или если Chrome занял больше памяти
+STRATEGY_STATS = os.getenv('STRATEGY_STATS', '1') == '1'  # Сначала пробовать селекторы, которые срабатывали раньше
+STRATEGY_HALF_LIFE_DAYS = float(os.getenv('STRATEGY_HALF_LIFE_DAYS', '7'))  # За столько дней вес статистики падает вдвое
+JOIN_METRICS_SAMPLES = int(os.getenv('JOIN_METRICS_SAMPLES', '500'))  # Сколько последних замеров этапа входа хранить
+DIAG_SCREENSHOTS = int(os.getenv('DIAG_SCREENSHOTS', '8'))  # Снимков последних шагов входа в памяти, 0 - без снимков
+DIAG_SCREENSHOT_WIDTH = int(os.getenv('DIAG_SCREENSHOT_WIDTH', '960'))  # Ширина снимка (JPEG, уменьшается в Chrome)
+DIAG_DIR = os.getenv('DIAG_DIR', os.path.join(RECORD_DIR, 'diagnostics'))  # Снимки неудачных входов
+DIAG_DISK_MB = float(os.getenv('DIAG_DISK_MB', '50'))  # Сколько места на диске могут занимать снимки
+LIVE_TRANSCRIPTION = os.getenv('LIVE_TRANSCRIPTION', '1') == '1'  # Транскрипция во время записи
+LIVE_CHUNK_SEC = int(os.getenv('LIVE_CHUNK_SEC', '120'))  # Длина фрагмента живой транскрипции
 
 # Директории
 Path(RECORD_DIR).mkdir(parents=True, exist_ok=True)
@@ -66,25 +122,74 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Пул транскрипции: Whisper работает вне event loop Telegram
+transcription_service = TranscriptionService(
+    WHISPER_MODEL, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE,
+    workers=TRANSCRIBE_WORKERS,
+    max_queue=TRANSCRIBE_QUEUE,
+    use_processes=(TRANSCRIBE_POOL == 'process'),
+    batch_size=TRANSCRIBE_BATCH_SIZE,
+    batch_window_sec=TRANSCRIBE_BATCH_WINDOW_SEC
+)
+
+# Кэш транскриптов: повторная транскрипция той же записи не гоняет Whisper заново
+transcript_cache = TranscriptCache(
+    os.path.join(RECORD_DIR, '.transcript_cache'),
+    max_bytes=TRANSCRIPT_CACHE_MB * 1024 * 1024
+)
+# Рабочий источник звука определяется один раз и переживает перезапуск бота
+capture_resolver = CaptureSourceResolver(os.path.join(RECORD_DIR, 'capture_source.json'))
+# Какие селекторы и варианты входа срабатывают на каждой платформе (с затуханием под выкатки интерфейса)
+strategy_stats = StrategyStats(
+    os.path.join(RECORD_DIR, 'strategy_stats.json'),
+    half_life_sec=STRATEGY_HALF_LIFE_DAYS * 24 * 3600
+) if STRATEGY_STATS else None
+# Время этапов входа по платформам (p50/p95/p99): /joinstats
+join_metrics = JoinMetrics(os.path.join(RECORD_DIR, 'join_metrics.json'), max_samples=JOIN_METRICS_SAMPLES)
+TRANSCRIPT_CACHE_PARAMS = {
+    'model': WHISPER_MODEL,
+    'compute_type': WHISPER_COMPUTE_TYPE,
+    **DEFAULT_TRANSCRIBE_OPTIONS,
+}
+
 
 class MeetingBot:
     """Основной класс для работы с встречами"""
     
-    def __init__(self):
+    def __init__(self, connect_github: bool = True):
         self.driver = None
         self.recording = False
         self.audio_file = None
         self.transcript = []
-        self.recording_process = None
+        self.recorder = None
+        self._stop_lock = threading.Lock()  # Остановку зовут и мониторинг, и кнопка - склейка одна
+        self.record_format = None
         self.meeting_url = None
+        self.meeting_type = None  # Тип встречи (detect_meeting_type): какой набор авторизации применять
         self.start_time = None
         self.monitoring_task = None
         self.meeting_active = True
         self.auth_loader = get_auth_loader()
         self._temp_profile_dir = None
+        self.live_transcriber = None
+        self.pcm_buffer = None
+        self.level_meter = None
+        self.audio_sink = None
+        self.browser_capture = None
+        self.chat_id = None  # Чат пользователя для уведомлений во время встречи
+        self._pool_session = None  # Сессия Chrome, взятая из пула
+        self._process_tree = None  # chromedriver и все процессы Chrome этой сессии
+        self._strategy_choices = {}  # (платформа, группа) -> {key, fingerprint, started, seconds} этого входа
+        self._fingerprint = (None, None)  # (URL страницы, отпечаток ее интерфейса)
+        self._open_phases = []  # Замеры этапов текущего входа (незавершенные закрываются в join_meeting)
+        self.diagnostics = ScreenshotRing(DIAG_SCREENSHOTS, DIAG_SCREENSHOT_WIDTH)  # Снимки шагов входа
+        self._failure_tag = None  # Причина неудачного входа (для подписи к снимкам)
         
         # Инициализация GitHub
-        if GITHUB_TOKEN:
+        if not connect_github:
+            self.github = None
+            self.repo = None
+        elif GITHUB_TOKEN:
             try:
                 self.github = Github(GITHUB_TOKEN)
                 self.repo = self.github.get_repo(GITHUB_REPO)
@@ -98,17 +203,45 @@ class MeetingBot:
             self.repo = None
             logger.warning("GitHub токен не настроен")
         
-        # Инициализация Whisper модели
-        try:
-            logger.info(f"Загрузка Whisper модели: {WHISPER_MODEL}")
-            self.whisper_model = WhisperModel(WHISPER_MODEL, device="cpu", compute_type="int8")
-            logger.info("Whisper модель загружена")
-        except Exception as e:
-            logger.error(f"Ошибка загрузки Whisper: {e}")
-            self.whisper_model = None
-        
     def setup_driver(self, headless=True):
-        """Настройка Chrome драйвера для VPS"""
+        """Настройка Chrome драйвера для VPS: готовый из пула или новый запуск"""
+        with join_metrics.phase(self.meeting_type, 'setup_driver') as timer:
+            if headless and driver_pool and self._take_pooled_driver():
+                timer.stop('pool')
+                return
+            self._launch_driver(headless)
+
+    def _take_pooled_driver(self) -> bool:
+        """Взять заранее запущенный Chrome и применить авторизацию платформы встречи"""
+        if self._pool_session:
+            # Прошлый браузер из пула упал - обратно его не возвращаем
+            self._force_cleanup_driver()
+        session = driver_pool.acquire()
+        if not session:
+            logger.info("Пул Chrome пуст, запускаем браузер")
+            return False
+        self._terminate_browser_tree()  # Остатки своего упавшего Chrome
+        self._pool_session = session
+        self.driver = session['driver']
+        self._process_tree = session.get('process_tree')
+        self._temp_profile_dir = session['profile_dir']
+        if session.get('audio_sink'):
+            self.audio_sink = session['audio_sink']
+        logger.info(f"⚡ Chrome взят из пула (встреча {session['uses'] + 1} для этого браузера)")
+        # Браузеры пула запускаются без авторизации: здесь - только набор платформы встречи,
+        # а после прошлой встречи сначала убираем ее cookies и storage
+        with join_metrics.phase(self.meeting_type, 'auth') as timer:
+            if session['uses'] > 0:
+                self.auth_loader.reset_browser_state(self.driver)
+            if not any(self.auth_loader.check_auth_files_exist(self.meeting_type).values()):
+                timer.stop('none')
+            elif not self.auth_loader.setup_authenticated_driver(self.driver, self.meeting_type):
+                timer.stop('fail')
+        return True
+
+    def _launch_driver(self, headless=True, template_dir=None, auth=True):
+        """Запуск нового Chrome с временным профилем и авторизацией платформы встречи.
+        template_dir - сборка шаблона, auth=False - браузер для пула (оба без авторизации)"""
         options = Options()
 
         # Критичные настройки для headless режима
@@ -174,8 +307,17 @@ class MeetingBot:
         import shutil
         import os
         
-        # Создаем временную директорию профиля
-        temp_profile_dir = tempfile.mkdtemp(prefix='meetingbot_chrome_')
+        # Профиль сессии: копия шаблона (без авторизации), иначе пустой (под сборкой мусора)
+        cloned = False
+        if template_dir:
+            temp_profile_dir = template_dir
+        elif profile_templates:
+            temp_profile_dir = profile_templates.clone()
+            cloned = temp_profile_dir is not None
+            if not temp_profile_dir:
+                temp_profile_dir = profile_templates.empty()
+        else:
+            temp_profile_dir = tempfile.mkdtemp(prefix='meetingbot_chrome_')
         options.add_argument(f'--user-data-dir={temp_profile_dir}')
         
         # Дополнительные флаги для предотвращения ошибок JSON
@@ -204,11 +346,12 @@ class MeetingBot:
         options.add_argument('--password-store=basic')
         options.add_argument('--use-mock-keychain')
         
-        # Копируем существующий профиль если он есть (только безопасные файлы)
-        if os.path.exists(CHROME_PROFILE_DIR):
+        # Копируем настройки существующего профиля (в копии шаблона они уже есть).
+        # Cookies и Login Data не копируем: в них вход во все платформы сразу
+        if os.path.exists(CHROME_PROFILE_DIR) and not cloned:
             try:
                 # Копируем только безопасные файлы профиля
-                safe_files = ['Default/Preferences', 'Default/Cookies', 'Default/Login Data']
+                safe_files = ['Default/Preferences']
                 for safe_file in safe_files:
                     src = os.path.join(CHROME_PROFILE_DIR, safe_file)
                     dst = os.path.join(temp_profile_dir, safe_file)
@@ -220,42 +363,56 @@ class MeetingBot:
             except Exception as e:
                 logger.warning(f"Не удалось скопировать профиль: {e}")
         
-        # Сохраняем путь для последующей очистки
-        self._temp_profile_dir = temp_profile_dir
+        # Сохраняем путь для последующей очистки (шаблон не удаляем)
+        self._temp_profile_dir = None if template_dir else temp_profile_dir
 
+        # Процессы прошлого драйвера этой сессии (если он упал и пересоздается)
+        self._terminate_browser_tree()
+        
         # Инициализация драйвера с повторными попытками
         max_attempts = 3
         for attempt in range(1, max_attempts + 1):
+            service = None
             try:
                 logger.info(f"Попытка инициализации Chrome {attempt}/{max_attempts}")
                 
-                # Принудительно убиваем все процессы Chrome перед запуском
-                if attempt > 1:
-                    try:
-                        import subprocess
-                        subprocess.run(['pkill', '-f', 'chrome'], capture_output=True, timeout=5)
-                        time.sleep(2)
-                    except Exception:
-                        pass
-                
-                self.driver = webdriver.Chrome(options=options)
+                # Звук Chrome идет в sink этой встречи (PULSE_SINK наследуется от chromedriver)
+                # Своя сессия процессов: при очистке завершаем только этот Chrome, а не все на сервере
+                sink_env = None if template_dir else self._audio_sink_env()
+                service = Service(env=sink_env, popen_kw={'start_new_session': True})
+                self.driver = webdriver.Chrome(service=service, options=options)
+                self._process_tree = ProcessTree.for_service(service)
                 self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+                if RECORD_BACKEND == 'browser':
+                    # Перехват WebRTC должен быть на странице раньше скриптов встречи
+                    install_hook(self.driver)
                 logger.info(f"Chrome драйвер инициализирован с временным профилем: {temp_profile_dir}")
 
-                # Применяем сохраненные данные авторизации
-                auth_status = self.auth_loader.get_auth_status()
+                # Шаблон и пул - общие для всех платформ, поэтому без авторизации:
+                # чужое состояние (Google, Microsoft) не должно попадать во встречу другой платформы
+                if template_dir or not auth:
+                    break
+
+                # Применяем сохраненные данные авторизации платформы встречи
+                auth_timer = join_metrics.start(self.meeting_type, 'auth')
+                platform = self.meeting_type
+                auth_status = self.auth_loader.get_auth_status(platform)
                 logger.info(f"Статус авторизации: {auth_status}")
 
                 # Применяем авторизацию только если файлы существуют
-                auth_files = self.auth_loader.check_auth_files_exist()
+                auth_files = self.auth_loader.check_auth_files_exist(platform)
                 if any(auth_files.values()):
-                    if self.auth_loader.setup_authenticated_driver(self.driver):
+                    if self.auth_loader.setup_authenticated_driver(self.driver, platform):
                         logger.info("✅ Драйвер настроен с авторизацией")
+                        auth_outcome = 'ok'
                     else:
                         logger.warning("⚠️ Не удалось применить авторизацию")
+                        auth_outcome = 'fail'
                 else:
                     logger.warning("⚠️ Файлы авторизации не найдены - возможны проблемы с закрытыми встречами")
                     logger.info("💡 Запустите: python simple_auth.py для настройки авторизации")
+                    auth_outcome = 'none'
+                auth_timer.stop(auth_outcome)
                 
                 # Если дошли сюда - успешно инициализировали
                 break
@@ -272,6 +429,12 @@ class MeetingBot:
                         pass
                     self.driver = None
                 
+                # Добиваем Chrome этой попытки (он держит блокировку профиля)
+                failed_tree = self._process_tree or ProcessTree.for_service(service)
+                self._process_tree = None
+                if failed_tree:
+                    failed_tree.terminate()
+                
                 # Если это последняя попытка или не JSON ошибка - выбрасываем исключение
                 if attempt == max_attempts or 'json' not in error_msg:
                     logger.error(f"Не удалось инициализировать Chrome после {max_attempts} попыток")
@@ -280,8 +443,28 @@ class MeetingBot:
                 # Ждем перед следующей попыткой
                 time.sleep(3)
 
+    def _audio_sink_env(self) -> Optional[Dict[str, str]]:
+        """Создать sink встречи (один раз); окружение для Chrome или None"""
+        if not AUDIO_ISOLATION or RECORD_BACKEND == 'browser':
+            return None
+        if self.audio_sink is None:
+            sink = PulseSink()
+            if not pulse_available() or not sink.create():
+                logger.warning("⚠️ Изолированный аудио sink недоступен - запись с общего устройства")
+                return None
+            self.audio_sink = sink
+        return self.audio_sink.chrome_env()
+
     def safe_get(self, url: str, retries: int = 2) -> bool:
-        """Безопасная загрузка URL с перезапуском драйвера при краше вкладки"""
+        """Безопасная загрузка URL с перезапуском драйвера при краше вкладки (с замером времени)"""
+        with join_metrics.phase(self.meeting_type, 'safe_get') as timer:
+            loaded = self._load_url(url, retries)
+            if not loaded:
+                timer.stop('fail')
+        return loaded
+
+    def _load_url(self, url: str, retries: int) -> bool:
+        """Загрузка URL: при краше вкладки драйвер пересоздается и попытка повторяется"""
         for attempt in range(1, retries + 1):
             try:
                 # Проверяем, что драйвер существует и активен
@@ -290,7 +473,14 @@ class MeetingBot:
                     self.setup_driver(headless=True)
                 
                 self.driver.get(url)
-                time.sleep(3)
+                JoinWaiter(self.driver).until(page_ready(), 15, "загрузка страницы")
+                self._diag('loaded')
+                restore = self.auth_loader.storage_report(self.driver)
+                if restore and not restore.get('repeated'):
+                    logger.info(
+                        f"Storage восстановлен для {restore['origin']}: "
+                        f"применено {restore['applied']}, ошибок {restore['failed']}"
+                    )
                 return True
                 
             except WebDriverException as e:
@@ -332,8 +522,18 @@ class MeetingBot:
                 
         return False
 
-    def _force_cleanup_driver(self):
+    def _force_cleanup_driver(self, reusable: bool = False):
         """Принудительная очистка драйвера для предотвращения утечек памяти"""
+        if self._pool_session:
+            # Браузер из пула возвращаем в пул (или на утилизацию) вместе с его профилем и sink'ом
+            session, self._pool_session = self._pool_session, None
+            if self.audio_sink is session.get('audio_sink'):
+                self.audio_sink = None
+            self.driver = None
+            self._temp_profile_dir = None
+            self._process_tree = None
+            driver_pool.release(session, reusable=reusable)
+            return
         try:
             if self.driver:
                 # Закрываем все окна
@@ -342,16 +542,12 @@ class MeetingBot:
                 except Exception:
                     pass
                 
-                # Принудительно убиваем процесс Chrome если он завис
-                try:
-                    import subprocess
-                    subprocess.run(['pkill', '-f', 'chrome'], capture_output=True, timeout=5)
-                except Exception:
-                    pass
-                
                 self.driver = None
                 logger.info("Драйвер принудительно очищен")
             
+            # Завершаем только процессы этой сессии, если Chrome завис
+            self._terminate_browser_tree()
+            
             # Очищаем временную директорию профиля
             if hasattr(self, '_temp_profile_dir') and self._temp_profile_dir:
                 try:
@@ -367,6 +563,15 @@ class MeetingBot:
         except Exception as e:
             logger.debug(f"Ошибка принудительной очистки драйвера: {e}")
         
+    def _terminate_browser_tree(self):
+        """SIGTERM, затем SIGKILL процессам chromedriver/Chrome этой сессии"""
+        tree, self._process_tree = self._process_tree, None
+        if tree:
+            try:
+                tree.terminate()
+            except Exception as e:
+                logger.debug(f"Ошибка завершения процессов браузера: {e}")
+        
     def detect_meeting_type(self, url: str) -> str:
         """Определить тип встречи по URL"""
         url_lower = url.lower()
@@ -383,6 +588,87 @@ class MeetingBot:
         else:
             return 'unknown'
     
+    def join_meeting(self, meeting_url: str) -> bool:
+        """Войти во встречу по типу ссылки и учесть сработавшие стратегии"""
+        joiners = {
+            'google_meet': self.join_google_meet,
+            'zoom': self.join_zoom_meeting,
+            'yandex': self.join_yandex_telemost,
+            'contour': self.join_contour_talk,
+        }
+        platform = self.meeting_type or self.detect_meeting_type(meeting_url)
+        if platform not in joiners:
+            return False
+        self._strategy_choices = {}
+        self._open_phases = []
+        self._failure_tag = None
+        self.diagnostics.clear()
+        with join_metrics.phase(platform, 'join_total') as timer:
+            success = bool(joiners[platform](meeting_url))
+            if not success:
+                timer.stop('fail')
+        # Этапы, прерванные исключением или ранним выходом
+        for phase_timer in self._open_phases:
+            phase_timer.stop('abandoned')
+        self._open_phases = []
+        if not success:
+            self._report_join_failure(platform)
+        if strategy_stats:
+            # Время - шага, где кандидат использован (поиск и нажатие), а не всего входа
+            for (choice_platform, group), choice in self._strategy_choices.items():
+                strategy_stats.record(choice_platform, group, choice['key'], success,
+                                      choice['seconds'], choice['fingerprint'])
+            logger.info(strategy_stats.describe(platform))
+        return success
+
+    def _start_phase(self, phase: str):
+        """Начать замер этапа входа (stop(исход) - по его окончании)"""
+        timer = join_metrics.start(self.meeting_type, phase)
+        self._open_phases.append(timer)
+        return timer
+
+    def _ui_fingerprint(self) -> str:
+        """Отпечаток интерфейса текущей страницы (пересчитывается при смене URL)"""
+        url = self.driver.current_url.split('#')[0]
+        if self._fingerprint[0] != url:
+            self._fingerprint = (url, ui_fingerprint(self.driver))
+        return self._fingerprint[1]
+
+    def _find(self, platform: str, group: str, **options) -> Optional[Dict[str, Any]]:
+        """Совпадение группы реестра; выбор учитывается в итоге входа.
+        Группа проверяется одним запросом, так что порядок статистики решает лишь, какое из совпадений взять"""
+        started = time.monotonic()
+        items = candidates(platform, group)
+        fingerprint = None
+        if strategy_stats and items:
+            fingerprint = self._ui_fingerprint()
+            by_key = {candidate_key(item): item for item in items}
+            items = [by_key[key] for key in strategy_stats.order_keys(platform, group, list(by_key), fingerprint)]
+        results = query(self.driver, items, **options)
+        if not results:
+            return None
+        if fingerprint:
+            self._strategy_choices[(platform, group)] = {
+                'key': results[0]['key'], 'fingerprint': fingerprint,
+                'started': started, 'seconds': time.monotonic() - started,
+            }
+            results[0]['strategy'] = (platform, group)
+        return results[0]
+
+    def _click(self, match: Dict[str, Any]) -> bool:
+        """Нажать совпадение из _find; время шага стратегии - от поиска до нажатия"""
+        clicked = click_match(self.driver, match)
+        choice = self._strategy_choices.get(match.get('strategy'))
+        if choice:
+            choice['seconds'] = time.monotonic() - choice['started']
+        return clicked
+
+    def _ordered_variants(self, platform: str, group: str, variants: List[str]) -> List[str]:
+        """Варианты сценария в порядке статистики стратегий"""
+        if not strategy_stats:
+            return variants
+        return strategy_stats.order_keys(platform, group, variants, self._ui_fingerprint())
+
     def join_google_meet(self, meeting_url: str, name: str = "Meeting Bot") -> bool:
         """Присоединиться к Google Meet с улучшенной логикой и диагностикой"""
         try:
@@ -394,9 +680,13 @@ class MeetingBot:
                 logger.error("[Google Meet] Не удалось загрузить страницу")
                 return False
 
-            # УВЕЛИЧЕНО время ожидания загрузки
+            # Ждем экран предпросмотра (поле имени или кнопку входа) или редирект на вход в аккаунт
             logger.info("[Google Meet] Ожидание загрузки страницы...")
-            time.sleep(12)  # Было 8, стало 12
+            waiter = JoinWaiter(self.driver, "Google Meet")
+            waiter.until(any_of(
+                visible(candidates('google_meet', 'prejoin')),
+                url_contains("accounts.google.com"),
+            ), 20, "экран предпросмотра")
             
             # Диагностика 1: Проверяем текущий URL
             current_url = self.driver.current_url
@@ -405,138 +695,72 @@ class MeetingBot:
             # Проверка авторизации
             if "accounts.google.com" in current_url:
                 logger.warning("[Google Meet] Требуется авторизация Google")
-                self._capture_and_notify("googlemeet_auth_required")
+                self._mark_join_failure("googlemeet_auth_required")
                 return False
             
-            # Диагностика 2: Сохраняем скриншот начального состояния
-            try:
-                self.driver.save_screenshot("/tmp/meet_step1_loaded.png")
-                logger.info("[Google Meet] Скриншот 1: страница загружена")
-            except:
-                pass
+            # Диагностика 2: снимок экрана предпросмотра (в фоне, в буфер)
+            self._diag('prejoin')
             
             # Заполняем имя
+            timer = self._start_phase('name_fill')
             name_filled = False
             try:
                 logger.info("[Google Meet] Ищем поле ввода имени...")
-                name_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input[type='text']")
-                logger.info(f"[Google Meet] Найдено полей ввода: {len(name_inputs)}")
-                
-                for inp in name_inputs:
-                    try:
-                        if not inp.is_displayed():
-                            continue
-                        placeholder = (inp.get_attribute('placeholder') or '').lower()
-                        aria_label = (inp.get_attribute('aria-label') or '').lower()
-                        logger.info(f"[Google Meet] Поле: placeholder='{placeholder}', aria-label='{aria_label}'")
-                        
-                        if 'name' in placeholder or 'имя' in placeholder or 'name' in aria_label:
-                            inp.clear()
-                            inp.send_keys(name)
-                            logger.info(f"[Google Meet] ✅ Введено имя: {name}")
-                            name_filled = True
-                            time.sleep(1)
-                            break
-                    except Exception as e:
-                        logger.debug(f"[Google Meet] Ошибка при работе с полем: {e}")
+                name_input = self._find('google_meet', 'name_input')
+                if name_input:
+                    logger.info(f"[Google Meet] Поле: placeholder='{name_input['placeholder']}', aria-label='{name_input['aria_label']}'")
+                    name_input['element'].clear()
+                    name_input['element'].send_keys(name)
+                    logger.info(f"[Google Meet] ✅ Введено имя: {name}")
+                    name_filled = True
                 
                 if not name_filled:
                     logger.info("[Google Meet] Поле имени не найдено (возможно, не требуется)")
             except Exception as e:
                 logger.debug(f"[Google Meet] Не удалось ввести имя: {e}")
+            timer.stop('ok' if name_filled else 'miss')
 
-            # Диагностика 3: Сохраняем скриншот после ввода имени
-            try:
-                self.driver.save_screenshot("/tmp/meet_step2_name.png")
-                logger.info("[Google Meet] Скриншот 2: после ввода имени")
-            except:
-                pass
+            # Диагностика 3: снимок после ввода имени
+            self._diag('name')
             
             # Отключаем медиа ДО входа
             logger.info("[Google Meet] Попытка отключить медиа до входа...")
-            self._disable_media_before_join()
+            with join_metrics.phase(self.meeting_type, 'media_disable'):
+                self._disable_media_before_join()
             
-            # Ищем кнопку Join
+            # Ищем кнопку Join: все селекторы и поиск по тексту - за один запрос к странице
             logger.info("[Google Meet] Ищем кнопку присоединения...")
+            timer = self._start_phase('join_click')
             join_clicked = False
-            
-            join_patterns = [
-                ('css', "button[aria-label*='Join now' i]"),
-                ('css', "button[aria-label*='Ask to join' i]"),
-                ('css', "button[jsname='Qx7uuf']"),
-                ('xpath', "//button[contains(translate(., 'JOIN', 'join'), 'join')]"),
-                ('xpath', "//button[contains(., 'Join now')]"),
-                ('xpath', "//button[contains(., 'Ask to join')]"),
-                ('xpath', "//button[contains(., 'Присоединиться')]"),
-                ('xpath', "//span[contains(translate(., 'JOIN', 'join'), 'join')]/parent::button"),
-            ]
-            
-            for method, selector in join_patterns:
-                try:
-                    if method == 'css':
-                        buttons = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    else:
-                        buttons = self.driver.find_elements(By.XPATH, selector)
-                    
-                    logger.info(f"[Google Meet] Селектор {selector}: найдено {len(buttons)} кнопок")
-                    
-                    for btn in buttons:
-                        try:
-                            if btn.is_displayed() and btn.is_enabled():
-                                btn_text = btn.text or btn.get_attribute('aria-label') or 'unknown'
-                                logger.info(f"[Google Meet] Пытаюсь нажать кнопку: '{btn_text}'")
-                                btn.click()
-                                logger.info(f"[Google Meet] ✅ Нажата кнопка: '{btn_text}'")
-                                join_clicked = True
-                                time.sleep(10)  # УВЕЛИЧЕНО с 8 до 10
-                                break
-                        except Exception as e:
-                            logger.debug(f"[Google Meet] Не удалось нажать кнопку: {e}")
-                    
+            try:
+                join_button = self._find('google_meet', 'join', enabled=True)
+                if join_button:
+                    logger.info(f"[Google Meet] Пытаюсь нажать кнопку: {describe_match(join_button)}")
+                    join_clicked = self._click(join_button)
                     if join_clicked:
-                        break
-                except Exception as e:
-                    logger.debug(f"[Google Meet] Ошибка с селектором {selector}: {e}")
+                        logger.info(f"[Google Meet] ✅ Нажата кнопка: {describe_match(join_button)}")
+            except Exception as e:
+                logger.debug(f"[Google Meet] Ошибка поиска кнопки Join: {e}")
+            timer.stop('ok' if join_clicked else 'miss')
             
             if not join_clicked:
-                logger.warning("[Google Meet] ⚠️ Не удалось найти кнопку Join стандартными методами")
-                # Последняя попытка - поиск по тексту
-                all_buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                logger.info(f"[Google Meet] Проверяю все кнопки на странице: {len(all_buttons)}")
-                for btn in all_buttons:
-                    try:
-                        text = (btn.text or '').lower()
-                        aria = (btn.get_attribute('aria-label') or '').lower()
-                        if any(word in text or word in aria for word in ['join', 'присоединиться', 'войти']):
-                            if btn.is_displayed() and btn.is_enabled():
-                                logger.info(f"[Google Meet] Найдена кнопка по тексту: '{btn.text or aria}'")
-                                btn.click()
-                                join_clicked = True
-                                time.sleep(10)
-                                break
-                    except:
-                        pass
+                logger.warning("[Google Meet] ⚠️ Не удалось найти кнопку Join")
             
-            # Диагностика 4: Сохраняем скриншот после нажатия Join
-            try:
-                self.driver.save_screenshot("/tmp/meet_step3_clicked.png")
-                logger.info("[Google Meet] Скриншот 3: после нажатия Join")
-            except:
-                pass
+            # Диагностика 4: снимок после нажатия Join
+            self._diag('join_clicked')
             
-            # ОЖИДАЕМ ЗАГРУЗКУ ВСТРЕЧИ
+            # ОЖИДАЕМ ЗАГРУЗКУ ВСТРЕЧИ: панель звонка или сообщение об ошибке
             logger.info("[Google Meet] Ожидание загрузки встречи...")
-            time.sleep(12)  # УВЕЛИЧЕНО с 8 до 12
+            timer = self._start_phase('in_call')
+            waiter.until(any_of(
+                visible(candidates('google_meet', 'in_call')),
+                visible(candidates('google_meet', 'errors')),
+            ), 25, "вход во встречу")
             
-            # Диагностика 5: Финальный URL и скриншот
+            # Диагностика 5: Финальный URL и снимок
             final_url = self.driver.current_url
             logger.info(f"[Google Meet] Финальный URL: {final_url}")
-            
-            try:
-                self.driver.save_screenshot("/tmp/meet_step4_final.png")
-                logger.info("[Google Meet] Скриншот 4: финальное состояние")
-            except:
-                pass
+            self._diag('final')
             
             # УПРОЩЕННАЯ ПРОВЕРКА
             logger.info("[Google Meet] Проверка подключения...")
@@ -544,146 +768,62 @@ class MeetingBot:
             # 1. Проверка URL
             if "meet.google.com" not in final_url:
                 logger.error("[Google Meet] ❌ URL не содержит meet.google.com")
-                self._capture_and_notify("googlemeet_wrong_url")
+                timer.stop('fail')
+                self._mark_join_failure("googlemeet_wrong_url")
                 return False
             
             # 2. Проверка наличия элементов (минимум 1)
-            indicators = [
-                "div[jsname='BOHaEe']",
-                "div[data-is-muted]",
-                "button[aria-label*='camera']",
-                "button[aria-label*='microphone']",
-                "video",
-                "canvas",
-            ]
-            
-            found_count = 0
-            for selector in indicators:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if elements:
-                        found_count += 1
-                        logger.info(f"[Google Meet] ✅ Найден индикатор: {selector} ({len(elements)} шт.)")
-                except:
-                    pass
+            found = find_all(self.driver, 'google_meet', 'indicators', visible=False)
+            for match in found:
+                logger.info(f"[Google Meet] ✅ Найден индикатор: {match['key']} ({match['count']} шт.)")
+            found_count = len(found)
             
             logger.info(f"[Google Meet] Всего найдено индикаторов: {found_count}")
             
             # 3. Проверка ошибок
-            errors = [
-                "Unable to join",
-                "Meeting not found",
-                "Access denied",
-                "Не удалось присоединиться",
-            ]
-            
-            has_error = False
-            for error_text in errors:
-                try:
-                    if self.driver.find_elements(By.XPATH, f"//div[contains(text(), '{error_text}')]"):
-                        logger.error(f"[Google Meet] ❌ Найдена ошибка: {error_text}")
-                        has_error = True
-                        break
-                except:
-                    pass
+            error = find_best(self.driver, 'google_meet', 'errors', visible=False)
+            has_error = error is not None
+            if error:
+                logger.error(f"[Google Meet] ❌ Найдена ошибка: {error['text']}")
             
             # РЕШЕНИЕ: достаточно правильного URL + хотя бы 1 индикатор + нет ошибок
+            timer.stop('ok' if found_count >= 1 and not has_error else 'fail')
             if found_count >= 1 and not has_error:
                 logger.info("[Google Meet] ✅ УСПЕШНО подключились к встрече!")
                 # Отключаем медиа в активной встрече
-                self._disable_media_in_meeting()
+                with join_metrics.phase(self.meeting_type, 'media_disable'):
+                    self._disable_media_in_meeting()
                 return True
             else:
                 logger.warning(f"[Google Meet] ⚠️ Не удалось подтвердить подключение. Индикаторы: {found_count}, Ошибки: {has_error}")
-                self._capture_and_notify("googlemeet_verification_failed")
+                self._mark_join_failure("googlemeet_verification_failed")
                 return False
                 
         except Exception as e:
             logger.error(f"[Google Meet] ❌ Критическая ошибка: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            self._capture_and_notify("googlemeet_exception")
+            self._mark_join_failure("googlemeet_exception")
             return False
     
     def _disable_media_before_join(self):
         """Отключить камеру и микрофон ДО входа в встречу (на экране предпросмотра)"""
         try:
             logger.info("[Media] Поиск кнопок камеры/микрофона на предпросмотре...")
-            
-            # Ищем все видимые кнопки с aria-label
-            buttons = self.driver.find_elements(By.CSS_SELECTOR, "button[aria-label]")
-            logger.info(f"[Media] Найдено кнопок с aria-label: {len(buttons)}")
-            
-            for btn in buttons:
-                try:
-                    if not btn.is_displayed():
-                        continue
-                        
-                    aria_label = (btn.get_attribute('aria-label') or '').lower()
-                    
-                    # Камера
-                    if 'camera' in aria_label or 'видео' in aria_label:
-                        if 'turn off' in aria_label or 'выключить' in aria_label:
-                            btn.click()
-                            logger.info(f"[Media] ✅ Камера отключена: {aria_label}")
-                            time.sleep(0.5)
-                    
-                    # Микрофон
-                    if 'microphone' in aria_label or 'mic' in aria_label or 'микрофон' in aria_label:
-                        if 'turn off' in aria_label or 'выключить' in aria_label or 'mute' in aria_label:
-                            btn.click()
-                            logger.info(f"[Media] ✅ Микрофон отключен: {aria_label}")
-                            time.sleep(0.5)
-                except Exception as e:
-                    logger.debug(f"[Media] Ошибка с кнопкой: {e}")
+            for group, label in (('prejoin_camera_off', 'Камера'), ('prejoin_mic_off', 'Микрофон')):
+                button = find_best(self.driver, 'google_meet', group)
+                if button and click_match(self.driver, button):
+                    logger.info(f"[Media] ✅ {label} отключен(а): {button['aria_label']}")
         except Exception as e:
             logger.debug(f"[Media] Ошибка отключения медиа до входа: {e}")
     
     def _disable_media_in_meeting(self):
         """Отключить камеру и микрофон в активной встрече"""
         try:
-            # Отключаем камеру
-            camera_selectors = [
-                "button[aria-label*='camera' i][data-is-muted='false']",
-                "button[aria-label*='Turn off camera' i]",
-                "div[jscontroller][jsaction*='camera'] button",
-                "button[jsname='BOHaEe']",
-                "button[data-is-muted='false'][aria-label*='camera']",
-            ]
-            
-            for selector in camera_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for el in elements:
-                        aria_label = el.get_attribute('aria-label') or ''
-                        if 'camera' in aria_label.lower() and 'turn off' in aria_label.lower():
-                            el.click()
-                            logger.info("Камера отключена")
-                            time.sleep(0.5)
-                            break
-                except Exception as e:
-                    logger.debug(f"Попытка отключить камеру через {selector}: {e}")
-            
-            # Отключаем микрофон
-            mic_selectors = [
-                "button[aria-label*='microphone' i][data-is-muted='false']",
-                "button[aria-label*='Turn off microphone' i]",
-                "div[jscontroller][jsaction*='microphone'] button",
-                "button[data-is-muted='false'][aria-label*='microphone']",
-            ]
-            
-            for selector in mic_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for el in elements:
-                        aria_label = el.get_attribute('aria-label') or ''
-                        if ('microphone' in aria_label.lower() or 'mic' in aria_label.lower()) and 'turn off' in aria_label.lower():
-                            el.click()
-                            logger.info("Микрофон отключен")
-                            time.sleep(0.5)
-                            break
-                except Exception as e:
-                    logger.debug(f"Попытка отключить микрофон через {selector}: {e}")
+            for group, label in (('camera_off', 'Камера отключена'), ('mic_off', 'Микрофон отключен')):
+                button = find_best(self.driver, 'google_meet', group, visible=False)
+                if button and click_match(self.driver, button):
+                    logger.info(label)
         except Exception as e:
             logger.debug(f"Ошибка при отключении медиа: {e}")
     
@@ -719,56 +859,40 @@ class MeetingBot:
             self.meeting_url = meeting_url
             if not self.safe_get(meeting_url, retries=2):
                 return False
-            time.sleep(5)
+            waiter = JoinWaiter(self.driver, "Zoom")
+            waiter.until(visible(candidates('zoom', 'landing')), 15, "страница встречи")
             
             # Обрабатываем cookie-баннер
             try:
-                cookie_accept = self.driver.find_element(By.XPATH, "//button[contains(text(), 'ACCEPT COOKIES') or contains(text(), 'Accept')]")
-                if cookie_accept.is_displayed():
-                    cookie_accept.click()
+                cookie_accept = find_best(self.driver, 'zoom', 'cookie_accept')
+                if cookie_accept and click_match(self.driver, cookie_accept):
                     logger.info("Приняты cookies")
-                    time.sleep(2)
+                    waiter.settle(0.5, 3, "баннер cookies закрыт")
             except Exception as e:
                 logger.debug(f"Cookie-баннер не найден: {e}")
             
-            # Закрываем всплывающие окна
+            # Закрываем всплывающие окна (по одному за запрос, пока видны)
             try:
-                close_buttons = self.driver.find_elements(By.XPATH, "//button[@aria-label='Close'] | //button[contains(@class, 'close')] | //*[contains(@class, 'close')]")
-                for btn in close_buttons:
-                    if btn.is_displayed():
-                        btn.click()
-                        logger.info("Закрыто всплывающее окно")
-                        time.sleep(1)
+                for _ in range(3):
+                    close_button = find_best(self.driver, 'zoom', 'popup_close')
+                    if not close_button or not click_match(self.driver, close_button):
+                        break
+                    logger.info("Закрыто всплывающее окно")
+                    waiter.settle(0.5, 3, "всплывающее окно закрыто")
             except Exception as e:
                 logger.debug(f"Всплывающие окна не найдены: {e}")
             
             # Ищем кнопку "Join from Browser" / "Launch Meeting"
             try:
-                web_join_selectors = [
-                    "//a[contains(text(), 'Join from Browser')]",
-                    "//button[contains(text(), 'Join from Browser')]",
-                    "//a[contains(text(), 'Launch Meeting')]",
-                    "//button[contains(text(), 'Launch Meeting')]",
-                    "//a[contains(text(), 'browser')]",
-                    "//button[contains(text(), 'browser')]",
-                    "//a[contains(@href, 'web')]",
-                    "//button[contains(@class, 'web')]"
-                ]
-                
-                for selector in web_join_selectors:
-                    try:
-                        elements = self.driver.find_elements(By.XPATH, selector)
-                        for btn in elements:
-                            if btn.is_displayed() and btn.is_enabled():
-                                btn.click()
-                                logger.info(f"Нажата кнопка входа через браузер: {selector}")
-                                time.sleep(5)
-                                break
-                        else:
-                            continue
-                        break
-                    except Exception as e:
-                        logger.debug(f"Селектор {selector} не сработал: {e}")
+                web_join = self._find('zoom', 'web_join', enabled=True)
+                if web_join:
+                    previous_url = self.driver.current_url
+                    if self._click(web_join):
+                        logger.info(f"Нажата кнопка входа через браузер: {describe_match(web_join)}")
+                        waiter.until(any_of(
+                            url_changed(previous_url),
+                            visible(candidates('zoom', 'name')),
+                        ), 15, "веб-клиент")
             except Exception as e:
                 logger.debug(f"Кнопка входа через браузер не найдена: {e}")
             
@@ -785,15 +909,14 @@ class MeetingBot:
                     
                     logger.info(f"Перезагружаем с веб-клиентом: {new_url}")
                     self.driver.get(new_url)
-                    time.sleep(5)
+                    waiter.until(visible(candidates('zoom', 'landing')), 10, "веб-клиент")
                     
                     # Снова обрабатываем cookie-баннер
                     try:
-                        cookie_accept = self.driver.find_element(By.XPATH, "//button[contains(text(), 'ACCEPT COOKIES') or contains(text(), 'Accept')]")
-                        if cookie_accept.is_displayed():
-                            cookie_accept.click()
+                        cookie_accept = find_best(self.driver, 'zoom', 'cookie_accept')
+                        if cookie_accept and click_match(self.driver, cookie_accept):
                             logger.info("Приняты cookies (повторно)")
-                            time.sleep(2)
+                            waiter.settle(0.5, 3, "баннер cookies закрыт")
                     except:
                         pass
                 
@@ -802,34 +925,17 @@ class MeetingBot:
                     logger.info("Попали на страницу успеха, ищем кнопку входа в встречу")
                     
                     # Ищем кнопки для входа в встречу после успешной авторизации
-                    meeting_join_selectors = [
-                        "//button[contains(text(), 'Join Meeting')]",
-                        "//a[contains(text(), 'Join Meeting')]",
-                        "//button[contains(text(), 'Enter Meeting')]",
-                        "//a[contains(text(), 'Enter Meeting')]",
-                        "//button[contains(text(), 'Join')]",
-                        "//a[contains(text(), 'Join')]",
-                        "//button[contains(@class, 'join')]",
-                        "//a[contains(@class, 'join')]",
-                        "//button[contains(@id, 'join')]",
-                        "//a[contains(@id, 'join')]",
-                    ]
-                    
                     button_found = False
-                    for selector in meeting_join_selectors:
-                        try:
-                            elements = self.driver.find_elements(By.XPATH, selector)
-                            for btn in elements:
-                                if btn.is_displayed() and btn.is_enabled():
-                                    btn.click()
-                                    logger.info(f"Нажата кнопка входа в встречу: {selector}")
-                                    time.sleep(5)
-                                    button_found = True
-                                    break
-                            if button_found:
-                                break
-                        except Exception as e:
-                            logger.debug(f"Селектор {selector} не сработал: {e}")
+                    try:
+                        success_join = self._find('zoom', 'success_join', enabled=True)
+                        if success_join:
+                            previous_url = self.driver.current_url
+                            if self._click(success_join):
+                                logger.info(f"Нажата кнопка входа в встречу: {describe_match(success_join)}")
+                                waiter.until(url_changed(previous_url), 10, "переход к встрече")
+                                button_found = True
+                    except Exception as e:
+                        logger.debug(f"Кнопка входа в встречу не найдена: {e}")
                     
                     # Если не нашли кнопку, попробуем разные URL
                     if not button_found and '#success' in self.driver.current_url:
@@ -839,30 +945,39 @@ class MeetingBot:
                             meeting_id = current_url.split('/j/')[1].split('?')[0]
                         
                         if meeting_id:
-                            # Попробуем разные варианты URL
-                            urls_to_try = [
-                                f"https://us05web.zoom.us/j/{meeting_id}?web=1&un=0",
-                                f"https://zoom.us/j/{meeting_id}?web=1&un=0",
-                                f"https://us05web.zoom.us/j/{meeting_id}",
-                                f"https://zoom.us/j/{meeting_id}",
-                            ]
+                            # Попробуем разные варианты URL (сначала тот, что чаще срабатывал)
+                            urls_to_try = {
+                                'us05web_web': f"https://us05web.zoom.us/j/{meeting_id}?web=1&un=0",
+                                'zoom_web': f"https://zoom.us/j/{meeting_id}?web=1&un=0",
+                                'us05web': f"https://us05web.zoom.us/j/{meeting_id}",
+                                'zoom': f"https://zoom.us/j/{meeting_id}",
+                            }
                             
                             # Добавляем пароль если есть
                             if 'pwd=' in current_url:
                                 pwd = current_url.split('pwd=')[1].split('&')[0]
-                                for i, url in enumerate(urls_to_try):
+                                for variant, url in urls_to_try.items():
                                     if '?' in url:
-                                        urls_to_try[i] = url + f"&pwd={pwd}"
+                                        urls_to_try[variant] = url + f"&pwd={pwd}"
                                     else:
-                                        urls_to_try[i] = url + f"?pwd={pwd}"
+                                        urls_to_try[variant] = url + f"?pwd={pwd}"
                             
-                            for url in urls_to_try:
+                            for variant in self._ordered_variants('zoom', 'success_url', list(urls_to_try)):
+                                url = urls_to_try[variant]
                                 logger.info(f"Пробуем альтернативный URL: {url}")
+                                variant_started = time.monotonic()
                                 self.driver.get(url)
-                                time.sleep(5)
+                                waiter.until(any_of(
+                                    visible(candidates('zoom', 'name')),
+                                    url_contains('#success', '/wc/'),
+                                ), 10, "альтернативный URL")
                                 
                                 # Проверяем, попали ли мы в встречу
-                                if '#success' not in self.driver.current_url and '/wc/' not in self.driver.current_url:
+                                entered = '#success' not in self.driver.current_url and '/wc/' not in self.driver.current_url
+                                if strategy_stats:
+                                    strategy_stats.record('zoom', 'success_url', variant, entered,
+                                                          time.monotonic() - variant_started)
+                                if entered:
                                     logger.info("Успешно перешли в встречу!")
                                     break
                         else:
@@ -870,12 +985,13 @@ class MeetingBot:
                             clean_url = current_url.split('#')[0]
                             logger.info(f"Перезагружаем без #success: {clean_url}")
                             self.driver.get(clean_url)
-                            time.sleep(5)
+                            waiter.until(visible(candidates('zoom', 'landing')), 10, "страница встречи")
                         
             except Exception as e:
                 logger.debug(f"Альтернативный способ не сработал: {e}")
             
             # Вводим имя
+            timer = self._start_phase('name_fill')
             try:
                 name_input = WebDriverWait(self.driver, 15).until(
                     EC.presence_of_element_located((By.ID, "inputname"))
@@ -883,135 +999,51 @@ class MeetingBot:
                 name_input.clear()
                 name_input.send_keys(name)
                 logger.info(f"Введено имя: {name}")
-                time.sleep(2)
+                timer.stop('ok')
             except Exception as e:
                 logger.debug(f"Не удалось ввести имя: {e}")
+                timer.stop('miss')
             
-            # Ищем и нажимаем кнопку Join
+            # Ищем и нажимаем кнопку Join: все селекторы и поиск по тексту - за один запрос к странице
+            timer = self._start_phase('join_click')
             join_clicked = False
-            
-            # Список всех возможных селекторов для кнопки Join
-            join_selectors = [
-                ('id', 'joinBtn'),
-                ('css', 'button[data-tooltip="Join Meeting"]'),
-                ('css', 'button[aria-label="Join Meeting"]'),
-                ('css', 'button[aria-label="Join"]'),
-                ('css', 'button[data-tooltip="Join"]'),
-                ('css', '.zm-btn--primary'),
-                ('css', '.join-btn'),
-                ('css', 'button[class*="join"]'),
-                ('xpath', "//button[contains(text(), 'Join')]"),
-                ('xpath', "//button[contains(text(), 'Join Meeting')]"),
-                ('xpath', "//button[contains(text(), 'Войти')]"),
-                ('xpath', "//button[contains(text(), 'Присоединиться')]"),
-                ('xpath', "//a[contains(text(), 'Join')]"),
-                ('xpath', "//a[contains(text(), 'Join Meeting')]"),
-            ]
-            
-            for method, selector in join_selectors:
-                try:
-                    if method == 'id':
-                        elements = self.driver.find_elements(By.ID, selector)
-                    elif method == 'css':
-                        elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    else:  # xpath
-                        elements = self.driver.find_elements(By.XPATH, selector)
-                    
-                    for btn in elements:
-                        if btn.is_displayed() and btn.is_enabled():
-                            btn.click()
-                            logger.info(f"Нажата кнопка Join через {method}: {selector}")
-                            join_clicked = True
-                            time.sleep(5)
-                            break
+            try:
+                join_button = self._find('zoom', 'join', enabled=True)
+                if join_button:
+                    join_clicked = self._click(join_button)
                     if join_clicked:
-                        break
-                except Exception as e:
-                    logger.debug(f"Попытка {method} {selector}: {e}")
+                        logger.info(f"Нажата кнопка Join: {describe_match(join_button)}")
+                        self._diag('join_clicked')
+            except Exception as e:
+                logger.debug(f"Ошибка поиска кнопки Join: {e}")
+            timer.stop('ok' if join_clicked else 'miss')
             
             if not join_clicked:
                 logger.warning("Не удалось найти кнопку Join ни одним способом")
-                # Последняя попытка - ищем любые кнопки
-                all_buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                for btn in all_buttons:
-                    try:
-                        text = btn.text.lower()
-                        if any(word in text for word in ['join', 'войти', 'присоединиться', 'enter']):
-                            if btn.is_displayed() and btn.is_enabled():
-                                btn.click()
-                                logger.info(f"Нажата кнопка по тексту: {btn.text}")
-                                join_clicked = True
-                                time.sleep(5)
-                                break
-                    except:
-                        pass
             
-            # Ждем загрузки встречи и проверяем, что мы действительно в ней
-            time.sleep(10)
+            # Ждем панель управления звонка или сообщение об ошибке и проверяем, что мы действительно во встрече
+            timer = self._start_phase('in_call')
+            waiter.until(any_of(
+                visible(candidates('zoom', 'in_call')),
+                visible(candidates('zoom', 'errors')),
+            ), 20, "вход во встречу")
             
             # Проверяем, что мы в активной встрече
             current_url = self.driver.current_url
             logger.info(f"Текущий URL после присоединения: {current_url}")
             
-            # Ищем индикаторы того, что мы в активной встрече
-            meeting_indicators = [
-                "//div[contains(@class, 'meeting-client')]",
-                "//div[contains(@class, 'video-container')]",
-                "//button[contains(@aria-label, 'Mute')]",
-                "//button[contains(@aria-label, 'Unmute')]",
-                "//button[contains(@aria-label, 'Turn off')]",
-                "//button[contains(@aria-label, 'Turn on')]",
-                "//div[contains(@class, 'participants')]",
-                "//canvas",  # Видео элемент
-                "//div[contains(@class, 'meeting')]",
-                "//div[contains(@class, 'zoom')]",
-                "//div[contains(@class, 'webinar')]",
-                "//div[contains(@id, 'meeting')]",
-                "//div[contains(@id, 'zoom')]",
-                "//video",  # HTML5 видео элемент
-                "//audio",  # HTML5 аудио элемент
-                "//div[contains(@class, 'controls')]",
-                "//div[contains(@class, 'toolbar')]",
-                "//button[contains(@class, 'zm-btn')]",
-                "//div[contains(@class, 'footer')]",
-                "//div[contains(@class, 'main')]",
-            ]
-            
-            in_meeting = False
-            found_indicators = 0
-            for indicator in meeting_indicators:
-                try:
-                    elements = self.driver.find_elements(By.XPATH, indicator)
-                    if elements:
-                        logger.info(f"Найден индикатор встречи: {indicator} ({len(elements)} элементов)")
-                        found_indicators += 1
-                        in_meeting = True
-                except:
-                    pass
+            # Ищем индикаторы того, что мы в активной встрече (все за один запрос)
+            indicators = find_all(self.driver, 'zoom', 'indicators', visible=False)
+            for match in indicators:
+                logger.info(f"Найден индикатор встречи: {match['key']} ({match['count']} элементов)")
+            found_indicators = len(indicators)
+            in_meeting = found_indicators > 0
             
             # Дополнительная проверка - ищем сообщения об ошибке
-            error_indicators = [
-                "//div[contains(text(), 'Meeting not found')]",
-                "//div[contains(text(), 'Invalid meeting ID')]",
-                "//div[contains(text(), 'Meeting has ended')]",
-                "//div[contains(text(), 'Please wait for the host')]",
-                "//div[contains(text(), 'Waiting for host')]",
-                "//div[contains(text(), 'Please download and install')]",
-                "//div[contains(text(), 'Did not open Zoom')]",
-                "//div[contains(text(), 'Zoom Workplace app')]",
-                "//div[contains(text(), 'Download Now')]",
-            ]
-            
-            has_error = False
-            for indicator in error_indicators:
-                try:
-                    elements = self.driver.find_elements(By.XPATH, indicator)
-                    if elements:
-                        logger.warning(f"Найдено сообщение об ошибке: {indicator}")
-                        has_error = True
-                        break
-                except:
-                    pass
+            error = find_best(self.driver, 'zoom', 'errors', visible=False)
+            has_error = error is not None
+            if error:
+                logger.warning(f"Найдено сообщение об ошибке: {error['text']}")
             
             # Проверяем URL - должны быть в активной встрече Zoom
             url_check = (
@@ -1022,42 +1054,21 @@ class MeetingBot:
                 "/wc/" not in current_url  # НЕ должны быть на странице веб-клиента (это не сама встреча)
             )
             
-            # Строгая проверка - должны быть активные медиа элементы
-            has_active_media = False
-            try:
-                # Проверяем наличие активных видео/аудио потоков
-                media_elements = self.driver.find_elements(By.CSS_SELECTOR, "video, audio")
-                for element in media_elements:
-                    try:
-                        # Проверяем, что элемент активен
-                        if element.get_attribute('src') or element.get_attribute('currentSrc'):
-                            has_active_media = True
-                            logger.info("Найден активный медиа элемент")
-                            break
-                    except:
-                        continue
-            except Exception as e:
-                logger.debug(f"Ошибка проверки медиа элементов: {e}")
-            
             # УПРОЩЕННАЯ проверка - достаточно платформы и хотя бы 1 индикатора
             connection_success = (
                 in_meeting and found_indicators >= 1 and not has_error
             )
             
+            timer.stop('ok' if connection_success else 'fail')
             if connection_success:
                 logger.info(f"✅ Подключились к Zoom: {meeting_url}")
-                self._disable_zoom_media()
+                with join_metrics.phase(self.meeting_type, 'media_disable'):
+                    self._disable_zoom_media()
                 return True
             else:
                 logger.warning("⚠️ Не удалось подтвердить присоединение к встрече")
                 logger.info(f"Результат проверки: индикаторы={found_indicators}, ошибки={has_error}, URL={url_check}")
-                try:
-                    screenshot_path = f"/tmp/meetingbot_zoom_fail_{int(time.time())}.png"
-                    self.driver.save_screenshot(screenshot_path)
-                    logger.warning(f"Скриншот ошибки сохранен: {screenshot_path}")
-                    self._send_screenshot_to_admin(screenshot_path, meeting_url)
-                except Exception as err:
-                    logger.error(f"Ошибка сохранения скриншота: {err}")
+                self._mark_join_failure("zoom_verification_failed")
                 return False
             
         except Exception as e:
@@ -1076,61 +1087,20 @@ class MeetingBot:
                 except Exception as restart_error:
                     logger.error(f"Не удалось перезапустить драйвер: {restart_error}")
             
-            self._capture_and_notify("zoom")
+            self._mark_join_failure("zoom_exception")
             return False
     
     def _disable_zoom_media(self):
         """Отключить камеру и микрофон в Zoom"""
         try:
-            time.sleep(3)  # Ждем загрузки элементов управления
-            
-            # Отключаем микрофон
-            mic_selectors = [
-                "button[aria-label*='Mute' i]",
-                "button[aria-label*='Unmute' i]",
-                "button[data-tooltip*='Mute' i]",
-                "button[data-tooltip*='Unmute' i]",
-                ".zm-btn--mute",
-                ".zm-btn--unmute"
-            ]
-            
-            for selector in mic_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for el in elements:
-                        if el.is_displayed():
-                            aria_label = el.get_attribute('aria-label') or ''
-                            if 'unmute' in aria_label.lower() or 'mute' in aria_label.lower():
-                                el.click()
-                                logger.info("Микрофон отключен в Zoom")
-                                time.sleep(1)
-                                break
-                except Exception as e:
-                    logger.debug(f"Попытка отключить микрофон через {selector}: {e}")
-            
-            # Отключаем камеру
-            camera_selectors = [
-                "button[aria-label*='Stop Video' i]",
-                "button[aria-label*='Start Video' i]",
-                "button[data-tooltip*='Stop Video' i]",
-                "button[data-tooltip*='Start Video' i]",
-                ".zm-btn--video",
-                ".zm-btn--stop-video"
-            ]
-            
-            for selector in camera_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for el in elements:
-                        if el.is_displayed():
-                            aria_label = el.get_attribute('aria-label') or ''
-                            if 'start video' in aria_label.lower() or 'stop video' in aria_label.lower():
-                                el.click()
-                                logger.info("Камера отключена в Zoom")
-                                time.sleep(1)
-                                break
-                except Exception as e:
-                    logger.debug(f"Попытка отключить камеру через {selector}: {e}")
+            # Ждем загрузки элементов управления
+            JoinWaiter(self.driver, "Zoom").until(visible(candidates('zoom', 'media_controls')), 5, "панель управления")
+            
+            # Отключаем микрофон и камеру
+            for group, label in (('mic_off', 'Микрофон отключен в Zoom'), ('camera_off', 'Камера отключена в Zoom')):
+                button = find_best(self.driver, 'zoom', group)
+                if button and click_match(self.driver, button):
+                    logger.info(label)
                     
         except Exception as e:
             logger.debug(f"Ошибка при отключении медиа в Zoom: {e}")
@@ -1142,67 +1112,56 @@ class MeetingBot:
             self.meeting_url = meeting_url
             if not self.safe_get(meeting_url, retries=2):
                 return False
-            time.sleep(5)
+            waiter = JoinWaiter(self.driver, "Яндекс Телемост")
+            waiter.until(visible(candidates('yandex', 'prejoin')), 15, "экран входа")
             
             # Вводим имя
+            timer = self._start_phase('name_fill')
             try:
-                name_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input[type='text']")
-                for inp in name_inputs:
-                    if inp.is_displayed():
-                        inp.clear()
-                        inp.send_keys(name)
-                        logger.info(f"Введено имя: {name}")
-                        time.sleep(0.5)
-                        break
+                name_input = find_best(self.driver, 'yandex', 'name_input')
+                if name_input:
+                    name_input['element'].clear()
+                    name_input['element'].send_keys(name)
+                    logger.info(f"Введено имя: {name}")
+                timer.stop('ok' if name_input else 'miss')
             except Exception as e:
                 logger.debug(f"Не удалось ввести имя: {e}")
             
             # Отключаем камеру и микрофон
             try:
-                controls = self.driver.find_elements(By.TAG_NAME, "button")
-                for control in controls:
-                    aria_label = (control.get_attribute("aria-label") or '').lower()
-                    title = (control.get_attribute("title") or '').lower()
-                    if any(word in aria_label or word in title for word in ['камера', 'camera', 'микрофон', 'microphone']):
-                        control.click()
-                        time.sleep(0.3)
+                with join_metrics.phase(self.meeting_type, 'media_disable'):
+                    for control in find_all(self.driver, 'yandex', 'media_toggles', visible=False):
+                        click_match(self.driver, control)
             except Exception as e:
                 logger.debug(f"Не удалось отключить медиа: {e}")
             
             # Ищем кнопку входа
+            timer = self._start_phase('join_click')
             join_clicked = False
-            join_words = ['войти', 'присоединиться', 'join', 'enter']
-            
-            buttons = self.driver.find_elements(By.TAG_NAME, "button")
-            for btn in buttons:
-                text = btn.text.lower()
-                if any(word in text for word in join_words) and btn.is_displayed():
-                    try:
-                        btn.click()
-                        logger.info(f"Нажата кнопка: {btn.text}")
-                        join_clicked = True
-                        time.sleep(3)
-                        break
-                    except:
-                        pass
+            try:
+                join_button = self._find('yandex', 'join')
+                if join_button and self._click(join_button):
+                    logger.info(f"Нажата кнопка: {join_button['text']}")
+                    join_clicked = True
+                    self._diag('join_clicked')
+                    timer.stop('ok')
+                    timer = self._start_phase('in_call')
+                    waiter.settle(1.0, 10, "вход во встречу")
+            except Exception as e:
+                logger.debug(f"Ошибка поиска кнопки входа: {e}")
             
+            timer.stop('ok' if join_clicked or 'telemost.yandex' in self.driver.current_url else 'miss')
             if join_clicked or 'telemost.yandex' in self.driver.current_url:
                 logger.info(f"✅ Подключились к Яндекс Телемост: {meeting_url}")
                 return True
             else:
                 logger.warning("⚠️ Не удалось найти кнопку входа")
-                try:
-                    screenshot_path = f"/tmp/meetingbot_yandex_fail_{int(time.time())}.png"
-                    self.driver.save_screenshot(screenshot_path)
-                    logger.warning(f"Скриншот ошибки сохранен: {screenshot_path}")
-                    self._send_screenshot_to_admin(screenshot_path, meeting_url)
-                except Exception as err:
-                    logger.error(f"Ошибка сохранения скриншота: {err}")
+                self._mark_join_failure("yandex_join_button")
                 return False
                 
         except Exception as e:
             logger.error(f"❌ Ошибка при присоединении к Яндекс Телемост: {e}")
-            self._capture_and_notify("yandex")
+            self._mark_join_failure("yandex_exception")
             return False
     
     def join_contour_talk(self, meeting_url: str, name: str = "Meeting Bot"):
@@ -1212,47 +1171,39 @@ class MeetingBot:
             self.meeting_url = meeting_url
             if not self.safe_get(meeting_url, retries=2):
                 return False
-            time.sleep(5)
+            waiter = JoinWaiter(self.driver, "Контур.Толк")
+            waiter.until(visible(candidates('contour', 'prejoin')), 15, "экран входа")
             # Вводим имя если требуется
+            timer = self._start_phase('name_fill')
             try:
-                name_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input[type='text'], input[type='name']")
-                for inp in name_inputs:
-                    if inp.is_displayed():
-                        inp.clear()
-                        inp.send_keys(name)
-                        logger.info(f"Введено имя: {name}")
-                        break
+                name_input = find_best(self.driver, 'contour', 'name_input')
+                if name_input:
+                    name_input['element'].clear()
+                    name_input['element'].send_keys(name)
+                    logger.info(f"Введено имя: {name}")
+                timer.stop('ok' if name_input else 'miss')
             except Exception as e:
                 logger.debug(f"Поле имени не найдено: {e}")
             # Ищем кнопку подключения
-            join_patterns = [
-                ('xpath', "//button[contains(., 'Подключиться')]") ,
-                ('xpath', "//button[contains(., 'Войти')]") ,
-                ('xpath', "//button[contains(., 'Join')]") ,
-            ]
-            for method, selector in join_patterns:
-                try:
-                    buttons = self.driver.find_elements(By.XPATH, selector)
-                    for btn in buttons:
-                        if btn.is_displayed():
-                            btn.click()
-                            logger.info("Нажата кнопка подключения")
-                            time.sleep(3)
-                            return True
-                except:
-                    pass
-            logger.warning("⚠️ Не удалось подключиться к Контур.Толк")
+            timer = self._start_phase('join_click')
             try:
-                screenshot_path = f"/tmp/meetingbot_contour_fail_{int(time.time())}.png"
-                self.driver.save_screenshot(screenshot_path)
-                logger.warning(f"Скриншот ошибки сохранен: {screenshot_path}")
-                self._send_screenshot_to_admin(screenshot_path, meeting_url)
-            except Exception as err:
-                logger.error(f"Ошибка сохранения скриншота: {err}")
+                join_button = self._find('contour', 'join')
+                if join_button and self._click(join_button):
+                    logger.info("Нажата кнопка подключения")
+                    self._diag('join_clicked')
+                    timer.stop('ok')
+                    with join_metrics.phase(self.meeting_type, 'in_call'):
+                        waiter.settle(1.0, 10, "вход во встречу")
+                    return True
+            except Exception as e:
+                logger.debug(f"Ошибка поиска кнопки подключения: {e}")
+            timer.stop('miss')
+            logger.warning("⚠️ Не удалось подключиться к Контур.Толк")
+            self._mark_join_failure("contour_join_button")
             return False
         except Exception as e:
             logger.error(f"❌ Ошибка при присоединении к Контур.Толк: {e}")
-            self._capture_and_notify("contour")
+            self._mark_join_failure("contour_exception")
             return False
     def _verify_real_meeting_connection(self) -> bool:
         """УПРОЩЕННАЯ проверка - только для дополнительной валидации"""
@@ -1302,88 +1253,264 @@ class MeetingBot:
         except Exception as e:
             logger.error(f"Ошибка отправки уведомления об имитации: {e}")
     
-    def _send_screenshot_to_admin(self, screenshot_path, meeting_url):
-        """Отправить скриншот ошибки админу в Telegram"""
+    def _send_screenshots_to_admin(self, paths: List[str], meeting_url: str, reason: str):
+        """Отправить снимки шагов неудачного входа админу в Telegram (одним альбомом)"""
         import requests
         ADMIN_CHAT_ID = os.getenv('ADMIN_CHAT_ID', '')
         TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
         if not (ADMIN_CHAT_ID and TELEGRAM_BOT_TOKEN):
             logger.warning("ADMIN_CHAT_ID или TELEGRAM_BOT_TOKEN не заданы для отправки скриншота")
             return
+        caption = f"❌ Meeting Bot не смог подключиться к встрече!\nURL: {meeting_url}\nПричина: {reason}"
+        # В альбоме Telegram не больше 10 фото - самые последние шаги важнее
+        paths = paths[-10:]
+        files = {}
         try:
-            with open(screenshot_path, 'rb') as img:
-                files = {'photo': img}
-                caption = f"❌ Meeting Bot не смог подключиться к встрече!\nURL: {meeting_url}"
+            for index, path in enumerate(paths):
+                files[f"shot{index}"] = open(path, 'rb')
+            if len(paths) == 1:
                 url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
-                resp = requests.post(url, data={
-                    'chat_id': ADMIN_CHAT_ID,
-                    'caption': caption
-                }, files=files)
-                if resp.status_code == 200:
-                    logger.info("Скриншот ошибки отправлен админу в Telegram")
-                else:
-                    logger.error(f"Ошибка отправки скриншота админу: {resp.text}")
+                resp = requests.post(url, data={'chat_id': ADMIN_CHAT_ID, 'caption': caption},
+                                     files={'photo': files['shot0']})
+            else:
+                media = [{'type': 'photo', 'media': f"attach://shot{index}"} for index in range(len(paths))]
+                media[-1]['caption'] = caption
+                url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMediaGroup"
+                resp = requests.post(url, data={'chat_id': ADMIN_CHAT_ID, 'media': json.dumps(media)}, files=files)
+            if resp.status_code == 200:
+                logger.info(f"Снимки неудачного входа отправлены админу в Telegram: {len(paths)}")
+            else:
+                logger.error(f"Ошибка отправки скриншота админу: {resp.text}")
         except Exception as e:
             logger.error(f"Ошибка отправки скриншота админу: {e}")
-            return False
+        finally:
+            for f in files.values():
+                f.close()
 
-    def _capture_and_notify(self, platform_tag: str):
-        try:
-            screenshot_path = f"/tmp/meetingbot_{platform_tag}_fail_{int(time.time())}.png"
-            self.driver.save_screenshot(screenshot_path)
-            logger.warning(f"Скриншот ошибки сохранен: {screenshot_path}")
-            self._send_screenshot_to_admin(screenshot_path, self.meeting_url or "")
-        except Exception as err:
-            logger.error(f"Ошибка сохранения скриншота: {err}")
+    def _diag(self, step: str):
+        """Снимок шага входа в кольцевой буфер (в фоне, на диск не пишется)"""
+        self.diagnostics.snap(self.driver, step)
+
+    def _mark_join_failure(self, reason: str):
+        """Запомнить причину неудачи и снять страницу - снимки отправит join_meeting"""
+        self._failure_tag = reason
+        self._diag(f"fail_{reason}")
+
+    def _report_join_failure(self, platform: str):
+        """Сохранить снимки последних шагов (в пределах бюджета диска) и отправить админу"""
+        reason = self._failure_tag or f"{platform}_failed"
+        if not self._failure_tag:
+            self._diag('final')
+        paths = self.diagnostics.persist(DIAG_DIR, reason, DIAG_DISK_MB)
+        if not paths:
+            logger.warning(f"Снимков неудачного входа нет ({reason})")
+            return
+        logger.warning(f"Снимки неудачного входа сохранены: {os.path.dirname(paths[0])}")
+        self._send_screenshots_to_admin(paths, self.meeting_url or "", reason)
     
     def start_recording(self):
         """Начать запись аудио через ffmpeg на всю встречу"""
+        manifest = None
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.audio_file = os.path.join(RECORD_DIR, f"meeting_{timestamp}.wav")
-            
-            # Пытаемся разные источники аудио для Linux VPS
-            # Убираем ограничение по времени - записываем до остановки
-            audio_sources = [
-                ['ffmpeg', '-f', 'alsa', '-i', 'hw:0,0', '-ac', '2', '-ar', '16000', '-y', self.audio_file],
-                ['ffmpeg', '-f', 'alsa', '-i', 'hw:0,1', '-ac', '2', '-ar', '16000', '-y', self.audio_file],
-                ['ffmpeg', '-f', 'alsa', '-i', 'plughw:0,0', '-ac', '2', '-ar', '16000', '-y', self.audio_file],
-                ['ffmpeg', '-f', 'alsa', '-i', 'plughw:0,1', '-ac', '2', '-ar', '16000', '-y', self.audio_file],
-                ['ffmpeg', '-f', 'pulse', '-i', 'default', '-ac', '2', '-ar', '16000', '-y', self.audio_file],
-                ['ffmpeg', '-f', 'alsa', '-i', 'default', '-ac', '2', '-ar', '16000', '-y', self.audio_file],
-            ]
-            
-            for cmd in audio_sources:
+            record_format = get_record_format(RECORD_FORMAT, RECORD_OPUS_BITRATE)
+            self.record_format = record_format
+            self.audio_file = os.path.join(RECORD_DIR, f"meeting_{timestamp}{record_format['ext']}")
+            
+            # Режим pipe: звук сразу в память для распознавания, файл - только если нужен архив
+            if RECORD_CAPTURE == 'pipe':
+                self.pcm_buffer = PcmRingBuffer(max(PCM_BUFFER_SEC, LIVE_CHUNK_SEC * 3))
+                if not RECORD_ARCHIVE:
+                    self.audio_file = None
+            
+            # Индикатор уровня: в режиме pipe - на том же PCM, иначе отдельный поток 8 кГц из ffmpeg
+            meter_rate = PCM_SAMPLE_RATE if self.pcm_buffer else 8000
+            self.level_meter = AudioLevelMeter(meter_rate, silence_dbfs=SILENCE_THRESHOLD_DBFS)
+            
+            # Сегментированная запись: куски закрываются каждые RECORD_SEGMENT_SEC и переживают падение
+            if RECORD_SEGMENT_SEC > 0 and self.audio_file:
+                manifest = RecordingManifest.find_resumable(
+                    RECORD_DIR, self.meeting_url, record_format, RECORD_RESUME_MIN * 60
+                )
+                if manifest:
+                    logger.info(f"♻️ Продолжаю прерванную запись встречи ({manifest.duration():.0f} с уже записано)")
+                else:
+                    manifest = RecordingManifest.create(
+                        os.path.join(RECORD_DIR, f"meeting_{timestamp}"), self.meeting_url,
+                        record_format, RECORD_SEGMENT_SEC
+                    )
+                self.audio_file = manifest.final_path
+            
+            output_args = record_format['args']
+            
+            # Звук из вкладки или свой sink - пишем только эту встречу; иначе общий источник из кэша
+            if RECORD_BACKEND == 'browser' and self.driver:
+                source = {'input_args': BROWSER_INPUT_ARGS}
+            elif self.audio_sink:
+                source = {'input_args': self.audio_sink.input_args()}
+            else:
+                source = capture_resolver.resolve()
+            refreshed = False
+            for _ in range(3):
+                if not source:
+                    break
+                input_args = source['input_args']
                 try:
-                    self.recording_process = subprocess.Popen(
-                        cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE
+                    # Супервизор читает вывод ffmpeg, иначе пайпы переполнятся и запись встанет
+                    recorder = FfmpegRecorder(
+                        input_args, self.audio_file, output_args, stall_sec=RECORD_STALL_SEC,
+                        manifest=manifest, muxer=record_format['muxer'],
+                        pcm_sink=self._on_pcm, pcm_rate=meter_rate,
+                        stdin_feed=input_args == BROWSER_INPUT_ARGS
                     )
-                    # Проверяем, что процесс запустился
-                    time.sleep(1)
-                    if self.recording_process.poll() is None:
+                    started = recorder.start()
+                    if started and input_args == BROWSER_INPUT_ARGS:
+                        started = self._start_browser_capture(recorder)
+                    if started:
+                        self.recorder = recorder
                         self.recording = True
                         self.start_time = datetime.now()
                         self.meeting_active = True
-                        logger.info(f"✅ Начата запись аудио на всю встречу: {self.audio_file}")
-                        logger.info(f"Команда: {' '.join(cmd)}")
+                        logger.info(f"✅ Начата запись аудио на всю встречу: {self.audio_file or 'в память (pipe)'}")
+                        
+                        # Запускаем живую транскрипцию
+                        self._start_live_transcription()
+                        
+                        # Следим за тишиной: мертвый захват звука видно сразу, а не после Whisper
+                        if SILENCE_ALERT_SEC > 0:
+                            threading.Thread(target=self._silence_watchdog, daemon=True, name='silence-watchdog').start()
                         
                         # Запускаем мониторинг встречи
                         self.start_meeting_monitoring()
                         return True
-                    else:
-                        logger.debug(f"Команда не сработала: {' '.join(cmd)}")
                 except Exception as e:
-                    logger.debug(f"Ошибка запуска {cmd}: {e}")
+                    logger.debug(f"Ошибка запуска {input_args}: {e}")
+                if input_args == BROWSER_INPUT_ARGS:
+                    logger.warning("Захват звука из браузера не запустился, пробую аудиоустройство")
+                    source = {'input_args': self.audio_sink.input_args()} if self.audio_sink else capture_resolver.resolve()
+                elif self.audio_sink and input_args == self.audio_sink.input_args():
+                    logger.warning(f"Аудио sink {self.audio_sink.name} не записывается, пробую общий источник")
+                    source = capture_resolver.resolve()
+                elif not refreshed:
+                    # Источник из кэша перестал работать - проверяем всех заново
+                    logger.warning(f"Источник звука {' '.join(input_args)} не сработал, проверяю все заново")
+                    capture_resolver.invalidate()
+                    source = capture_resolver.resolve(refresh=True)
+                    refreshed = True
+                else:
+                    break
             
             logger.error("❌ Не удалось запустить запись аудио ни одним способом")
+            if manifest:
+                manifest.release()  # Манифест можно будет продолжить следующей попыткой
             return False
             
         except Exception as e:
             logger.error(f"❌ Критическая ошибка при начале записи: {e}")
+            if manifest:
+                manifest.release()
             return False
     
+    def _start_browser_capture(self, recorder) -> bool:
+        """Запустить перекачку звука из вкладки в ffmpeg"""
+        capture = BrowserAudioCapture(self.driver, recorder)
+        if capture.start():
+            self.browser_capture = capture
+            return True
+        recorder.stop()
+        return False
+    
+    def _on_pcm(self, data: bytes):
+        """PCM из ffmpeg: в индикатор уровня и (в режиме pipe) в буфер распознавания"""
+        if self.pcm_buffer:
+            self.pcm_buffer.write(data)
+        self.level_meter.feed(data)
+    
+    def _silence_watchdog(self):
+        """Тревога, если в записи только цифровая тишина; без своего sink - смена источника"""
+        tried = [list(self.recorder.input_args)]
+        alternates = None  # Источники для смены: проверяются один раз за встречу
+        switched_at = time.monotonic()
+        alerted = False
+        while self.recording and self.meeting_active:
+            time.sleep(5)
+            silent = self.level_meter.silent_for()
+            if silent < SILENCE_ALERT_SEC:
+                alerted = False
+                continue
+            if alternates is None:
+                # Звук из вкладки не на что переключать
+                alternates = [] if self.browser_capture else self._capture_alternates()
+            remaining = [input_args for input_args in alternates if input_args not in tried]
+            if not alerted:
+                alerted = True
+                logger.warning(f"🔇 В записи тишина уже {silent:.0f} с - похоже, звук не захватывается")
+                self._send_silence_alert(silent, switching=bool(remaining))
+            # Даем каждому источнику столько же времени, сколько первому
+            if not remaining or time.monotonic() - switched_at < SILENCE_ALERT_SEC:
+                continue
+            tried.append(remaining[0])
+            switched_at = time.monotonic()
+            self.recorder.switch_input(remaining[0])
+    
+    def _capture_alternates(self):
+        """Источники звука, на которые можно переключиться при тишине"""
+        if self.audio_sink:
+            # Свой sink: тишина бывает и в тихой встрече, а общие устройства хоста ломают изоляцию -
+            # возвращаемся только на монитор sink (если запись ушла с него)
+            return [self.audio_sink.input_args()]
+        return [source['input_args'] for source in capture_resolver.probe_all()]
+    
+    def _send_silence_alert(self, silent_sec: float, switching: bool = True):
+        """Предупредить пользователя и админа, что запись идет без звука"""
+        import requests
+        if not TELEGRAM_BOT_TOKEN:
+            return
+        msg = (
+            f"🔇 Meeting Bot: в записи тишина уже {silent_sec:.0f} с\n"
+            f"🔗 URL: {self.meeting_url}\n"
+            "Похоже, звук встречи не захватывается"
+            + (" - пробую другой источник." if switching else ".")
+        )
+        chat_ids = {str(chat_id) for chat_id in (self.chat_id, ADMIN_CHAT_ID) if chat_id}
+        for chat_id in chat_ids:
+            try:
+                resp = requests.post(
+                    f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage",
+                    data={'chat_id': chat_id, 'text': msg}, timeout=10
+                )
+                if resp.status_code != 200:
+                    logger.error(f"Ошибка отправки уведомления о тишине: {resp.text}")
+            except Exception as e:
+                logger.error(f"Ошибка отправки уведомления о тишине: {e}")
+    
+    def _start_live_transcription(self):
+        """Запустить распознавание готовых фрагментов во время записи"""
+        if self.pcm_buffer:
+            # Режим pipe: распознаем прямо из памяти (без файла это единственный путь)
+            source = self.pcm_buffer
+        elif not LIVE_TRANSCRIPTION:
+            return
+        elif self.recorder.manifest:
+            # Распознаем только закрытые сегменты - формат записи не важен
+            source = ClosedSegmentsSource(self.recorder.manifest.closed_segments)
+        elif self.record_format['streamable']:
+            source = MultiPartWavSource(self.recorder.files)
+        else:
+            logger.warning(f"Живая транскрипция недоступна для формата {self.record_format['name']}: нужен wav")
+            return
+        try:
+            self.live_transcriber = LiveTranscriber(
+                source,
+                self._transcribe_array,
+                chunk_sec=LIVE_CHUNK_SEC,
+                on_segments=self.transcript.extend
+            )
+            self.live_transcriber.start()
+        except Exception as e:
+            logger.error(f"Ошибка запуска живой транскрипции: {e}")
+            self.live_transcriber = None
+    
     def start_meeting_monitoring(self):
         """Запустить мониторинг состояния встречи"""
         try:
@@ -1414,23 +1541,12 @@ class MeetingBot:
                         self.meeting_active = False
                         break
                     
-                    # Проверяем, не появились ли сообщения о завершении встречи
+                    # Проверяем, не появились ли сообщения о завершении встречи (один запрос)
                     try:
-                        end_indicators = [
-                            "//div[contains(text(), 'Everyone left')]",
-                            "//div[contains(text(), 'Meeting ended')]",
-                            "//div[contains(text(), 'Встреча завершена')]",
-                            "//div[contains(text(), 'Все покинули')]",
-                        ]
-                        
-                        for indicator in end_indicators:
-                            elements = self.driver.find_elements(By.XPATH, indicator)
-                            if elements:
-                                logger.info("🔍 Обнаружено завершение встречи")
-                                self.meeting_active = False
-                                break
-                        
-                        if not self.meeting_active:
+                        ended = find_best(self.driver, 'common', 'meeting_ended', visible=False)
+                        if ended:
+                            logger.info(f"🔍 Обнаружено завершение встречи: {ended['text'][:80]}")
+                            self.meeting_active = False
                             break
                             
                     except Exception as e:
@@ -1451,44 +1567,52 @@ class MeetingBot:
     
     def stop_recording(self):
         """Остановить запись"""
-        try:
-            self.meeting_active = False  # Останавливаем мониторинг
-            
-            if self.recording and self.recording_process:
-                self.recording_process.terminate()
-                try:
-                    self.recording_process.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    self.recording_process.kill()
-                    self.recording_process.wait()
+        with self._stop_lock:
+            try:
+                self.meeting_active = False  # Останавливаем мониторинг
+            
+                if self.recording and self.recorder:
+                    if self.browser_capture:
+                        # Сначала дописываем в ffmpeg последние куски из вкладки
+                        self.browser_capture.stop()
+                    self.recorder.stop()
+                    # Сегменты (и части после перезапусков) собираются в один файл - это ffmpeg и ffprobe
+                    self.audio_file = self.recorder.finalize() or self.audio_file
                 
-                self.recording = False
-                logger.info("⏹️ Запись остановлена")
+                    self.recording = False
+                    logger.info("⏹️ Запись остановлена")
                 
-                # Проверяем, что файл создан
-                if os.path.exists(self.audio_file):
-                    size = os.path.getsize(self.audio_file)
-                    logger.info(f"Размер записанного файла: {size} байт")
-                    return True
-                else:
-                    logger.error("Файл записи не найден")
-                    return False
-            return True
-        except Exception as e:
-            logger.error(f"❌ Ошибка при остановке записи: {e}")
-            return False
+                    if not self.audio_file and self.pcm_buffer:
+                        # Запись шла только в память - файла и не должно быть
+                        return True
+                
+                    # Проверяем, что файл создан
+                    if self.audio_file and os.path.exists(self.audio_file):
+                        size = os.path.getsize(self.audio_file)
+                        logger.info(f"Размер записанного файла: {size} байт")
+                        return True
+                    else:
+                        logger.error("Файл записи не найден")
+                        return False
+                return True
+            except Exception as e:
+                logger.error(f"❌ Ошибка при остановке записи: {e}")
+                return False
     
     def transcribe_audio_whisper(self):
         """Транскрибировать аудио с помощью Faster Whisper"""
         try:
+            if not self.audio_file and self.live_transcriber:
+                # Режим pipe без архива: весь звук уже прошел через живую транскрипцию
+                logger.info(f"Живая транскрипция: распознано {self.live_transcriber.position:.0f} с, дораспознаем остаток")
+                segments = self.live_transcriber.finish()
+                self.live_transcriber = None
+                return self._format_transcript(segments)
+            
             if not self.audio_file or not os.path.exists(self.audio_file):
                 logger.error("❌ Аудио файл не найден")
                 return None
             
-            if not self.whisper_model:
-                logger.error("❌ Whisper модель не загружена")
-                return None
-            
             file_size = os.path.getsize(self.audio_file)
             logger.info(f"🎙️ Начинаем транскрипцию файла: {self.audio_file} ({file_size} байт)")
             
@@ -1496,42 +1620,76 @@ class MeetingBot:
                 logger.warning("⚠️ Файл слишком маленький, возможно запись не удалась")
                 return "Ошибка: файл записи слишком мал, возможно аудио не было записано"
             
-            # Транскрибируем
-            segments, info = self.whisper_model.transcribe(
-                self.audio_file,
-                language="ru",
-                beam_size=5,
-                vad_filter=True,
-                vad_parameters=dict(min_silence_duration_ms=500)
-            )
-            
-            logger.info(f"Обнаружен язык: {info.language} (вероятность: {info.language_probability:.2f})")
-            
-            # Собираем текст
-            full_text = []
-            for segment in segments:
-                text = segment.text.strip()
-                if text:
-                    timestamp = f"[{self._format_timestamp(segment.start)} --> {self._format_timestamp(segment.end)}]"
-                    full_text.append(f"{timestamp}\n{text}\n")
-                    self.transcript.append({
-                        "start": segment.start,
-                        "end": segment.end,
-                        "text": text
-                    })
-            
-            if full_text:
-                result = "\n".join(full_text)
-                logger.info(f"✅ Транскрипция завершена. Сегментов: {len(self.transcript)}")
-                return result
+            cache_key = None
+            try:
+                cache_key = transcript_cache.make_key(self.audio_file, TRANSCRIPT_CACHE_PARAMS)
+            except Exception as e:
+                logger.warning(f"Не удалось вычислить ключ кэша транскрипта: {e}")
+            segments = transcript_cache.get(cache_key) if cache_key else None
+            from_cache = segments is not None
+            
+            if from_cache:
+                if self.live_transcriber:
+                    self.live_transcriber.stop()
+                    self.live_transcriber = None
+                self.transcript = list(segments)
+            elif self.live_transcriber:
+                # Большая часть записи уже распознана - дораспознаем только хвост
+                logger.info(f"Живая транскрипция: распознано {self.live_transcriber.position:.0f} с, дораспознаем остаток")
+                segments = self.live_transcriber.finish()
+                self.live_transcriber = None
             else:
-                logger.warning("⚠️ Транскрипт пуст - речь не обнаружена")
-                return "Транскрипт пуст: речь не обнаружена в записи"
+                # Транскрибируем в пуле воркеров: длинную запись - кусками на всех воркерах
+                duration = (datetime.now() - self.start_time).total_seconds() if self.start_time else 0
+                if transcription_service.workers > 1 and duration >= PARALLEL_MIN_SEC:
+                    result = transcription_service.transcribe_parallel(self.audio_file, overlap_sec=PARALLEL_OVERLAP_SEC)
+                else:
+                    result = transcription_service.transcribe(self.audio_file)
+                logger.info(f"Обнаружен язык: {result['language']} (вероятность: {result['language_probability']:.2f})")
+                segments = result['segments']
+                self.transcript.extend(segments)
+            
+            if cache_key and not from_cache:
+                transcript_cache.put(cache_key, segments, TRANSCRIPT_CACHE_PARAMS)
+            
+            return self._format_transcript(segments)
                 
         except Exception as e:
             logger.error(f"❌ Ошибка при транскрипции: {e}")
             return f"Ошибка транскрипции: {str(e)}"
     
+    def _format_transcript(self, segments) -> str:
+        """Собрать текст транскрипта с временными метками"""
+        full_text = []
+        for segment in segments:
+            timestamp = f"[{self._format_timestamp(segment['start'])} --> {self._format_timestamp(segment['end'])}]"
+            full_text.append(f"{timestamp}\n{segment['text']}\n")
+        
+        if full_text:
+            logger.info(f"✅ Транскрипция завершена. Сегментов: {len(self.transcript)}")
+            return "\n".join(full_text)
+        logger.warning("⚠️ Транскрипт пуст - речь не обнаружена")
+        return "Транскрипт пуст: речь не обнаружена в записи"
+    
+    async def stop_recording_async(self):
+        """Остановка без блокировки event loop: склейка сегментов и ffprobe идут в потоке"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.stop_recording)
+    
+    async def cleanup_async(self):
+        """Очистка без блокировки event loop (остановка записи склеивает сегменты)"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.cleanup)
+    
+    async def transcribe_audio_async(self):
+        """Транскрипция без блокировки event loop: поток только ждет результат пула"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.transcribe_audio_whisper)
+    
+    def _transcribe_array(self, audio):
+        """Распознать фрагмент аудио (numpy, 16 кГц моно)"""
+        return transcription_service.transcribe(audio)['segments']
+    
     def _format_timestamp(self, seconds: float) -> str:
         """Форматировать временную метку"""
         hours = int(seconds // 3600)
@@ -1587,7 +1745,22 @@ class MeetingBot:
                 duration = (datetime.now() - self.start_time).total_seconds() / 60
                 info.append(f"⏳ Длительность: {duration:.1f} мин")
             
-            if self.audio_file and os.path.exists(self.audio_file):
+            if self.recorder:
+                size_mb = self.recorder.total_bytes() / (1024 * 1024)
+                line = f"💾 Размер записи: {size_mb:.2f} МБ ({self.record_format['name']})"
+                elapsed = (datetime.now() - self.start_time).total_seconds() if self.start_time else 0
+                if elapsed >= 60:
+                    line += f", ~{size_mb / elapsed * 3600:.0f} МБ/час"
+                info.append(line)
+                if self.recording:
+                    info.append(self.recorder.describe())
+                    if self.level_meter:
+                        info.append(self.level_meter.describe())
+                    if self.browser_capture:
+                        info.append(self.browser_capture.describe())
+                if self.pcm_buffer and self.pcm_buffer.overwritten_sec > 0:
+                    info.append(f"⚠️ Распознавание отстает: потеряно {self.pcm_buffer.overwritten_sec:.0f} с звука")
+            elif self.audio_file and os.path.exists(self.audio_file):
                 size_mb = os.path.getsize(self.audio_file) / (1024 * 1024)
                 info.append(f"💾 Размер записи: {size_mb:.2f} МБ")
             
@@ -1608,7 +1781,14 @@ class MeetingBot:
         self.meeting_active = False  # Останавливаем мониторинг
         if self.recording:
             self.stop_recording()
-        self._force_cleanup_driver()
+        if self.live_transcriber:
+            self.live_transcriber.stop()
+            self.live_transcriber = None
+        self.diagnostics.shutdown()
+        self._force_cleanup_driver(reusable=True)
+        if self.audio_sink:
+            self.audio_sink.destroy()
+            self.audio_sink = None
         # Не удаляем аудио файл - он нужен для транскрипции
 
 
@@ -1616,6 +1796,63 @@ class MeetingBot:
 active_bots: Dict[int, MeetingBot] = {}
 
 
+def _launch_pool_session() -> Dict[str, Any]:
+    """Запустить Chrome для пула (авторизация платформы - при выдаче браузера)"""
+    bot = MeetingBot(connect_github=False)
+    bot._launch_driver(headless=True, auth=False)
+    return {
+        'driver': bot.driver, 'profile_dir': bot._temp_profile_dir,
+        'audio_sink': bot.audio_sink, 'process_tree': bot._process_tree,
+    }
+
+
+def _dispose_pool_session(session: Dict[str, Any]):
+    """Закрыть браузер из пула и убрать его профиль и sink"""
+    import shutil
+    try:
+        session['driver'].quit()
+    except Exception:
+        pass
+    if session.get('process_tree'):
+        session['process_tree'].terminate()
+    if session.get('profile_dir'):
+        shutil.rmtree(session['profile_dir'], ignore_errors=True)
+    if session.get('audio_sink'):
+        session['audio_sink'].destroy()
+
+
+def _build_profile_template(profile_dir: str) -> bool:
+    """Запустить Chrome на профиле шаблона (без авторизации) и корректно закрыть"""
+    bot = MeetingBot(connect_github=False)
+    try:
+        bot._launch_driver(headless=True, template_dir=profile_dir)
+        bot.driver.get('about:blank')
+        return True
+    finally:
+        if bot.driver:
+            try:
+                # quit - Chrome сам дописывает cookies и storage на диск
+                bot.driver.quit()
+            except Exception:
+                pass
+            bot.driver = None
+        bot._terminate_browser_tree()
+
+
+# Готовый профиль копируется на каждую сессию вместо холодного старта; авторизация платформы -
+# поверх копии, поэтому шаблон не зависит от файлов авторизации
+profile_templates = ProfileTemplateManager(
+    CHROME_TEMPLATE_DIR, CHROME_SESSIONS_DIR, _build_profile_template,
+    max_age_sec=PROFILE_TEMPLATE_MAX_AGE_H * 3600
+) if PROFILE_TEMPLATE else None
+
+# Заранее запущенные браузеры: ссылка на встречу не ждет запуска Chrome и авторизации
+driver_pool = DriverPool(
+    _launch_pool_session, _dispose_pool_session,
+    size=DRIVER_POOL_SIZE, max_uses=DRIVER_POOL_MAX_USES, max_rss_mb=DRIVER_POOL_MAX_RSS_MB
+) if DRIVER_POOL_SIZE > 0 else None
+
+
 # Telegram Bot Handlers
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /start"""
@@ -1674,6 +1911,11 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(help_text, parse_mode='Markdown')
 
 
+def _md_escape(text: str) -> str:
+    """Экранировать текст для parse_mode='Markdown' (в кодеках, путях и URL бывают '_' и '*')"""
+    return re.sub(r'([_*`\[])', r'\\\1', text)
+
+
 async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /status"""
     user_id = update.effective_user.id
@@ -1681,13 +1923,40 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if bot and bot.recording:
         info = bot.get_meeting_info()
-        status_text = f"🟢 *Статус: Активен*\n\n{info}"
+        status_text = f"🟢 *Статус: Активен*\n\n{_md_escape(info)}"
     else:
         status_text = "🔴 *Статус: Неактивен*\n\nНет активных встреч"
+    # Диагностика (источник звука с кодеком pcm_s16le и т.п.) - только экранированной
+    diagnostics = [transcription_service.describe(), transcript_cache.describe(), capture_resolver.describe()]
+    if driver_pool:
+        diagnostics.append(driver_pool.describe())
+    if profile_templates:
+        diagnostics.append(profile_templates.describe())
+    status_text += "\n\n" + _md_escape("\n".join(diagnostics))
     
     await update.message.reply_text(status_text, parse_mode='Markdown')
 
 
+async def joinstats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /joinstats [платформа | dump] - время этапов входа (только админ)"""
+    if not ADMIN_CHAT_ID or str(update.effective_chat.id) != str(ADMIN_CHAT_ID):
+        await update.message.reply_text("⛔ Команда доступна только администратору")
+        return
+    
+    args = context.args or []
+    if args and args[0] == 'dump':
+        path = join_metrics.dump()
+        if not path:
+            await update.message.reply_text("❌ Не удалось сохранить метрики входа")
+            return
+        with open(path, 'rb') as f:
+            await update.message.reply_document(f, filename=os.path.basename(path), caption=f"📏 {path}")
+        return
+    
+    # Без Markdown: в названиях этапов есть подчеркивания
+    await update.message.reply_text(join_metrics.describe(args[0] if args else None))
+
+
 async def handle_meeting_url(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик URL встречи"""
     url = update.message.text.strip()
@@ -1703,7 +1972,9 @@ async def handle_meeting_url(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     # Определяем тип встречи
     bot = MeetingBot()
+    bot.chat_id = update.effective_chat.id
     meeting_type = bot.detect_meeting_type(url)
+    bot.meeting_type = meeting_type
     
     if meeting_type == 'unknown':
         await update.message.reply_text(
@@ -1734,15 +2005,7 @@ async def handle_meeting_url(update: Update, context: ContextTypes.DEFAULT_TYPE)
         
         await status_msg.edit_text("🎯 **Встреча обнаружена!**\n\n🔗 **URL:** " + url + "\n\n🚀 **Начинаю обработку...**\n⏳ Подключаюсь к " + meeting_names.get(meeting_type, 'встрече') + "...")
         
-        success = False
-        if meeting_type == 'google_meet':
-            success = bot.join_google_meet(url)
-        elif meeting_type == 'zoom':
-            success = bot.join_zoom_meeting(url)
-        elif meeting_type == 'yandex':
-            success = bot.join_yandex_telemost(url)
-        elif meeting_type == 'contour':
-            success = bot.join_contour_talk(url)
+        success = bot.join_meeting(url)
         
         if success:  # Проверка уже в join_* методах
             await status_msg.edit_text("🎯 **Встреча обнаружена!**\n\n🔗 **URL:** " + url + "\n\n🚀 **Начинаю обработку...**\n✅ Успешно подключился к встрече!")
@@ -1750,7 +2013,11 @@ async def handle_meeting_url(update: Update, context: ContextTypes.DEFAULT_TYPE)
             # Начинаем запись
             await update.message.reply_text("🎙️ Записываю аудио встречи...")
             
-            if bot.start_recording():
+            with join_metrics.phase(meeting_type, 'recording_start') as timer:
+                recording_started = bot.start_recording()
+                if not recording_started:
+                    timer.stop('fail')
+            if recording_started:
                 # Сохраняем бота в активные
                 active_bots[user_id] = bot
                 
@@ -1807,12 +2074,15 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.edit_message_text("❌ Нет активной встречи")
             return
         
-        # Останавливаем запись
-        bot.stop_recording()
+        # Останавливаем запись (склейка сегментов - в потоке, event loop остается свободным)
+        await bot.stop_recording_async()
         
-        # Создаем транскрипт
-        await query.edit_message_text("🎙️ Создаю транскрипт...")
-        transcript = bot.transcribe_audio_whisper()
+        # Создаем транскрипт в пуле воркеров, event loop остается свободным
+        queued = transcription_service.queue_length()
+        await query.edit_message_text(
+            "🎙️ Создаю транскрипт..." + (f"\n⏳ Заданий в очереди: {queued}" if queued else "")
+        )
+        transcript = await bot.transcribe_audio_async()
         
         if transcript:
             # Создаем отчет
@@ -1879,7 +2149,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.edit_message_text("❌ Нет активной встречи")
             return
         
-        bot.cleanup()
+        await bot.cleanup_async()
         if user_id in active_bots:
             del active_bots[user_id]
         
@@ -1888,7 +2158,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif query.data == 'status':
         if bot and bot.recording:
             info = bot.get_meeting_info()
-            await query.message.reply_text(f"🟢 *Статус: Активен*\n\n{info}", parse_mode='Markdown')
+            await query.message.reply_text(f"🟢 *Статус: Активен*\n\n{_md_escape(info)}", parse_mode='Markdown')
         else:
             await query.message.reply_text("🔴 *Статус: Неактивен*\n\nНет активных встреч", parse_mode='Markdown')
     
@@ -1896,6 +2166,14 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await help_command(query, context)
 
 
+async def _shutdown_services(application: Application):
+    """Остановить фоновые сервисы при завершении бота"""
+    transcription_service.shutdown()
+    if driver_pool:
+        driver_pool.shutdown()
+    join_metrics.dump()  # Замеры входа переживают перезапуск
+
+
 def main():
     """Главная функция"""
     if not TELEGRAM_BOT_TOKEN:
@@ -1909,6 +2187,31 @@ def main():
     logger.info(f"🎤 Модель Whisper: {WHISPER_MODEL}")
     logger.info(f"⏱️ Таймаут встречи: {MEETING_TIMEOUT_MIN} минут")
     
+    # Запускаем воркеры транскрипции (модель загружается один раз на воркер)
+    if WHISPER_PRELOAD:
+        transcription_service.start()
+    
+    # Sink'и, оставшиеся после падения прошлого процесса
+    if AUDIO_ISOLATION:
+        cleanup_stale_sinks()
+    
+    # Скриншоты прежних версий в /tmp и снимки сверх бюджета
+    collect_legacy_screenshots()
+    enforce_disk_budget(DIAG_DIR, DIAG_DISK_MB)
+    
+    # Проверяем источники звука заранее, чтобы первая встреча не ждала
+    threading.Thread(target=capture_resolver.resolve, daemon=True, name='capture-resolve').start()
+    
+    # Собираем шаблон профиля (профили упавших сессий удаляются), затем заполняем пул Chrome
+    def _warm_up_browsers():
+        if profile_templates:
+            profile_templates.collect_garbage()
+            profile_templates.collect_legacy_tmp()
+            profile_templates.ensure(block=True)
+        if driver_pool:
+            driver_pool.start()
+    threading.Thread(target=_warm_up_browsers, daemon=True, name='browser-warm-up').start()
+    
     # Проверяем наличие необходимых инструментов
     try:
         subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
@@ -1928,12 +2231,18 @@ def main():
             logger.error("❌ Chrome/Chromium не найден!")
     
     # Создаем приложение
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .post_shutdown(_shutdown_services)
+        .build()
+    )
     
     # Регистрируем обработчики
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("status", status_command))
+    application.add_handler(CommandHandler("joinstats", joinstats_command))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_meeting_url))
     application.add_handler(CallbackQueryHandler(button_callback))
     
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Владение деревом процессов браузера для Meeting Bot
+chromedriver запускается в своей сессии; очистка завершает только его потомков, а не весь Chrome на сервере
+"""
+
+import os
+import time
+import signal
+import logging
+import subprocess
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _proc_stat(pid: int) -> Optional[Tuple[int, int, int]]:
+    """(ppid, pgrp, session) процесса из /proc/<pid>/stat"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            # Имя процесса в скобках может содержать пробелы - берем поля после ')'
+            fields = f.read().rsplit(')', 1)[1].split()
+        return int(fields[1]), int(fields[2]), int(fields[3])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _all_stats() -> Dict[int, Tuple[int, int, int]]:
+    stats = {}
+    for name in os.listdir('/proc'):
+        if name.isdigit():
+            stat = _proc_stat(int(name))
+            if stat:
+                stats[int(name)] = stat
+    return stats
+
+
+def children_map() -> Dict[int, List[int]]:
+    """PID -> дочерние PID по /proc"""
+    children: Dict[int, List[int]] = {}
+    for pid, (ppid, _, _) in _all_stats().items():
+        children.setdefault(ppid, []).append(pid)
+    return children
+
+
+def _alive(pid: int) -> bool:
+    """Жив ли процесс (зомби считается завершенным)"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except (OSError, IndexError):
+        return False
+
+
+class ProcessTree:
+    """Процесс chromedriver, его потомки и его сессия (start_new_session=True)"""
+
+    def __init__(self, root_pid: int, process: Optional[subprocess.Popen] = None):
+        self.root_pid = root_pid
+        self.process = process
+        # Сессией владеем, только если chromedriver сам ее лидер - иначе не тронем чужие процессы
+        try:
+            self.owns_session = os.getsid(root_pid) == root_pid
+        except OSError:
+            self.owns_session = False
+
+    @classmethod
+    def for_service(cls, service) -> Optional['ProcessTree']:
+        """Дерево процесса selenium Service (None - сервис не запущен)"""
+        process = getattr(service, 'process', None)
+        if not process:
+            return None
+        return cls(process.pid, process)
+
+    def pids(self) -> Set[int]:
+        """Все процессы дерева: потомки chromedriver и осиротевшие процессы его сессии"""
+        stats = _all_stats()
+        children: Dict[int, List[int]] = {}
+        for pid, (ppid, _, _) in stats.items():
+            children.setdefault(ppid, []).append(pid)
+        result = set()
+        stack = [self.root_pid]
+        while stack:
+            pid = stack.pop()
+            if pid in stats and pid not in result:
+                result.add(pid)
+                stack.extend(children.get(pid, []))
+        if self.owns_session:
+            result.update(pid for pid, (_, _, session) in stats.items() if session == self.root_pid)
+        result.discard(os.getpid())
+        return result
+
+    def _signal(self, pids: Set[int], sig: int):
+        if self.owns_session:
+            try:
+                os.killpg(self.root_pid, sig)
+            except OSError:
+                pass
+        for pid in pids:
+            try:
+                os.kill(pid, sig)
+            except OSError:
+                pass
+
+    def _reap(self, pids: Set[int]):
+        """Забрать статус завершившихся процессов-детей, чтобы не копились зомби"""
+        if self.process:
+            try:
+                self.process.wait(timeout=1)
+            except Exception:
+                pass
+        for pid in pids:
+            try:
+                os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                pass
+            except OSError:
+                pass
+
+    def terminate(self, grace_sec: float = 5.0) -> int:
+        """SIGTERM всему дереву, через grace_sec - SIGKILL оставшимся; вернуть число процессов"""
+        pids = self.pids()
+        if not pids:
+            self._reap(pids)
+            return 0
+        self._signal(pids, signal.SIGTERM)
+        deadline = time.monotonic() + grace_sec
+        while time.monotonic() < deadline:
+            if not any(_alive(pid) for pid in pids):
+                break
+            time.sleep(0.2)
+        survivors = {pid for pid in pids | self.pids() if _alive(pid)}
+        if survivors:
+            logger.warning(f"Процессы браузера не завершились за {grace_sec:.0f} с, SIGKILL: {sorted(survivors)}")
+            self._signal(survivors, signal.SIGKILL)
+        self._reap(pids | survivors)
+        logger.info(f"Дерево процессов браузера завершено ({len(pids)} процессов)")
+        return len(pids)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Изолированные PulseAudio sink'и для Meeting Bot
+Каждая встреча получает свой null sink: Chrome выводит звук в него, ffmpeg пишет его monitor
+"""
+
+import os
+import re
+import logging
+import itertools
+import subprocess
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SINK_PREFIX = 'meetingbot'
+
+_counter = itertools.count(1)
+
+
+def _pactl(*args: str, timeout: float = 10.0) -> subprocess.CompletedProcess:
+    return subprocess.run(['pactl', *args], capture_output=True, text=True, timeout=timeout)
+
+
+def pulse_available() -> bool:
+    """Есть ли доступный PulseAudio (или PipeWire с pulse-совместимым сервером)"""
+    try:
+        return _pactl('info', timeout=5).returncode == 0
+    except Exception:
+        return False
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class PulseSink:
+    """Null sink одной встречи и его monitor-источник"""
+
+    def __init__(self, name: Optional[str] = None):
+        # В имени PID процесса - по нему находим sink'и, оставшиеся после падения
+        self.name = name or f"{SINK_PREFIX}_{os.getpid()}_{next(_counter)}"
+        self.module_id: Optional[int] = None
+
+    @property
+    def monitor(self) -> str:
+        return f"{self.name}.monitor"
+
+    def create(self) -> bool:
+        """Загрузить module-null-sink; False - PulseAudio недоступен"""
+        try:
+            result = _pactl(
+                'load-module', 'module-null-sink',
+                f'sink_name={self.name}',
+                f'sink_properties=device.description={self.name}'
+            )
+        except Exception as e:
+            logger.warning(f"Не удалось создать аудио sink {self.name}: {e}")
+            return False
+        if result.returncode != 0 or not result.stdout.strip().isdigit():
+            logger.warning(f"Не удалось создать аудио sink {self.name}: {result.stderr.strip()}")
+            return False
+        self.module_id = int(result.stdout.strip())
+        logger.info(f"🔈 Создан аудио sink встречи: {self.name} (модуль {self.module_id})")
+        return True
+
+    def chrome_env(self) -> Dict[str, str]:
+        """Окружение для Chrome: весь его звук идет в этот sink"""
+        return dict(os.environ, PULSE_SINK=self.name)
+
+    def input_args(self) -> List[str]:
+        """Аргументы ffmpeg для записи только этого sink'а"""
+        return ['-f', 'pulse', '-i', self.monitor]
+
+    def destroy(self):
+        """Выгрузить sink"""
+        if self.module_id is None:
+            return
+        try:
+            _pactl('unload-module', str(self.module_id))
+            logger.info(f"Аудио sink удален: {self.name}")
+        except Exception as e:
+            logger.warning(f"Не удалось удалить аудио sink {self.name}: {e}")
+        finally:
+            self.module_id = None
+
+
+def cleanup_stale_sinks() -> int:
+    """Выгрузить sink'и процессов бота, которые уже завершились"""
+    try:
+        result = _pactl('list', 'short', 'modules')
+    except Exception:
+        return 0
+    removed = 0
+    pattern = re.compile(rf'sink_name={SINK_PREFIX}_(\d+)_\d+')
+    for line in result.stdout.splitlines():
+        fields = line.split('\t')
+        match = pattern.search(line)
+        if len(fields) < 2 or fields[1] != 'module-null-sink' or not match:
+            continue
+        if _pid_alive(int(match.group(1))):
+            continue
+        try:
+            _pactl('unload-module', fields[0])
+            removed += 1
+        except Exception:
+            pass
+    if removed:
+        logger.info(f"Удалено оставшихся аудио sink'ов: {removed}")
+    return removed
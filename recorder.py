@@ -0,0 +1,854 @@
+#!/usr/bin/env python3
+"""
+Запись аудио встречи через ffmpeg для Meeting Bot
+Супервизор читает вывод ffmpeg, собирает метрики и перезапускает зависшую запись
+Сегментированная запись: файлы фиксированной длины + манифест, переживающий перезапуск
+Источник звука определяется один раз параллельной проверкой и запоминается
+Режим pipe: ffmpeg отдает сырой PCM в stdout, запись в файл - необязательная копия
+"""
+
+import os
+import re
+import csv
+import glob
+import json
+import time
+import uuid
+import shutil
+import logging
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Форматы записи: Whisper все равно сводит звук в моно 16 кГц, стерео не нужно
+RECORD_FORMATS: Dict[str, Dict[str, Any]] = {
+    # Несжатый моно PCM: ~1.9 МБ/мин, можно читать по мере записи
+    'wav': {
+        'ext': '.wav',
+        'muxer': 'wav',
+        'args': ['-ac', '1', '-ar', '16000', '-c:a', 'pcm_s16le'],
+        'streamable': True,
+    },
+    # Сжатие без потерь: ~0.9 МБ/мин
+    'flac': {
+        'ext': '.flac',
+        'muxer': 'flac',
+        'args': ['-ac', '1', '-ar', '16000', '-c:a', 'flac', '-compression_level', '5'],
+        'streamable': False,
+    },
+    # Речевой Opus: ~0.2 МБ/мин при 24 кбит/с
+    'opus': {
+        'ext': '.ogg',
+        'muxer': 'ogg',
+        'args': ['-ac', '1', '-ar', '16000', '-c:a', 'libopus', '-application', 'voip'],
+        'streamable': False,
+    },
+}
+
+
+def get_record_format(name: str, opus_bitrate: str = '24k') -> Dict[str, Any]:
+    """Параметры формата записи (неизвестный формат -> wav)"""
+    fmt = RECORD_FORMATS.get(name)
+    if fmt is None:
+        logger.warning(f"Неизвестный формат записи '{name}', используется wav")
+        name, fmt = 'wav', RECORD_FORMATS['wav']
+    fmt = dict(fmt, name=name, args=list(fmt['args']))
+    if name == 'opus':
+        fmt['args'] += ['-b:a', opus_bitrate]
+    return fmt
+
+
+# Источники звука на Linux VPS в порядке предпочтения
+CAPTURE_CANDIDATES: List[List[str]] = [
+    ['-f', 'alsa', '-i', 'hw:0,0'],
+    ['-f', 'alsa', '-i', 'hw:0,1'],
+    ['-f', 'alsa', '-i', 'plughw:0,0'],
+    ['-f', 'alsa', '-i', 'plughw:0,1'],
+    ['-f', 'pulse', '-i', 'default'],
+    ['-f', 'alsa', '-i', 'default'],
+]
+
+# Сырой PCM для распознавания: моно float32 16 кГц
+PCM_SAMPLE_RATE = 16000
+
+# Строка блока -progress: key=value без пробелов
+_PROGRESS_LINE_RE = re.compile(r'^\w+=\S*$')
+
+# "Stream #0:0: Audio: pcm_s16le, 48000 Hz, 2 channels, s16, 1536 kb/s"
+_AUDIO_STREAM_RE = re.compile(r'Audio: (\w+), (\d+) Hz, ([^,]+), (\w+)')
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+
+
+def probe_duration(path: str) -> float:
+    """Длительность файла через ffprobe (0 - не удалось определить)"""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', path],
+            capture_output=True, text=True, timeout=30
+        )
+        return float(result.stdout.strip())
+    except Exception:
+        return 0.0
+
+
+def _pid_alive(pid: int) -> bool:
+    """Жив ли процесс pid (чужой процесс без прав на сигнал - тоже жив)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class RecordingManifest:
+    """Манифест сегментированной записи: какие куски закрыты и где они на шкале встречи"""
+
+    # Токены манифестов, которые сейчас пишут записи этого процесса
+    _held: set = set()
+    _held_lock = threading.Lock()
+    _resume_lock = threading.Lock()  # Две записи одной встречи не возобновляют один манифест
+
+    def __init__(self, path: str, data: Dict[str, Any]):
+        self.path = path
+        self.data = data
+        self._lock = threading.Lock()
+
+    def _claim(self):
+        """Стать владельцем манифеста: pid процесса и токен этой записи"""
+        token = uuid.uuid4().hex
+        with self._held_lock:
+            self._held.add(token)
+        self.data['owner'] = {'pid': os.getpid(), 'token': token}
+        self.save()
+
+    def release(self):
+        """Запись этого процесса больше не держит манифест"""
+        token = (self.data.get('owner') or {}).get('token')
+        with self._held_lock:
+            self._held.discard(token)
+
+    @classmethod
+    def _owner_alive(cls, data: Dict[str, Any]) -> bool:
+        """Манифест пишет живая запись: этого процесса (токен удерживается) или другого живого процесса"""
+        owner = data.get('owner') or {}
+        pid = owner.get('pid')
+        if not pid:
+            return False
+        if pid == os.getpid():
+            # Тот же pid бывает и после перезапуска контейнера - решает только токен
+            with cls._held_lock:
+                return owner.get('token') in cls._held
+        return _pid_alive(pid)
+
+    @classmethod
+    def create(cls, base_path: str, meeting_url: str, record_format: Dict[str, Any],
+               segment_sec: int) -> 'RecordingManifest':
+        """Новый манифест для записи base_path (без расширения)"""
+        # Две записи, начатые в одну секунду, не должны делить файлы
+        base, copy = base_path, 1
+        while os.path.exists(f"{base}.manifest.json"):
+            copy += 1
+            base = f"{base_path}-{copy}"
+        base_path = base
+        now = time.time()
+        manifest = cls(f"{base_path}.manifest.json", {
+            'base': base_path,
+            'ext': record_format['ext'],
+            'format': record_format['name'],
+            'meeting_url': meeting_url,
+            'segment_sec': segment_sec,
+            'status': 'recording',
+            'created_at': now,
+            'updated_at': now,
+            'runs': [],
+            'segments': [],
+        })
+        manifest._claim()
+        return manifest
+
+    @classmethod
+    def load(cls, path: str) -> 'RecordingManifest':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(path, json.load(f))
+
+    @classmethod
+    def find_resumable(cls, record_dir: str, meeting_url: str, record_format: Dict[str, Any],
+                       max_age_sec: float) -> Optional['RecordingManifest']:
+        """Найти незавершенную запись той же встречи (процесс упал посреди записи).
+        Манифест, который еще пишет живая запись (эта или другого процесса), не берется"""
+        with cls._resume_lock:
+            candidates = []
+            for path in glob.glob(os.path.join(record_dir, '*.manifest.json')):
+                try:
+                    manifest = cls.load(path)
+                except Exception:
+                    continue
+                data = manifest.data
+                if (data.get('status') == 'recording' and data.get('meeting_url') == meeting_url
+                        and data.get('ext') == record_format['ext']
+                        and time.time() - data.get('updated_at', 0) < max_age_sec
+                        and not cls._owner_alive(data)):
+                    candidates.append(manifest)
+            if not candidates:
+                return None
+            manifest = max(candidates, key=lambda m: m.data['updated_at'])
+            manifest._claim()
+        manifest.recover()
+        return manifest
+
+    @property
+    def final_path(self) -> str:
+        """Итоговый файл, собранный из сегментов"""
+        return f"{self.data['base']}{self.data['ext']}"
+
+    def segment_pattern(self) -> str:
+        """Шаблон имени сегмента для ffmpeg"""
+        return f"{self.data['base']}_%05d{self.data['ext']}"
+
+    def _index_of(self, filename: str) -> Optional[int]:
+        match = re.search(r'_(\d{5})' + re.escape(self.data['ext']) + r'$', filename)
+        return int(match.group(1)) if match else None
+
+    def duration(self) -> float:
+        """Конец последнего закрытого сегмента на шкале встречи"""
+        segments = self.data['segments']
+        return segments[-1]['end'] if segments else 0.0
+
+    def next_index(self) -> int:
+        """Номер следующего сегмента (с учетом файлов, которые не попали в манифест)"""
+        indexes = [seg['index'] for seg in self.data['segments']]
+        for path in glob.glob(f"{glob.escape(self.data['base'])}_*{self.data['ext']}"):
+            index = self._index_of(path)
+            if index is not None:
+                indexes.append(index)
+        return max(indexes) + 1 if indexes else 0
+
+    def begin_run(self) -> Dict[str, Any]:
+        """Зарегистрировать новый запуск ffmpeg: его сегменты продолжают шкалу времени"""
+        with self._lock:
+            run = {
+                'csv': f"{self.data['base']}.run{len(self.data['runs']) + 1}.csv",
+                'offset': self.duration(),
+                'start_index': self.next_index(),
+            }
+            self.data['runs'].append(run)
+        self.save()
+        return run
+
+    def abort_run(self, run: Dict[str, Any]):
+        """Убрать запуск, который не стартовал"""
+        with self._lock:
+            if run in self.data['runs']:
+                self.data['runs'].remove(run)
+        try:
+            os.remove(run['csv'])
+        except OSError:
+            pass
+        self.save()
+
+    def collect(self) -> int:
+        """Добавить в манифест сегменты, которые ffmpeg закрыл (по его segment_list)"""
+        added = 0
+        with self._lock:
+            known = {seg['index'] for seg in self.data['segments']}
+            directory = os.path.dirname(self.data['base'])
+            for run in self.data['runs']:
+                try:
+                    with open(run['csv'], 'r', encoding='utf-8', newline='') as f:
+                        rows = list(csv.reader(f))
+                except OSError:
+                    continue
+                for row in rows:
+                    if len(row) < 3:
+                        continue
+                    index = self._index_of(row[0])
+                    if index is None or index in known:
+                        continue
+                    try:
+                        start, end = float(row[1]), float(row[2])
+                    except ValueError:
+                        continue
+                    self.data['segments'].append({
+                        'index': index,
+                        'file': os.path.join(directory, os.path.basename(row[0])),
+                        'start': run['offset'] + start,
+                        'end': run['offset'] + end,
+                    })
+                    known.add(index)
+                    added += 1
+            if added:
+                self.data['segments'].sort(key=lambda seg: seg['index'])
+        self.save()
+        return added
+
+    def recover(self):
+        """После падения: подобрать сегменты, которые ffmpeg не успел закрыть"""
+        self.collect()
+        known = {seg['index'] for seg in self.data['segments']}
+        orphans = []
+        for path in glob.glob(f"{glob.escape(self.data['base'])}_*{self.data['ext']}"):
+            index = self._index_of(path)
+            if index is not None and index not in known:
+                orphans.append((index, path))
+        for index, path in sorted(orphans):
+            duration = probe_duration(path)
+            if duration <= 0:
+                continue
+            start = self.duration()
+            self.data['segments'].append({'index': index, 'file': path, 'start': start, 'end': start + duration})
+            logger.info(f"Восстановлен незакрытый сегмент {os.path.basename(path)} ({duration:.0f} с)")
+        self.save()
+
+    def closed_segments(self) -> List[Dict[str, Any]]:
+        """Закрытые сегменты: путь и положение на шкале встречи"""
+        with self._lock:
+            return [
+                {'path': seg['file'], 'start': seg['start'], 'end': seg['end']}
+                for seg in self.data['segments']
+            ]
+
+    def mark_stopped(self, final_path: Optional[str]):
+        """Запись завершена штатно - возобновлять больше нечего"""
+        self.data['status'] = 'stopped'
+        self.data['final'] = final_path
+        self.save()
+        self.release()
+
+    def discard_segments(self, final_path: str):
+        """Итоговый файл проверен: шкала встречи - один файл, сегменты, списки ffmpeg и манифест удаляются"""
+        with self._lock:
+            segments = self.data['segments']
+            start, end = (segments[0]['start'], segments[-1]['end']) if segments else (0.0, 0.0)
+            # Сначала в памяти: распознавание хвоста читает уже итоговый файл
+            self.data['segments'] = [{'index': 0, 'file': final_path, 'start': start, 'end': end}]
+            self.data['status'] = 'stopped'
+            self.data['final'] = final_path
+            paths = [run['csv'] for run in self.data['runs']] + [self.path]
+        self.release()
+        for path in glob.glob(f"{glob.escape(self.data['base'])}_*{self.data['ext']}"):
+            if self._index_of(path) is not None:
+                paths.append(path)
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def save(self):
+        """Атомарно записать манифест на диск"""
+        with self._lock:
+            self.data['updated_at'] = time.time()
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.error(f"Ошибка сохранения манифеста записи: {e}")
+
+
+class FfmpegRecorder:
+    """Супервизор процесса ffmpeg: дренаж вывода, метрики, перезапуск при зависании"""
+
+    def __init__(self, input_args: List[str], output_path: str, output_args: List[str],
+                 stall_sec: float = 30.0, check_sec: float = 5.0,
+                 manifest: Optional[RecordingManifest] = None, muxer: Optional[str] = None,
+                 pcm_sink: Optional[Callable[[bytes], None]] = None, pcm_rate: int = PCM_SAMPLE_RATE,
+                 stdin_feed: bool = False):
+        self.input_args = list(input_args)
+        self.output_path = output_path
+        self.output_args = list(output_args)
+        self.stall_sec = stall_sec
+        self.check_sec = check_sec
+        # С манифестом ffmpeg пишет сегменты фиксированной длины вместо одного файла
+        self.manifest = manifest
+        self.muxer = muxer
+        self._run: Optional[Dict[str, Any]] = None
+        # Потребитель сырого PCM из stdout; output_path=None - без записи на диск
+        self.pcm_sink = pcm_sink
+        self.pcm_rate = pcm_rate
+        # Вход подается в stdin (звук из браузера); заголовок потока повторяется каждому новому ffmpeg
+        self.stdin_feed = stdin_feed
+        self.input_header: Optional[bytes] = None
+        self._stdin_lock = threading.Lock()
+
+        self.parts: List[str] = []  # Файлы записи; новый файл появляется после перезапуска
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts = 0
+        self.stderr_tail = deque(maxlen=50)
+        self.metrics: Dict[str, Any] = {}
+        self._progress_at = 0.0  # Когда ffmpeg последний раз продвинулся по времени
+        self._generation = 0  # Номер текущего процесса: вывод старых процессов игнорируется
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._restart_lock = threading.Lock()  # Перезапуск из сторожа и смена источника не пересекаются
+        self._watchdog = None
+        if manifest:
+            # Возобновленная запись: время продолжается с конца прошлых сегментов
+            self.metrics['parts_time_sec'] = manifest.duration()
+            self.metrics['out_time_sec'] = manifest.duration()
+
+    def _part_path(self) -> Optional[str]:
+        """Путь следующего файла: первый - output_path, дальше _part2, _part3..."""
+        if self.output_path is None:
+            return None
+        if self.manifest:
+            return self.manifest.segment_pattern()
+        if not self.parts:
+            return self.output_path
+        base, ext = os.path.splitext(self.output_path)
+        return f"{base}_part{len(self.parts) + 1}{ext}"
+
+    def command(self, path: Optional[str]) -> List[str]:
+        """Полная команда ffmpeg для записи в path (и/или PCM в stdout)"""
+        pcm_args = []
+        if self.pcm_sink:
+            # stdout занят звуком - прогресс идет в stderr
+            pcm_args = ['-map', '0:a', '-ac', '1', '-ar', str(self.pcm_rate), '-f', 'f32le', 'pipe:1']
+        segment_args = []
+        if self.manifest and path:
+            segment_args = [
+                '-f', 'segment',
+                '-segment_time', str(self.manifest.data['segment_sec']),
+                '-segment_format', self.muxer,
+                '-reset_timestamps', '1',
+                '-segment_start_number', str(self._run['start_index']),
+                '-segment_list', self._run['csv'],
+                '-segment_list_type', 'csv',
+            ]
+        file_args = [*self.output_args, *segment_args, '-y', path] if path else []
+        return [
+            'ffmpeg', *([] if self.stdin_feed else ['-nostdin']), '-hide_banner', '-nostats',
+            '-progress', 'pipe:2' if self.pcm_sink else 'pipe:1',
+            *self.input_args, *pcm_args, *file_args
+        ]
+
+    def _launch(self) -> subprocess.Popen:
+        """Запустить ffmpeg в новый файл и потоки чтения его вывода"""
+        path = self._part_path()
+        if self.manifest and path:
+            self._run = self.manifest.begin_run()
+        cmd = self.command(path)
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            stdin=subprocess.PIPE if self.stdin_feed else subprocess.DEVNULL
+        )
+        if self.stdin_feed and self.input_header:
+            self._write_stdin(process, self.input_header)
+        if path and not self.manifest:
+            self.parts.append(path)
+        self.process = process
+        self._progress_at = time.monotonic()
+        if self.pcm_sink:
+            threading.Thread(target=self._read_pcm, args=(process, self._generation), daemon=True,
+                             name='ffmpeg-pcm').start()
+            threading.Thread(target=self._read_progress, args=(process, self._generation, process.stderr),
+                             daemon=True, name='ffmpeg-progress').start()
+        else:
+            threading.Thread(target=self._read_progress, args=(process, self._generation), daemon=True,
+                             name='ffmpeg-progress').start()
+            threading.Thread(target=self._drain_stderr, args=(process,), daemon=True,
+                             name='ffmpeg-stderr').start()
+        logger.info(f"Команда: {' '.join(cmd)}")
+        return process
+
+    def start(self, startup_sec: float = 1.0) -> bool:
+        """Запустить запись; False - ffmpeg завершился сразу (источник не работает)"""
+        process = self._launch()
+        deadline = time.monotonic() + startup_sec
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                if self.manifest and self._run:
+                    self.manifest.abort_run(self._run)
+                elif self.parts:
+                    self.parts.pop()
+                logger.debug(f"ffmpeg завершился при старте: {' '.join(list(self.stderr_tail)[-3:])}")
+                return False
+            time.sleep(0.1)
+
+        self._watchdog = threading.Thread(target=self._watch, daemon=True, name='ffmpeg-watchdog')
+        self._watchdog.start()
+        return True
+
+    def _read_progress(self, process: subprocess.Popen, generation: int, stream=None):
+        """Разбирать блоки -progress (key=value) в живые метрики"""
+        stream = stream or process.stdout
+        block: Dict[str, str] = {}
+        for raw in iter(stream.readline, b''):
+            line = raw.decode('utf-8', 'replace').strip()
+            if not _PROGRESS_LINE_RE.match(line):
+                # В режиме pipe прогресс и сообщения ffmpeg идут в одном stderr
+                if stream is process.stderr and line:
+                    self._on_stderr_line(line)
+                continue
+            key, value = line.split('=', 1)
+            block[key.strip()] = value.strip()
+            if key != 'progress':
+                continue
+            self._apply_progress(block, generation)
+            block = {}
+
+    def _apply_progress(self, block: Dict[str, str], generation: int):
+        """Обновить метрики по одному блоку прогресса"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            previous_time = self.metrics.get('out_time_sec', 0.0)
+            try:
+                out_time = int(block.get('out_time_us', block.get('out_time_ms', '0'))) / 1_000_000
+            except ValueError:
+                out_time = previous_time
+            # Время части считается от нуля: суммируем с предыдущими частями
+            out_time += self.metrics.get('parts_time_sec', 0.0)
+            if out_time > previous_time:
+                self._progress_at = time.monotonic()
+            self.metrics['out_time_sec'] = max(out_time, previous_time)
+            if block.get('total_size', 'N/A').isdigit():
+                self.metrics['part_bytes'] = int(block['total_size'])
+            self.metrics['bitrate'] = block.get('bitrate', self.metrics.get('bitrate', 'N/A'))
+            self.metrics['speed'] = block.get('speed', self.metrics.get('speed', 'N/A'))
+            for key in ('drop_frames', 'dup_frames'):
+                if block.get(key, '').isdigit():
+                    self.metrics[key] = self.metrics.get(f'{key}_prev', 0) + int(block[key])
+            self.metrics['updated_at'] = time.time()
+
+    def _read_pcm(self, process: subprocess.Popen, generation: int):
+        """Передавать сырой PCM из stdout потребителю по мере поступления"""
+        read_bytes = self.pcm_rate // 10 * 4  # 100 мс float32
+        for data in iter(lambda: process.stdout.read(read_bytes), b''):
+            if generation != self._generation:
+                continue
+            try:
+                self.pcm_sink(data)
+            except Exception as e:
+                logger.error(f"Ошибка обработки PCM: {e}")
+
+    def _drain_stderr(self, process: subprocess.Popen):
+        """Постоянно читать stderr, чтобы ffmpeg не заблокировался на записи в пайп"""
+        for raw in iter(process.stderr.readline, b''):
+            line = raw.decode('utf-8', 'replace').rstrip()
+            if line:
+                self._on_stderr_line(line)
+
+    def _on_stderr_line(self, line: str):
+        self.stderr_tail.append(line)
+        lowered = line.lower()
+        if 'error' in lowered or 'overrun' in lowered:
+            logger.warning(f"[ffmpeg] {line}")
+
+    def _watch(self):
+        """Следить за процессом: падение или отсутствие прогресса -> новый файл записи"""
+        while not self._stopping.wait(self.check_sec):
+            if self.manifest:
+                # Закрытые сегменты сразу попадают в манифест - их можно распознавать
+                self.manifest.collect()
+            process = self.process
+            exited = process.poll() is not None
+            stalled = time.monotonic() - self._progress_at > self.stall_sec
+            if not exited and not stalled:
+                continue
+            reason = f"ffmpeg завершился с кодом {process.returncode}" if exited else \
+                f"нет прогресса {self.stall_sec:.0f} с"
+            logger.warning(f"⚠️ Запись зависла ({reason}), перезапускаю в новый файл")
+            self._restart()
+
+    def _restart(self):
+        """Остановить текущий ffmpeg и продолжить запись в следующий файл"""
+        with self._restart_lock:
+            self._restart_locked()
+
+    def _restart_locked(self):
+        self._terminate(self.process)
+        with self._lock:
+            self._generation += 1
+            # Счетчики новой части начинаются с нуля - запоминаем накопленное
+            self.metrics['parts_time_sec'] = self.metrics.get('out_time_sec', 0.0)
+            self.metrics['parts_bytes'] = self.metrics.get('parts_bytes', 0) + self.metrics.get('part_bytes', 0)
+            self.metrics['part_bytes'] = 0
+            for key in ('drop_frames', 'dup_frames'):
+                self.metrics[f'{key}_prev'] = self.metrics.get(key, 0)
+        if self._stopping.is_set():
+            return
+        if self.manifest:
+            # Незакрытый сегмент упавшего ffmpeg тоже остается на шкале встречи
+            self.manifest.recover()
+        self.restarts += 1
+        try:
+            self._launch()
+        except Exception as e:
+            logger.error(f"Не удалось перезапустить ffmpeg: {e}")
+
+    def _write_stdin(self, process: subprocess.Popen, data: bytes):
+        with self._stdin_lock:
+            try:
+                process.stdin.write(data)
+                process.stdin.flush()
+            except (BrokenPipeError, OSError, ValueError):
+                # ffmpeg завершился - сторож перезапустит его, кусок потерян
+                pass
+
+    def write_input(self, data: bytes):
+        """Подать данные во вход текущего ffmpeg (режим stdin_feed)"""
+        process = self.process
+        if process and process.poll() is None:
+            self._write_stdin(process, data)
+
+    def restart(self, reason: str):
+        """Перезапустить ffmpeg в следующий файл по внешней причине"""
+        logger.warning(f"⚠️ Перезапуск записи: {reason}")
+        self._restart()
+
+    def switch_input(self, input_args: List[str]):
+        """Продолжить запись с другого источника звука (в следующий файл)"""
+        logger.warning(f"🔁 Переключаю источник звука: {' '.join(input_args)}")
+        self.input_args = list(input_args)
+        self._restart()
+
+    @staticmethod
+    def _terminate(process: Optional[subprocess.Popen]):
+        """Корректно завершить ffmpeg (SIGTERM - он допишет заголовок файла)"""
+        if not process or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        """Остановить запись"""
+        self._stopping.set()
+        self._terminate(self.process)
+        if self._watchdog:
+            self._watchdog.join(timeout=self.check_sec + 1)
+        if self.manifest:
+            # Последний сегмент закрывается при завершении ffmpeg
+            self.manifest.collect()
+
+    def files(self) -> List[str]:
+        """Файлы записи по порядку (в сегментном режиме - закрытые сегменты)"""
+        if self.manifest:
+            return [seg['path'] for seg in self.manifest.closed_segments()]
+        return list(self.parts)
+
+    def finalize(self) -> Optional[str]:
+        """Собрать части записи в один файл (после stop); вернуть путь итогового файла.
+        Части удаляются, только если длительность итогового файла сошлась с их суммой"""
+        if self.manifest:
+            segments = [seg for seg in self.manifest.closed_segments()
+                        if os.path.exists(seg['path']) and os.path.getsize(seg['path']) > 0]
+            if not segments:
+                self.manifest.mark_stopped(None)
+                return None
+            final_path = self.manifest.final_path
+            expected = sum(seg['end'] - seg['start'] for seg in segments)
+            merged = self._concat([seg['path'] for seg in segments], final_path)
+            if merged == final_path and self._verify_merge(merged, expected):
+                self.manifest.discard_segments(merged)
+            else:
+                self.manifest.mark_stopped(merged)
+            return merged
+        parts = [p for p in self.parts if os.path.exists(p) and os.path.getsize(p) > 0]
+        if not parts:
+            return None
+        if len(parts) == 1:
+            return parts[0]
+        base, ext = os.path.splitext(self.output_path)
+        expected = sum(probe_duration(part) for part in parts)
+        merged = self._concat(parts, f"{base}_full{ext}")
+        if merged not in parts and self._verify_merge(merged, expected):
+            # Распознавание хвоста читает части по списку - теперь это один файл
+            self.parts = [merged]
+            for part in parts:
+                try:
+                    os.remove(part)
+                except OSError:
+                    pass
+        return merged
+
+    @staticmethod
+    def _verify_merge(merged: str, expected_sec: float) -> bool:
+        """Итоговый файл есть и по длительности совпадает с частями"""
+        if not os.path.exists(merged) or os.path.getsize(merged) == 0:
+            return False
+        duration = probe_duration(merged)
+        if duration > 0 and abs(duration - expected_sec) <= max(2.0, expected_sec * 0.01):
+            return True
+        logger.warning(f"Итоговый файл {merged}: {duration:.1f} с вместо {expected_sec:.1f} с - части записи сохранены")
+        return False
+
+    def _concat(self, parts: List[str], merged: str) -> str:
+        """Склеить файлы без перекодирования (concat demuxer)"""
+        if len(parts) == 1 and parts[0] != merged:
+            try:
+                shutil.copyfile(parts[0], merged)
+                return merged
+            except OSError as e:
+                logger.error(f"Ошибка копирования записи в {merged}: {e}")
+                return parts[0]
+        base, _ = os.path.splitext(merged)
+        list_path = f"{base}_parts.txt"
+        try:
+            with open(list_path, 'w', encoding='utf-8') as f:
+                for part in parts:
+                    f.write(f"file '{os.path.abspath(part)}'\n")
+            subprocess.run(
+                ['ffmpeg', '-nostdin', '-v', 'error', '-f', 'concat', '-safe', '0',
+                 '-i', list_path, '-c', 'copy', '-y', merged],
+                capture_output=True, check=True, timeout=600
+            )
+            logger.info(f"Части записи ({len(parts)}) объединены: {merged}")
+            return merged
+        except Exception as e:
+            logger.error(f"Ошибка объединения частей записи: {e}")
+            return parts[0]
+        finally:
+            try:
+                os.remove(list_path)
+            except OSError:
+                pass
+
+    def total_bytes(self) -> int:
+        """Объем записанных файлов"""
+        if self.manifest:
+            base = self.manifest.data['base']
+            paths = glob.glob(f"{glob.escape(base)}_*{self.manifest.data['ext']}")
+        else:
+            paths = self.parts
+        return sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+
+    def describe(self) -> str:
+        """Живые метрики записи для get_meeting_info"""
+        with self._lock:
+            metrics = dict(self.metrics)
+        written_mb = (metrics.get('parts_bytes', 0) + metrics.get('part_bytes', 0)) / (1024 * 1024)
+        line = (
+            f"📈 ffmpeg: {_format_duration(metrics.get('out_time_sec', 0.0))}, записано {written_mb:.2f} МБ, "
+            f"{metrics.get('bitrate', 'N/A')}, скорость {metrics.get('speed', 'N/A')}"
+        )
+        line += f", потеряно кадров {metrics.get('drop_frames', 0)}"
+        if self.restarts:
+            line += f", перезапусков {self.restarts}"
+        if not self.is_running() and not self._stopping.is_set():
+            line += " ⚠️ процесс не работает"
+        return line
+
+
+class CaptureSourceResolver:
+    """Выбор рабочего источника звука: все кандидаты проверяются параллельно, победитель кэшируется"""
+
+    def __init__(self, cache_path: str, candidates: Optional[List[List[str]]] = None,
+                 probe_sec: float = 0.5, probe_timeout: float = 10.0):
+        self.cache_path = cache_path
+        self.candidates = [list(c) for c in (candidates or CAPTURE_CANDIDATES)]
+        self.probe_sec = probe_sec
+        self.probe_timeout = probe_timeout
+        self.probes = 0
+        self._source: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Источник, найденный при прошлом запуске"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                source = json.load(f)
+            if source.get('input_args') in self.candidates:
+                self._source = source
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._source, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения источника звука: {e}")
+
+    def probe(self, input_args: List[str]) -> Optional[Dict[str, Any]]:
+        """Записать probe_sec секунд в никуда; вернуть формат источника или None"""
+        cmd = ['ffmpeg', '-nostdin', '-hide_banner', *input_args, '-t', str(self.probe_sec), '-f', 'null', '-']
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.probe_timeout)
+        except Exception as e:
+            logger.debug(f"Проверка источника {' '.join(input_args)}: {e}")
+            return None
+        if result.returncode != 0:
+            return None
+        source: Dict[str, Any] = {'input_args': list(input_args), 'probed_at': time.time()}
+        match = _AUDIO_STREAM_RE.search(result.stderr)
+        if match:
+            source.update(
+                codec=match.group(1), sample_rate=int(match.group(2)),
+                channels=match.group(3), sample_fmt=match.group(4)
+            )
+        return source
+
+    def probe_all(self) -> List[Dict[str, Any]]:
+        """Проверить всех кандидатов одновременно; рабочие - в порядке предпочтения"""
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(self.candidates), thread_name_prefix='capture-probe') as pool:
+            results = list(pool.map(self.probe, self.candidates))
+        self.probes += 1
+        working = [r for r in results if r]
+        logger.info(
+            f"🎙️ Проверка источников звука: рабочих {len(working)} из {len(self.candidates)} "
+            f"за {time.monotonic() - started:.1f} с"
+        )
+        return working
+
+    def resolve(self, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Рабочий источник: из кэша, а при refresh или пустом кэше - после проверки"""
+        with self._lock:
+            if self._source and not refresh:
+                return self._source
+            working = self.probe_all()
+            self._source = working[0] if working else None
+            if self._source:
+                self._save()
+                logger.info(f"🎙️ Источник звука: {self.describe_source(self._source)}")
+            return self._source
+
+    def invalidate(self):
+        """Источник перестал работать - следующий resolve проверит всех заново"""
+        with self._lock:
+            self._source = None
+        try:
+            os.remove(self.cache_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def describe_source(source: Dict[str, Any]) -> str:
+        text = ' '.join(source['input_args'])
+        if source.get('sample_rate'):
+            text += f" ({source['codec']}, {source['sample_rate']} Hz, {source['channels']}, {source['sample_fmt']})"
+        return text
+
+    def describe(self) -> str:
+        """Текущий источник для статуса"""
+        source = self._source
+        if not source:
+            return "🎙️ Источник звука: не определен"
+        return f"🎙️ Источник звука: {self.describe_source(source)}"
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Реестр селекторов платформ для Meeting Bot
+Кандидаты описываются декларативно и компилируются в одну функцию на странице: все селекторы группы
+проверяются за один execute_script, а не за сотни запросов find_elements/.text/get_attribute
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# Кандидат: {'css' | 'xpath' | 'id': селектор} или {'text': [слова], 'tag': 'button'} (поиск по тексту),
+# необязательно 'match': [[слова], ...] - текст/aria-label/title элемента должен содержать
+# хотя бы одно слово из каждого списка. Порядок в группе - приоритет
+Candidate = Dict[str, Any]
+
+SELECTORS: Dict[str, Dict[str, List[Candidate]]] = {
+    'google_meet': {
+        'join': [
+            {'css': "button[aria-label*='Join now' i]"},
+            {'css': "button[aria-label*='Ask to join' i]"},
+            {'css': "button[jsname='Qx7uuf']"},
+            {'xpath': "//button[contains(translate(., 'JOIN', 'join'), 'join')]"},
+            {'xpath': "//button[contains(., 'Join now')]"},
+            {'xpath': "//button[contains(., 'Ask to join')]"},
+            {'xpath': "//button[contains(., 'Присоединиться')]"},
+            {'xpath': "//span[contains(translate(., 'JOIN', 'join'), 'join')]/parent::button"},
+            # Последняя попытка - любая кнопка с подходящим текстом
+            {'text': ['join', 'присоединиться', 'войти'], 'tag': 'button'},
+        ],
+        'name_input': [
+            {'css': "input[type='text']", 'match': [['name', 'имя']]},
+        ],
+        'prejoin': [
+            {'css': "button[aria-label*='Join now' i]"},
+            {'css': "button[aria-label*='Ask to join' i]"},
+            {'css': "button[jsname='Qx7uuf']"},
+            {'css': "input[type='text']"},
+        ],
+        'prejoin_camera_off': [
+            {'css': "button[aria-label]", 'match': [['camera', 'видео'], ['turn off', 'выключить']]},
+        ],
+        'prejoin_mic_off': [
+            {'css': "button[aria-label]", 'match': [['microphone', 'mic', 'микрофон'], ['turn off', 'выключить', 'mute']]},
+        ],
+        'camera_off': [
+            {'css': "button[aria-label*='camera' i][data-is-muted='false']", 'match': [['camera'], ['turn off']]},
+            {'css': "button[aria-label*='Turn off camera' i]"},
+            {'css': "div[jscontroller][jsaction*='camera'] button", 'match': [['camera'], ['turn off']]},
+            {'css': "button[jsname='BOHaEe']", 'match': [['camera'], ['turn off']]},
+        ],
+        'mic_off': [
+            {'css': "button[aria-label*='microphone' i][data-is-muted='false']", 'match': [['microphone', 'mic'], ['turn off']]},
+            {'css': "button[aria-label*='Turn off microphone' i]"},
+            {'css': "div[jscontroller][jsaction*='microphone'] button", 'match': [['microphone', 'mic'], ['turn off']]},
+        ],
+        'in_call': [
+            {'css': "button[aria-label*='Leave call' i]"},
+            {'css': "button[aria-label*='Покинуть' i]"},
+            {'css': "div[jsname='BOHaEe']"},
+        ],
+        # Признаки страницы встречи для проверки подключения (считаются все найденные)
+        'indicators': [
+            {'css': "div[jsname='BOHaEe']"},
+            {'css': "div[data-is-muted]"},
+            {'css': "button[aria-label*='camera']"},
+            {'css': "button[aria-label*='microphone']"},
+            {'css': "video"},
+            {'css': "canvas"},
+        ],
+        'errors': [
+            {'xpath': "//div[contains(text(), 'Unable to join')]"},
+            {'xpath': "//div[contains(text(), 'Meeting not found')]"},
+            {'xpath': "//div[contains(text(), 'Access denied')]"},
+            {'xpath': "//div[contains(text(), 'Не удалось присоединиться')]"},
+        ],
+    },
+    'zoom': {
+        'cookie_accept': [
+            {'xpath': "//button[contains(text(), 'ACCEPT COOKIES') or contains(text(), 'Accept')]"},
+        ],
+        'name': [
+            {'id': 'inputname'},
+            {'id': 'joinBtn'},
+        ],
+        'landing': [
+            {'id': 'inputname'},
+            {'id': 'joinBtn'},
+            {'xpath': "//button[contains(text(), 'ACCEPT COOKIES') or contains(text(), 'Accept')]"},
+            {'xpath': "//a[contains(text(), 'Join from Browser')] | //button[contains(text(), 'Join from Browser')]"},
+            {'xpath': "//a[contains(text(), 'Launch Meeting')] | //button[contains(text(), 'Launch Meeting')]"},
+        ],
+        'popup_close': [
+            {'xpath': "//button[@aria-label='Close'] | //button[contains(@class, 'close')] | //*[contains(@class, 'close')]"},
+        ],
+        'web_join': [
+            {'xpath': "//a[contains(text(), 'Join from Browser')]"},
+            {'xpath': "//button[contains(text(), 'Join from Browser')]"},
+            {'xpath': "//a[contains(text(), 'Launch Meeting')]"},
+            {'xpath': "//button[contains(text(), 'Launch Meeting')]"},
+            {'xpath': "//a[contains(text(), 'browser')]"},
+            {'xpath': "//button[contains(text(), 'browser')]"},
+            {'xpath': "//a[contains(@href, 'web')]"},
+            {'xpath': "//button[contains(@class, 'web')]"},
+        ],
+        'success_join': [
+            {'xpath': "//button[contains(text(), 'Join Meeting')]"},
+            {'xpath': "//a[contains(text(), 'Join Meeting')]"},
+            {'xpath': "//button[contains(text(), 'Enter Meeting')]"},
+            {'xpath': "//a[contains(text(), 'Enter Meeting')]"},
+            {'xpath': "//button[contains(text(), 'Join')]"},
+            {'xpath': "//a[contains(text(), 'Join')]"},
+            {'xpath': "//button[contains(@class, 'join')]"},
+            {'xpath': "//a[contains(@class, 'join')]"},
+            {'xpath': "//button[contains(@id, 'join')]"},
+            {'xpath': "//a[contains(@id, 'join')]"},
+        ],
+        'join': [
+            {'id': 'joinBtn'},
+            {'css': 'button[data-tooltip="Join Meeting"]'},
+            {'css': 'button[aria-label="Join Meeting"]'},
+            {'css': 'button[aria-label="Join"]'},
+            {'css': 'button[data-tooltip="Join"]'},
+            {'css': '.zm-btn--primary'},
+            {'css': '.join-btn'},
+            {'css': 'button[class*="join"]'},
+            {'xpath': "//button[contains(text(), 'Join')]"},
+            {'xpath': "//button[contains(text(), 'Join Meeting')]"},
+            {'xpath': "//button[contains(text(), 'Войти')]"},
+            {'xpath': "//button[contains(text(), 'Присоединиться')]"},
+            {'xpath': "//a[contains(text(), 'Join')]"},
+            {'xpath': "//a[contains(text(), 'Join Meeting')]"},
+            {'text': ['join', 'войти', 'присоединиться', 'enter'], 'tag': 'button'},
+        ],
+        # Внутри встречи: кнопка выхода и нижняя панель (кнопки звука и видео есть и на предпросмотре)
+        'in_call': [
+            {'css': "button[aria-label*='Leave' i], .footer__leave-btn"},
+            {'css': "#wc-footer"},
+        ],
+        'media_controls': [
+            {'css': "button[aria-label*='Mute' i]"},
+            {'css': "button[aria-label*='Stop Video' i], button[aria-label*='Start Video' i]"},
+        ],
+        # Только выключающие кнопки: Unmute/Start Video включили бы микрофон и камеру
+        'mic_off': [
+            {'css': "button[aria-label^='Mute' i]"},
+            {'css': "button[data-tooltip^='Mute' i]"},
+            {'css': ".zm-btn--mute"},
+        ],
+        'camera_off': [
+            {'css': "button[aria-label*='Stop Video' i]"},
+            {'css': "button[data-tooltip*='Stop Video' i]"},
+            {'css': ".zm-btn--stop-video"},
+        ],
+        'indicators': [
+            {'xpath': "//div[contains(@class, 'meeting-client')]"},
+            {'xpath': "//div[contains(@class, 'video-container')]"},
+            {'xpath': "//button[contains(@aria-label, 'Mute')]"},
+            {'xpath': "//button[contains(@aria-label, 'Unmute')]"},
+            {'xpath': "//button[contains(@aria-label, 'Turn off')]"},
+            {'xpath': "//button[contains(@aria-label, 'Turn on')]"},
+            {'xpath': "//div[contains(@class, 'participants')]"},
+            {'xpath': "//canvas"},
+            {'xpath': "//div[contains(@class, 'meeting')]"},
+            {'xpath': "//div[contains(@class, 'zoom')]"},
+            {'xpath': "//div[contains(@class, 'webinar')]"},
+            {'xpath': "//div[contains(@id, 'meeting')]"},
+            {'xpath': "//div[contains(@id, 'zoom')]"},
+            {'xpath': "//video"},
+            {'xpath': "//audio"},
+            {'xpath': "//div[contains(@class, 'controls')]"},
+            {'xpath': "//div[contains(@class, 'toolbar')]"},
+            {'xpath': "//button[contains(@class, 'zm-btn')]"},
+            {'xpath': "//div[contains(@class, 'footer')]"},
+            {'xpath': "//div[contains(@class, 'main')]"},
+        ],
+        'errors': [
+            {'xpath': "//div[contains(text(), 'Meeting not found')]"},
+            {'xpath': "//div[contains(text(), 'Invalid meeting ID')]"},
+            {'xpath': "//div[contains(text(), 'Meeting has ended')]"},
+            {'xpath': "//div[contains(text(), 'Please wait for the host')]"},
+            {'xpath': "//div[contains(text(), 'Waiting for host')]"},
+            {'xpath': "//div[contains(text(), 'Please download and install')]"},
+            {'xpath': "//div[contains(text(), 'Did not open Zoom')]"},
+            {'xpath': "//div[contains(text(), 'Zoom Workplace app')]"},
+            {'xpath': "//div[contains(text(), 'Download Now')]"},
+        ],
+    },
+    'yandex': {
+        'prejoin': [
+            {'css': "input[type='text']"},
+            {'text': ['войти', 'присоединиться', 'подключиться', 'join'], 'tag': 'button'},
+        ],
+        'name_input': [
+            {'css': "input[type='text']"},
+        ],
+        'media_toggles': [
+            {'css': "button", 'match': [['камера', 'camera']]},
+            {'css': "button", 'match': [['микрофон', 'microphone']]},
+        ],
+        'join': [
+            {'text': ['войти', 'присоединиться', 'join', 'enter'], 'tag': 'button'},
+        ],
+    },
+    'contour': {
+        'join': [
+            {'xpath': "//button[contains(., 'Подключиться')]"},
+            {'xpath': "//button[contains(., 'Войти')]"},
+            {'xpath': "//button[contains(., 'Join')]"},
+        ],
+        'prejoin': [
+            {'xpath': "//button[contains(., 'Подключиться')]"},
+            {'xpath': "//button[contains(., 'Войти')]"},
+            {'xpath': "//button[contains(., 'Join')]"},
+            {'css': "input[type='text'], input[type='name']"},
+        ],
+        'name_input': [
+            {'css': "input[type='text'], input[type='name']"},
+        ],
+    },
+    'common': {
+        'meeting_ended': [
+            {'xpath': "//div[contains(text(), 'Everyone left')]"},
+            {'xpath': "//div[contains(text(), 'Meeting ended')]"},
+            {'xpath': "//div[contains(text(), 'Встреча завершена')]"},
+            {'xpath': "//div[contains(text(), 'Все покинули')]"},
+        ],
+    },
+}
+
+# Функция на странице: кандидаты по порядку, для каждого - первый подходящий элемент с атрибутами
+_QUERY_FUNCTION = r"""
+(candidates, options) => {
+  const norm = (value) => (value || '').toString().toLowerCase();
+  const isVisible = (el) => {
+    if (!el.getClientRects().length) return false;
+    const style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.display !== 'none';
+  };
+  const describe = (el) => ({
+    tag: el.tagName.toLowerCase(),
+    text: (el.innerText || el.value || '').trim().slice(0, 200),
+    aria_label: el.getAttribute('aria-label') || '',
+    title: el.getAttribute('title') || '',
+    placeholder: el.getAttribute('placeholder') || '',
+    id: el.id || '',
+  });
+  const matches = (el, groups) => {
+    if (!groups || !groups.length) return true;
+    const haystack = [el.innerText, el.value, el.getAttribute('aria-label'), el.getAttribute('title'),
+                      el.getAttribute('placeholder'), el.getAttribute('data-tooltip')].map(norm).join(' ');
+    return groups.every((words) => words.some((word) => haystack.includes(word)));
+  };
+  const results = [];
+  candidates.forEach((candidate, index) => {
+    if (results.length && !options.all) return;
+    let found = [];
+    try {
+      if (candidate.kind === 'xpath') {
+        const snapshot = document.evaluate(candidate.selector, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (let i = 0; i < snapshot.snapshotLength; i++) found.push(snapshot.snapshotItem(i));
+      } else if (candidate.kind === 'id') {
+        found = [document.getElementById(candidate.selector)];
+      } else {
+        found = Array.from(document.querySelectorAll(candidate.selector));
+      }
+    } catch (e) {
+      return;
+    }
+    let count = 0;
+    let first = null;
+    for (const el of found) {
+      if (!el || (options.visible && !isVisible(el)) || (options.enabled && el.disabled)) continue;
+      if (!matches(el, candidate.match)) continue;
+      count += 1;
+      if (!first) first = el;
+    }
+    if (first) {
+      results.push(Object.assign({index, key: candidate.key, element: first, count}, describe(first)));
+    }
+  });
+  return results;
+}
+"""
+
+_compiled: Dict[tuple, str] = {}
+_compiled_lock = threading.Lock()
+
+
+def _normalize(candidate: Union[Candidate, Sequence[str]]) -> Dict[str, Any]:
+    """Кандидат в вид для страницы: kind, selector, match, key"""
+    if not isinstance(candidate, dict):
+        # Локатор ('css' | 'xpath' | 'id', селектор) из join_waits
+        candidate = {candidate[0]: candidate[1]}
+    match = [[word.lower() for word in words] for words in candidate.get('match', [])]
+    if 'text' in candidate:
+        kind, selector = 'css', candidate.get('tag', 'button')
+        match.append([word.lower() for word in candidate['text']])
+        key = f"text:{selector}:{'|'.join(candidate['text'])}"
+    else:
+        kind = next(k for k in ('css', 'xpath', 'id') if k in candidate)
+        selector = candidate[kind]
+        key = f"{kind}:{selector}"
+    if candidate.get('match'):
+        key += ' ~ ' + ' & '.join('|'.join(words) for words in candidate['match'])
+    return {'kind': kind, 'selector': selector, 'match': match, 'key': key}
+
+
+def candidate_key(candidate: Union[Candidate, Sequence[str]]) -> str:
+    """Стабильный ключ кандидата (тот же, что в результатах query)"""
+    return _normalize(candidate)['key']
+
+
+def candidates(platform: str, group: str) -> List[Candidate]:
+    """Кандидаты группы платформы (пустой список, если группы нет)"""
+    return SELECTORS.get(platform, {}).get(group, [])
+
+
+def compile_query(items: Sequence[Union[Candidate, Sequence[str]]]) -> str:
+    """Скрипт для execute_script со встроенным списком кандидатов (кэшируется)"""
+    spec = [_normalize(item) for item in items]
+    cache_key = tuple(item['key'] for item in spec)
+    with _compiled_lock:
+        script = _compiled.get(cache_key)
+        if script is None:
+            script = f"return ({_QUERY_FUNCTION.strip()})({json.dumps(spec, ensure_ascii=False)}, arguments[0]);"
+            _compiled[cache_key] = script
+    return script
+
+
+def query(driver, items: Sequence[Union[Candidate, Sequence[str]]], every: bool = False,
+          visible: bool = True, enabled: bool = False) -> List[Dict[str, Any]]:
+    """Совпадения кандидатов за один запрос: первое (every=False) или по одному на каждый кандидат"""
+    if not items:
+        return []
+    script = compile_query(items)
+    return driver.execute_script(script, {'all': every, 'visible': visible, 'enabled': enabled}) or []
+
+
+def find_best(driver, platform: str, group: str, **options) -> Optional[Dict[str, Any]]:
+    """Лучшее совпадение группы: dict с element, index, key, tag, text, aria_label, title... или None"""
+    results = query(driver, candidates(platform, group), **options)
+    return results[0] if results else None
+
+
+def find_all(driver, platform: str, group: str, **options) -> List[Dict[str, Any]]:
+    """Все сработавшие кандидаты группы (например, для подсчета индикаторов)"""
+    return query(driver, candidates(platform, group), every=True, **options)
+
+
+def click_match(driver, match: Dict[str, Any]) -> bool:
+    """Нажать найденный элемент; если перекрыт - через JS"""
+    element = match['element']
+    try:
+        element.click()
+        return True
+    except Exception as e:
+        logger.debug(f"Обычный клик не прошел ({e}), пробуем через JS")
+    try:
+        driver.execute_script("arguments[0].click();", element)
+        return True
+    except Exception as e:
+        logger.debug(f"Клик через JS не прошел: {e}")
+        return False
+
+
+def describe_match(match: Optional[Dict[str, Any]]) -> str:
+    """Подпись совпадения для логов"""
+    if not match:
+        return 'нет'
+    label = match.get('text') or match.get('aria_label') or match.get('title') or match.get('tag')
+    return f"'{label}' ({match['key']})"
@@ -60,12 +60,13 @@ def save_cookies(driver, filename):
 def save_storage(driver, filename):
     """Сохранить storage данные"""
     try:
-        session_storage = driver.execute_script("return window.sessionStorage;")
-        local_storage = driver.execute_script("return window.localStorage;")
+        session_storage = driver.execute_script("return Object.assign({}, window.sessionStorage);")
+        local_storage = driver.execute_script("return Object.assign({}, window.localStorage);")
         
         storage_data = {
             "sessionStorage": session_storage,
             "localStorage": local_storage,
+            "origin": driver.execute_script("return location.origin;"),
             "timestamp": time.time()
         }
         
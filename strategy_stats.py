@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Статистика стратегий входа для Meeting Bot
+Какой селектор, текст кнопки и вариант сценария сработали на платформе и версии ее интерфейса;
+первыми идут побеждавшие (быстрее - раньше), за ними - без данных, в конце - только проигрывавшие.
+Группа селекторов проверяется одним запросом к странице, поэтому порядок решает, какое из нескольких
+совпадений будет нажато; для вариантов сценария (альтернативные URL) - что пробуется первым.
+Старые данные затухают, поэтому после выкатки нового интерфейса порядок перестраивается
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Общая статистика платформы - когда для текущей версии интерфейса данных еще нет
+ANY_FINGERPRINT = '*'
+
+# Версия интерфейса: хост, язык и имена загруженных скриптов (меняются при выкатке)
+_FINGERPRINT_SCRIPT = r"""
+const scripts = Array.from(document.scripts)
+  .map((s) => (s.src || '').split('?')[0].split('/').slice(-2).join('/'))
+  .filter(Boolean)
+  .sort();
+return [location.host, document.documentElement.lang || '', scripts.join(',')].join('|');
+"""
+
+
+def ui_fingerprint(driver) -> str:
+    """Короткий отпечаток версии интерфейса текущей страницы ('*' - не удалось снять)"""
+    try:
+        raw = driver.execute_script(_FINGERPRINT_SCRIPT) or ''
+    except Exception:
+        return ANY_FINGERPRINT
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:10] if raw else ANY_FINGERPRINT
+
+
+class StrategyStats:
+    """Затухающие счетчики побед стратегий: платформа -> отпечаток -> группа -> ключ стратегии"""
+
+    def __init__(self, path: str, half_life_sec: float = 7 * 24 * 3600, default_sec: float = 5.0,
+                 max_fingerprints: int = 20):
+        self.path = path
+        self.half_life_sec = half_life_sec
+        self.default_sec = default_sec  # Оценка времени для стратегии без побед
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_locked(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить статистику стратегий: {e}")
+
+    def _decayed(self, entry: Dict[str, float], now: float) -> Dict[str, float]:
+        """Счетчики, уменьшенные вдвое за каждый half_life_sec с последнего обновления"""
+        factor = 0.5 ** (max(0.0, now - entry.get('updated', now)) / self.half_life_sec)
+        return {
+            'wins': entry.get('wins', 0.0) * factor,
+            'tries': entry.get('tries', 0.0) * factor,
+            'win_sec': entry.get('win_sec', 0.0) * factor,
+            'updated': now,
+        }
+
+    def record(self, platform: str, group: str, key: str, success: bool, seconds: float,
+               fingerprint: str = ANY_FINGERPRINT):
+        """Учесть попытку стратегии (и в отпечатке интерфейса, и в общей статистике платформы)"""
+        now = time.time()
+        with self._lock:
+            fingerprints = self._data.setdefault(platform, {})
+            for fp in {fingerprint, ANY_FINGERPRINT}:
+                groups = fingerprints.setdefault(fp, {})
+                entry = self._decayed(groups.setdefault(group, {}).get(key, {}), now)
+                entry['tries'] += 1
+                if success:
+                    entry['wins'] += 1
+                    entry['win_sec'] += max(0.0, seconds)
+                groups[group][key] = entry
+            self._trim_locked(platform)
+            self._save_locked()
+
+    def _trim_locked(self, platform: str):
+        """Оставить max_fingerprints последних версий интерфейса платформы"""
+        fingerprints = self._data.get(platform, {})
+        versions = [fp for fp in fingerprints if fp != ANY_FINGERPRINT]
+        if len(versions) <= self.max_fingerprints:
+            return
+
+        def last_update(fp):
+            return max((entry.get('updated', 0) for group in fingerprints[fp].values() for entry in group.values()),
+                       default=0)
+        for fp in sorted(versions, key=last_update)[:len(versions) - self.max_fingerprints]:
+            del fingerprints[fp]
+
+    def _group_stats(self, platform: str, group: str, fingerprint: str) -> Dict[str, Dict[str, float]]:
+        fingerprints = self._data.get(platform, {})
+        stats = fingerprints.get(fingerprint, {}).get(group)
+        if not stats:
+            stats = fingerprints.get(ANY_FINGERPRINT, {}).get(group, {})
+        return stats
+
+    def expected_sec(self, entry: Optional[Dict[str, float]], now: float) -> float:
+        """Ожидаемое время шага до успеха: среднее время победы / вероятность победы (сглаженная)"""
+        if not entry:
+            return self.default_sec / 0.5
+        entry = self._decayed(entry, now)
+        success_rate = (entry['wins'] + 1) / (entry['tries'] + 2)
+        avg_sec = entry['win_sec'] / entry['wins'] if entry['wins'] > 1e-6 else self.default_sec
+        return max(avg_sec, 0.1) / success_rate
+
+    def rank(self, entry: Optional[Dict[str, float]], now: float) -> tuple:
+        """Ключ сортировки: побеждавшие (по ожидаемому времени), затем без данных, затем только проигрывавшие"""
+        if not entry:
+            return (1, 0.0)
+        if self._decayed(entry, now)['wins'] < 1e-3:
+            return (2, self.expected_sec(entry, now))
+        return (0, self.expected_sec(entry, now))
+
+    def order_keys(self, platform: str, group: str, keys: Sequence[str],
+                   fingerprint: str = ANY_FINGERPRINT) -> List[str]:
+        """Ключи в порядке rank; без статистики - исходный порядок"""
+        with self._lock:
+            stats = dict(self._group_stats(platform, group, fingerprint))
+        if not stats:
+            return list(keys)
+        now = time.time()
+        # sorted устойчив: у стратегий без данных сохраняется порядок реестра
+        return sorted(keys, key=lambda key: self.rank(stats.get(key), now))
+
+    def describe(self, platform: str) -> str:
+        """Лучшие стратегии платформы по группам (общая статистика)"""
+        groups = self._data.get(platform, {}).get(ANY_FINGERPRINT, {})
+        if not groups:
+            return f"🧭 {platform}: статистики стратегий нет"
+        now = time.time()
+        lines = [f"🧭 {platform}: версий интерфейса {len(self._data[platform]) - 1}"]
+        for group, stats in sorted(groups.items()):
+            best = min(stats, key=lambda key: self.rank(stats[key], now))
+            entry = self._decayed(stats[best], now)
+            lines.append(f"  {group}: {best} ({entry['wins']:.1f}/{entry['tries']:.1f})")
+        return '\n'.join(lines)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Тесты порядка стратегий входа (strategy_stats)
+"""
+
+import os
+import tempfile
+
+from strategy_stats import StrategyStats
+
+
+def _stats():
+    return StrategyStats(os.path.join(tempfile.mkdtemp(), 'strategy_stats.json'))
+
+
+def test_winner_is_ordered_first():
+    """Сработавший кандидат идет первым - даже если шаг был долгим"""
+    stats = _stats()
+    keys = ['css:a', 'css:b', 'text:button:войти']
+    stats.record('google_meet', 'join', 'css:b', True, 22.0, 'fp')
+    assert stats.order_keys('google_meet', 'join', keys, 'fp')[0] == 'css:b'
+    for _ in range(2):
+        stats.record('google_meet', 'join', 'css:b', True, 22.0, 'fp')
+    assert stats.order_keys('google_meet', 'join', keys, 'fp') == ['css:b', 'css:a', 'text:button:войти']
+
+
+def test_losers_go_after_untried():
+    """Только проигрывавший кандидат уходит за кандидатов без данных"""
+    stats = _stats()
+    stats.record('zoom', 'join', 'css:a', False, 1.0, 'fp')
+    assert stats.order_keys('zoom', 'join', ['css:a', 'css:b'], 'fp') == ['css:b', 'css:a']
+
+
+def test_faster_winner_first_and_persisted():
+    """Из побеждавших раньше тот, чей шаг быстрее; статистика переживает перезапуск"""
+    stats = _stats()
+    stats.record('zoom', 'success_url', 'zoom', True, 8.0)
+    stats.record('zoom', 'success_url', 'us05web', True, 2.0)
+    reloaded = StrategyStats(stats.path)
+    assert reloaded.order_keys('zoom', 'success_url', ['zoom', 'us05web']) == ['us05web', 'zoom']
+
+
+def test_no_stats_keeps_registry_order():
+    stats = _stats()
+    assert stats.order_keys('yandex', 'join', ['b', 'a']) == ['b', 'a']
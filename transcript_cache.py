@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Кэш транскриптов для Meeting Bot
+Ключ - хэш аудио и параметров распознавания, вытеснение самых старых записей по объему
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptCache:
+    """Дисковый кэш сегментов транскрипции с LRU-вытеснением"""
+
+    def __init__(self, root: str, max_bytes: int = 200 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def make_key(audio_path: str, params: Dict[str, Any]) -> str:
+        """Ключ кэша: SHA-256 содержимого аудио + параметры модели и декодирования"""
+        digest = hashlib.sha256()
+        with open(audio_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        digest.update(json.dumps(params, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Получить сегменты из кэша (None - промах)"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                segments = json.load(f)['segments']
+            # Время доступа = mtime, по нему работает LRU
+            os.utime(path, None)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        logger.info(f"💾 Транскрипт найден в кэше: {key[:12]} ({len(segments)} сегментов)")
+        return segments
+
+    def put(self, key: str, segments: List[Dict[str, Any]], params: Optional[Dict[str, Any]] = None):
+        """Сохранить сегменты в кэш"""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'params': params, 'segments': segments}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._evict()
+        except Exception as e:
+            logger.error(f"Ошибка записи в кэш транскриптов: {e}")
+
+    def _evict(self):
+        """Удалить давно не использованные записи, пока кэш больше лимита"""
+        with self._lock:
+            entries = []
+            total = 0
+            for dirpath, _, filenames in os.walk(self.root):
+                for name in filenames:
+                    if not name.endswith('.json'):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    logger.info(f"Кэш транскриптов: удалена старая запись {os.path.basename(path)}")
+                except OSError:
+                    pass
+
+    def describe(self) -> str:
+        """Статистика кэша для статуса"""
+        return f"💾 Кэш транскриптов: попаданий {self.hits}, промахов {self.misses}"
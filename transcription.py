@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Модуль транскрипции для Meeting Bot
+Общий реестр моделей Whisper: модель загружается один раз на процесс
+Живая транскрипция: фрагменты записи распознаются, пока идет встреча
+Параллельная транскрипция: длинная запись режется по паузам на куски с перекрытием
+"""
+
+import os
+import re
+import struct
+import logging
+import threading
+import subprocess
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Частота дискретизации, с которой работает Whisper
+SAMPLE_RATE = 16000
+
+# Параметры распознавания по умолчанию
+DEFAULT_TRANSCRIBE_OPTIONS = {
+    'language': 'ru',
+    'beam_size': 5,
+    'vad_filter': True,
+    'vad_parameters': {'min_silence_duration_ms': 500},
+}
+
+
+def get_process_rss_mb() -> Optional[float]:
+    """Получить текущий RSS процесса в МБ"""
+    try:
+        with open('/proc/self/status', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except Exception:
+        pass
+    try:
+        import resource
+        # ru_maxrss в КБ на Linux - это пик, но лучше, чем ничего
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except Exception:
+        return None
+
+
+class WhisperModelRegistry:
+    """Реестр моделей Whisper, общий для всех ботов процесса"""
+
+    def __init__(self):
+        self._models: Dict[Tuple, Any] = {}
+        self._stats: Dict[Tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get_model(self, name: str, device: str = "cpu", compute_type: str = "int8",
+                  cpu_threads: int = 0):
+        """Получить модель (загружается при первом обращении)"""
+        key = (name, device, compute_type, cpu_threads)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        # Загрузка под блокировкой: параллельные запросы ждут одну загрузку
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            from faster_whisper import WhisperModel
+
+            logger.info(f"Загрузка Whisper модели: {name} ({device}/{compute_type})")
+            rss_before = get_process_rss_mb()
+            started = time.monotonic()
+            model = WhisperModel(name, device=device, compute_type=compute_type,
+                                 cpu_threads=cpu_threads)
+            load_time = time.monotonic() - started
+            rss_after = get_process_rss_mb()
+
+            rss_delta = None
+            if rss_before is not None and rss_after is not None:
+                rss_delta = rss_after - rss_before
+
+            self._models[key] = model
+            self._stats[key] = {
+                'name': name,
+                'device': device,
+                'compute_type': compute_type,
+                'load_time_sec': load_time,
+                'rss_delta_mb': rss_delta,
+                'rss_after_mb': rss_after,
+                'loaded_at': time.time(),
+            }
+            logger.info(
+                f"Whisper модель загружена за {load_time:.1f} с"
+                + (f", память: +{rss_delta:.0f} МБ (RSS {rss_after:.0f} МБ)" if rss_delta is not None else "")
+            )
+            return model
+
+    def preload(self, name: str, device: str = "cpu", compute_type: str = "int8",
+                cpu_threads: int = 0) -> bool:
+        """Загрузить модель заранее (при старте процесса)"""
+        try:
+            self.get_model(name, device, compute_type, cpu_threads)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка загрузки Whisper: {e}")
+            return False
+
+    def is_loaded(self, name: str, device: str = "cpu", compute_type: str = "int8",
+                  cpu_threads: int = 0) -> bool:
+        """Проверить, загружена ли модель"""
+        return (name, device, compute_type, cpu_threads) in self._models
+
+    def get_stats(self) -> Dict[Tuple, Dict[str, Any]]:
+        """Получить статистику загрузки моделей"""
+        return dict(self._stats)
+
+    def describe(self) -> str:
+        """Краткое описание загруженных моделей для статуса"""
+        if not self._stats:
+            return "🎤 Whisper: модель еще не загружена"
+        lines = []
+        for stats in self._stats.values():
+            line = f"🎤 Whisper {stats['name']} ({stats['compute_type']}): загрузка {stats['load_time_sec']:.1f} с"
+            if stats['rss_delta_mb'] is not None:
+                line += f", +{stats['rss_delta_mb']:.0f} МБ"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def segments_to_dicts(segments, offset: float = 0.0) -> List[Dict[str, Any]]:
+    """Преобразовать сегменты faster-whisper в словари со сдвигом времени"""
+    result = []
+    for segment in segments:
+        text = segment.text.strip()
+        if text:
+            result.append({
+                "start": segment.start + offset,
+                "end": segment.end + offset,
+                "text": text
+            })
+    return result
+
+
+class AudioRange(NamedTuple):
+    """Фрагмент аудиофайла [start, end) в секундах"""
+    path: str
+    start: float
+    end: float
+
+
+def load_audio_range(path: str, start_sec: float, end_sec: float) -> np.ndarray:
+    """Декодировать только нужный фрагмент файла через ffmpeg (моно float32 16 кГц)"""
+    cmd = [
+        'ffmpeg', '-nostdin', '-v', 'error',
+        '-ss', f'{start_sec:.3f}', '-t', f'{max(0.0, end_sec - start_sec):.3f}',
+        '-i', path, '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE), 'pipe:1'
+    ]
+    raw = subprocess.run(cmd, capture_output=True, check=True).stdout
+    return np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+
+
+def load_audio(audio):
+    """Привести вход задания к тому, что принимает faster-whisper"""
+    if isinstance(audio, AudioRange):
+        return load_audio_range(audio.path, audio.start, audio.end)
+    return audio
+
+
+def plan_chunks(speech: List[Tuple[float, float]], total_sec: float, count: int,
+                overlap_sec: float = 1.0) -> List[Dict[str, float]]:
+    """Разбить запись на count кусков по паузам между речевыми участками VAD"""
+    gaps = [(speech[i][1] + speech[i + 1][0]) / 2 for i in range(len(speech) - 1)]
+    boundaries = [0.0]
+    for k in range(1, count):
+        ideal = total_sec * k / count
+        candidates = [g for g in gaps if boundaries[-1] < g < total_sec]
+        cut = min(candidates, key=lambda g: abs(g - ideal)) if candidates else ideal
+        if cut > boundaries[-1]:
+            boundaries.append(cut)
+    boundaries.append(total_sec)
+
+    chunks = []
+    for own_start, own_end in zip(boundaries, boundaries[1:]):
+        if own_end <= own_start:
+            continue
+        chunks.append({
+            'start': max(0.0, own_start - overlap_sec),
+            'end': min(total_sec, own_end + overlap_sec),
+            'own_start': own_start,
+            'own_end': own_end,
+        })
+    return chunks
+
+
+def _words(text: str) -> List[str]:
+    return [re.sub(r'[^\w]', '', w.lower()) for w in text.split()]
+
+
+def stitch_chunk_segments(chunk_results: List[Tuple[Dict[str, float], List[Dict[str, Any]]]],
+                          max_overlap_words: int = 15) -> List[Dict[str, Any]]:
+    """Склеить сегменты кусков: сдвиг времени, разбор перекрытий, удаление повторов слов"""
+    merged: List[Dict[str, Any]] = []
+    for chunk, segments in chunk_results:
+        first_in_chunk = True
+        for segment in segments:
+            start = segment['start'] + chunk['start']
+            end = segment['end'] + chunk['start']
+            # Сегмент принадлежит куску, в чью "собственную" зону попадает его середина
+            middle = (start + end) / 2
+            if not (chunk['own_start'] <= middle < chunk['own_end']):
+                continue
+            text = segment['text']
+            if first_in_chunk and merged:
+                # Убираем слова, которые уже есть в конце предыдущего куска
+                prev_words = _words(merged[-1]['text'])
+                words = text.split()
+                norm = _words(text)
+                for k in range(min(max_overlap_words, len(norm), len(prev_words)), 0, -1):
+                    if prev_words[-k:] == norm[:k]:
+                        text = ' '.join(words[k:])
+                        break
+            first_in_chunk = False
+            if text:
+                merged.append({'start': start, 'end': end, 'text': text})
+    return merged
+
+
+class AudioSource(ABC):
+    """Источник аудио для живой транскрипции: непрерывная шкала времени записи"""
+
+    @abstractmethod
+    def available_seconds(self) -> float:
+        """Сколько секунд записи уже можно прочитать"""
+
+    @abstractmethod
+    def read(self, start_sec: float, end_sec: float) -> np.ndarray:
+        """Отрезок [start_sec, end_sec) как float32 моно SAMPLE_RATE"""
+
+    def find_cut(self, start_sec: float, target_sec: float, search_sec: float = 3.0) -> float:
+        """Найти самую тихую точку перед target_sec, чтобы не резать слова"""
+        window_start = max(start_sec, target_sec - search_sec)
+        audio = self.read(window_start, target_sec)
+        frame = SAMPLE_RATE // 10  # 100 мс
+        if len(audio) < frame * 2:
+            return target_sec
+        frames = len(audio) // frame
+        energy = np.square(audio[:frames * frame].reshape(frames, frame)).mean(axis=1)
+        quietest = int(np.argmin(energy))
+        return window_start + (quietest + 0.5) * frame / SAMPLE_RATE
+
+
+class GrowingWavSource(AudioSource):
+    """Чтение WAV файла, который еще дописывает ffmpeg"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data_offset = None
+        self.channels = 1
+        self.sample_rate = SAMPLE_RATE
+        self.block_align = 2
+
+    def _read_header(self) -> bool:
+        """Найти fmt и начало блока data (размеры в заголовке еще не финальные)"""
+        if self.data_offset is not None:
+            return True
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.read(4096)
+        except OSError:
+            return False
+        if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            return False
+
+        pos = 12
+        while pos + 8 <= len(header):
+            chunk_id = header[pos:pos + 4]
+            chunk_size = struct.unpack('<I', header[pos + 4:pos + 8])[0]
+            if chunk_id == b'fmt ':
+                if pos + 24 > len(header):
+                    return False
+                audio_format, channels, sample_rate = struct.unpack('<HHI', header[pos + 8:pos + 16])
+                bits = struct.unpack('<H', header[pos + 22:pos + 24])[0]
+                if audio_format not in (1, 0xFFFE) or bits != 16:
+                    logger.warning(f"[Live] Неподдерживаемый формат WAV: format={audio_format}, bits={bits}")
+                    return False
+                self.channels = channels
+                self.sample_rate = sample_rate
+                self.block_align = channels * 2
+            elif chunk_id == b'data':
+                self.data_offset = pos + 8
+                return True
+            pos += 8 + chunk_size + (chunk_size & 1)
+        return False
+
+    def available_seconds(self) -> float:
+        """Сколько секунд аудио уже записано"""
+        if not self._read_header():
+            return 0.0
+        try:
+            size = os.path.getsize(self.path) - self.data_offset
+        except OSError:
+            return 0.0
+        return max(0, size // self.block_align) / self.sample_rate
+
+    def read(self, start_sec: float, end_sec: float) -> np.ndarray:
+        """Прочитать фрагмент как моно float32 16 кГц"""
+        if not self._read_header():
+            return np.zeros(0, dtype=np.float32)
+        start_frame = int(start_sec * self.sample_rate)
+        end_frame = int(end_sec * self.sample_rate)
+        with open(self.path, 'rb') as f:
+            f.seek(self.data_offset + start_frame * self.block_align)
+            raw = f.read(max(0, end_frame - start_frame) * self.block_align)
+        raw = raw[:len(raw) - len(raw) % self.block_align]
+        audio = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+        if self.channels > 1:
+            audio = audio.reshape(-1, self.channels).mean(axis=1)
+        if self.sample_rate != SAMPLE_RATE and len(audio):
+            # Простая линейная передискретизация (ffmpeg пишет 16 кГц, это запасной путь)
+            target_len = int(len(audio) * SAMPLE_RATE / self.sample_rate)
+            audio = np.interp(
+                np.linspace(0, len(audio) - 1, target_len), np.arange(len(audio)), audio
+            ).astype(np.float32)
+        return audio
+
+class MultiPartWavSource(AudioSource):
+    """Несколько WAV файлов записи (после перезапуска ffmpeg) как одна шкала времени"""
+
+    def __init__(self, parts_provider: Callable[[], List[str]]):
+        self.parts_provider = parts_provider
+        self._sources: Dict[str, GrowingWavSource] = {}
+
+    def _parts(self) -> List[Tuple[GrowingWavSource, float]]:
+        """Источники частей и их длительности"""
+        result = []
+        for path in self.parts_provider():
+            source = self._sources.setdefault(path, GrowingWavSource(path))
+            result.append((source, source.available_seconds()))
+        return result
+
+    def available_seconds(self) -> float:
+        return sum(duration for _, duration in self._parts())
+
+    def read(self, start_sec: float, end_sec: float) -> np.ndarray:
+        pieces = []
+        offset = 0.0
+        for source, duration in self._parts():
+            part_start = max(start_sec, offset)
+            part_end = min(end_sec, offset + duration)
+            if part_end > part_start:
+                pieces.append(source.read(part_start - offset, part_end - offset))
+            offset += duration
+        if not pieces:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(pieces)
+
+
+class ClosedSegmentsSource(AudioSource):
+    """Закрытые сегменты сегментированной записи (любой формат) как одна шкала времени"""
+
+    def __init__(self, segments_provider: Callable[[], List[Dict[str, Any]]]):
+        # segments_provider возвращает [{'path', 'start', 'end'}] в порядке записи
+        self.segments_provider = segments_provider
+
+    def available_seconds(self) -> float:
+        segments = self.segments_provider()
+        return segments[-1]['end'] if segments else 0.0
+
+    def read(self, start_sec: float, end_sec: float) -> np.ndarray:
+        pieces = []
+        for segment in self.segments_provider():
+            part_start = max(start_sec, segment['start'])
+            part_end = min(end_sec, segment['end'])
+            if part_end > part_start:
+                pieces.append(load_audio_range(
+                    segment['path'], part_start - segment['start'], part_end - segment['start']
+                ))
+        if not pieces:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(pieces)
+
+
+class PcmRingBuffer(AudioSource):
+    """Кольцевой буфер сырого PCM (float32 16 кГц) из пайпа ffmpeg - распознавание без файлов"""
+
+    def __init__(self, capacity_sec: float = 600.0):
+        self.capacity = int(capacity_sec * SAMPLE_RATE)
+        self._buffer = np.zeros(self.capacity, dtype=np.float32)
+        self._written = 0  # Сколько сэмплов записано с начала встречи
+        self._remainder = b''  # Неполный сэмпл с прошлого чтения
+        self.overwritten_sec = 0.0  # Аудио, затертое до того, как его прочитали
+        self._read_until = 0
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes):
+        """Добавить байты f32le из stdout ffmpeg"""
+        data = self._remainder + data
+        usable = len(data) - len(data) % 4
+        self._remainder = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=np.float32)
+        if len(samples) > self.capacity:
+            samples = samples[-self.capacity:]
+        with self._lock:
+            start = self._written % self.capacity
+            first = min(len(samples), self.capacity - start)
+            self._buffer[start:start + first] = samples[:first]
+            self._buffer[:len(samples) - first] = samples[first:]
+            self._written += len(samples)
+            lost = self._written - self.capacity - self._read_until
+            if lost > 0:
+                self.overwritten_sec += lost / SAMPLE_RATE
+                self._read_until += lost
+
+    def available_seconds(self) -> float:
+        return self._written / SAMPLE_RATE
+
+    def read(self, start_sec: float, end_sec: float) -> np.ndarray:
+        with self._lock:
+            oldest = max(0, self._written - self.capacity)
+            start = max(int(start_sec * SAMPLE_RATE), oldest)
+            end = min(int(end_sec * SAMPLE_RATE), self._written)
+            if end <= start:
+                return np.zeros(0, dtype=np.float32)
+            self._read_until = max(self._read_until, end)
+            indexes = np.arange(start, end) % self.capacity
+            return self._buffer[indexes]
+
+
+class LiveTranscriber:
+    """Фоновая транскрипция записи по мере ее поступления"""
+
+    def __init__(self, source: AudioSource,
+                 transcribe_fn: Callable[[np.ndarray], List[Dict[str, Any]]],
+                 chunk_sec: float = 120.0, poll_sec: float = 5.0,
+                 on_segments: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        self.source = source
+        self.transcribe_fn = transcribe_fn
+        self.chunk_sec = chunk_sec
+        self.poll_sec = poll_sec
+        self.on_segments = on_segments
+        self.position = 0.0  # До какой секунды запись уже распознана
+        self.segments: List[Dict[str, Any]] = []
+        self.errors = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Запустить фоновый поток"""
+        self._thread = threading.Thread(target=self._run, daemon=True, name="live-transcriber")
+        self._thread.start()
+        logger.info(f"[Live] Живая транскрипция запущена (фрагменты по {self.chunk_sec:.0f} с)")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                available = self.source.available_seconds()
+                if available - self.position >= self.chunk_sec:
+                    cut = self.source.find_cut(self.position, self.position + self.chunk_sec)
+                    self._process(self.position, cut)
+                    continue
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"[Live] Ошибка живой транскрипции: {e}")
+            self._stop.wait(self.poll_sec)
+
+    def _process(self, start_sec: float, end_sec: float):
+        """Распознать фрагмент [start_sec, end_sec) и сдвинуть позицию"""
+        with self._lock:
+            audio = self.source.read(start_sec, end_sec)
+            if len(audio):
+                started = time.monotonic()
+                segments = self.transcribe_fn(audio)
+                for segment in segments:
+                    segment['start'] += start_sec
+                    segment['end'] += start_sec
+                self.segments.extend(segments)
+                logger.info(
+                    f"[Live] Фрагмент {start_sec:.0f}-{end_sec:.0f} с распознан за "
+                    f"{time.monotonic() - started:.1f} с, сегментов: {len(segments)}"
+                )
+                if self.on_segments and segments:
+                    self.on_segments(segments)
+            self.position = end_sec
+
+    def stop(self):
+        """Остановить поток без дораспознавания (встреча покинута без транскрипта)"""
+        self._stop.set()
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Остановить поток и дораспознать хвост записи (вызывать после остановки ffmpeg)"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        available = self.source.available_seconds()
+        if available > self.position:
+            self._process(self.position, available)
+        return list(self.segments)
+
+
+# Глобальный экземпляр для использования в других модулях
+model_registry = WhisperModelRegistry()
+
+
+def get_model_registry() -> WhisperModelRegistry:
+    """Получить общий реестр моделей Whisper"""
+    return model_registry
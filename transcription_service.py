@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Сервис заданий транскрипции для Meeting Bot
+Whisper работает в отдельном пуле процессов, обработчики Telegram только ждут результат
+Пакетный режим: речевые фрагменты нескольких заданий распознаются одним батчем
+"""
+
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from transcription import (
+    get_model_registry, segments_to_dicts, DEFAULT_TRANSCRIBE_OPTIONS, SAMPLE_RATE,
+    AudioRange, load_audio, plan_chunks, stitch_chunk_segments,
+)
+
+logger = logging.getLogger(__name__)
+
+AudioInput = Union[str, np.ndarray, AudioRange]
+
+
+class TranscriptionQueueFull(Exception):
+    """Очередь заданий транскрипции заполнена"""
+
+
+def _init_worker(model_config: tuple):
+    """Инициализация процесса-воркера: модель загружается один раз на воркер"""
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    get_model_registry().preload(*model_config)
+
+
+def _run_job(audio: AudioInput, options: Dict[str, Any], model_config: tuple) -> Dict[str, Any]:
+    """Выполнить одно задание транскрипции (внутри воркера)"""
+    started_wall = time.monotonic()
+    started_cpu = time.process_time()
+    model = get_model_registry().get_model(*model_config)
+    whisper_segments, info = model.transcribe(load_audio(audio), **options)
+    segments = segments_to_dicts(whisper_segments)
+    return {
+        'segments': segments,
+        'language': info.language,
+        'language_probability': info.language_probability,
+        'duration': info.duration,
+        'wall_time': time.monotonic() - started_wall,
+        'cpu_time': time.process_time() - started_cpu,
+    }
+
+
+# Максимальная длина фрагмента, который Whisper распознает за один проход
+CLIP_MAX_SEC = 30.0
+
+# Батч-пайплайн на процесс (создается поверх модели из реестра)
+_batched_pipelines: Dict[tuple, Any] = {}
+
+
+def merge_speech_clips(timestamps: List[Dict[str, int]], offset: int = 0,
+                       max_sec: float = CLIP_MAX_SEC) -> List[Dict[str, float]]:
+    """Склеить соседние речевые участки VAD во фрагменты не длиннее max_sec"""
+    max_samples = int(max_sec * SAMPLE_RATE)
+    clips = []
+    current = None
+    for ts in timestamps:
+        start, end = ts['start'], ts['end']
+        # Слишком длинный участок режем на куски
+        while end - start > max_samples:
+            if current:
+                clips.append(current)
+                current = None
+            clips.append({'start': start, 'end': start + max_samples})
+            start += max_samples
+        if current and end - current['start'] <= max_samples:
+            current['end'] = end
+        else:
+            if current:
+                clips.append(current)
+            current = {'start': start, 'end': end}
+    if current:
+        clips.append(current)
+    return [
+        {'start': (clip['start'] + offset) / SAMPLE_RATE, 'end': (clip['end'] + offset) / SAMPLE_RATE}
+        for clip in clips
+    ]
+
+
+def _run_batched_jobs(audios: List[AudioInput], options: Dict[str, Any], model_config: tuple,
+                      batch_size: int) -> List[Dict[str, Any]]:
+    """Распознать несколько заданий одним батч-проходом (внутри воркера)"""
+    from faster_whisper import BatchedInferencePipeline, decode_audio
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    started_wall = time.monotonic()
+    started_cpu = time.process_time()
+
+    pipeline = _batched_pipelines.get(model_config)
+    if pipeline is None:
+        pipeline = BatchedInferencePipeline(model=get_model_registry().get_model(*model_config))
+        _batched_pipelines[model_config] = pipeline
+
+    arrays = [decode_audio(a) if isinstance(a, str) else load_audio(a) for a in audios]
+
+    # VAD по каждому заданию отдельно, чтобы фрагмент не пересекал границу двух встреч
+    vad_options = VadOptions(max_speech_duration_s=CLIP_MAX_SEC, **options.get('vad_parameters', {}))
+    clips = []
+    offsets = []
+    position = 0
+    for audio in arrays:
+        offsets.append(position)
+        clips.extend(merge_speech_clips(get_speech_timestamps(audio, vad_options), offset=position))
+        position += len(audio)
+
+    results = [{'segments': []} for _ in arrays]
+    language = options.get('language')
+    language_probability = 1.0
+    if clips:
+        decode_options = {k: v for k, v in options.items() if k not in ('vad_filter', 'vad_parameters')}
+        whisper_segments, info = pipeline.transcribe(
+            np.concatenate(arrays), vad_filter=False, clip_timestamps=clips,
+            batch_size=batch_size, **decode_options
+        )
+        language = info.language
+        language_probability = info.language_probability
+        # Возвращаем каждый сегмент в свое задание и пересчитываем время от начала задания
+        for segment in segments_to_dicts(whisper_segments):
+            sample = int(segment['start'] * SAMPLE_RATE)
+            job = max(i for i, start in enumerate(offsets) if start <= sample)
+            shift = offsets[job] / SAMPLE_RATE
+            segment['start'] -= shift
+            segment['end'] -= shift
+            results[job]['segments'].append(segment)
+
+    total_samples = max(1, position)
+    wall_time = time.monotonic() - started_wall
+    cpu_time = time.process_time() - started_cpu
+    for audio, result in zip(arrays, results):
+        share = len(audio) / total_samples
+        result.update({
+            'language': language,
+            'language_probability': language_probability,
+            'duration': len(audio) / SAMPLE_RATE,
+            'wall_time': wall_time,
+            'cpu_time': cpu_time * share,
+        })
+    return results
+
+
+def _plan_chunks_job(path: str, count: int, overlap_sec: float,
+                     vad_parameters: Dict[str, Any]) -> Tuple[float, List[Dict[str, float]]]:
+    """Найти паузы в записи и разбить ее на куски (внутри воркера)"""
+    from faster_whisper import decode_audio
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    audio = decode_audio(path)
+    total_sec = len(audio) / SAMPLE_RATE
+    speech = [
+        (ts['start'] / SAMPLE_RATE, ts['end'] / SAMPLE_RATE)
+        for ts in get_speech_timestamps(audio, VadOptions(**vad_parameters))
+    ]
+    return total_sec, plan_chunks(speech, total_sec, count, overlap_sec)
+
+
+class TranscriptionService:
+    """Пул воркеров транскрипции с ограниченной очередью заданий"""
+
+    def __init__(self, model_name: str, device: str = "cpu", compute_type: str = "int8",
+                 workers: int = 1, max_queue: int = 8, use_processes: bool = True,
+                 batch_size: int = 0, batch_window_sec: float = 2.0, batch_max_jobs: int = 8):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.use_processes = use_processes
+        # Ядра делятся между воркерами, чтобы CTranslate2 не дрался за CPU
+        cpu_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self.model_config = (model_name, device, compute_type, cpu_threads)
+
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # Одновременно в работе и в очереди - не больше workers + max_queue заданий
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._stats_lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+        # Пакетный режим: задания копятся batch_window_sec и уходят в воркер одним батчем
+        self.batch_size = batch_size
+        self.batch_window_sec = batch_window_sec
+        self.batch_max_jobs = max(1, batch_max_jobs)
+        self.batches = 0
+        self._batch_queue: "queue.Queue[Tuple[AudioInput, Dict[str, Any], Future]]" = queue.Queue()
+        self._batch_thread = None
+
+    def _get_executor(self):
+        """Создать пул при первом обращении"""
+        with self._executor_lock:
+            if self._executor is None:
+                if self.use_processes:
+                    # spawn: форк процесса с потоками Telegram/Selenium небезопасен
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_worker,
+                        initargs=(self.model_config,)
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix='transcribe'
+                    )
+                logger.info(
+                    f"Пул транскрипции запущен: {self.workers} "
+                    f"{'процессов' if self.use_processes else 'потоков'}, "
+                    f"{self.model_config[3]} потоков CTranslate2 на воркер, очередь {self.max_queue}"
+                )
+            return self._executor
+
+    def start(self):
+        """Запустить воркеры и загрузить в них модель заранее"""
+        executor = self._get_executor()
+        if self.use_processes:
+            # Пустые задания заставляют процессы стартовать и выполнить initializer
+            for _ in range(self.workers):
+                executor.submit(time.sleep, 0)
+        else:
+            get_model_registry().preload(*self.model_config)
+
+    def submit(self, audio: AudioInput, options: Optional[Dict[str, Any]] = None,
+               callback: Optional[Callable[[Future], None]] = None,
+               block: bool = False, timeout: Optional[float] = None) -> Future:
+        """Поставить задание в очередь; без block при заполненной очереди - TranscriptionQueueFull"""
+        if not self._slots.acquire(blocking=block, timeout=timeout if block else None):
+            raise TranscriptionQueueFull(
+                f"Очередь транскрипции заполнена ({self.workers + self.max_queue} заданий)"
+            )
+        try:
+            job_options = dict(options or DEFAULT_TRANSCRIBE_OPTIONS)
+            if self.batch_size > 0:
+                future = Future()
+                future.set_running_or_notify_cancel()
+                self._ensure_batch_thread()
+                self._batch_queue.put((audio, job_options, future))
+            else:
+                future = self._get_executor().submit(_run_job, audio, job_options, self.model_config)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._stats_lock:
+            self.pending += 1
+        future.add_done_callback(self._on_done)
+        if callback:
+            future.add_done_callback(callback)
+        return future
+
+    def _on_done(self, future: Future):
+        """Освободить слот очереди и обновить статистику"""
+        self._slots.release()
+        with self._stats_lock:
+            self.pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+                return
+            result = future.result()
+            self.completed += 1
+            self.audio_seconds += result.get('duration') or 0.0
+            self.cpu_seconds += result.get('cpu_time') or 0.0
+
+    def _ensure_batch_thread(self):
+        """Запустить диспетчер батчей при первом задании"""
+        with self._executor_lock:
+            if self._batch_thread is None:
+                self._batch_thread = threading.Thread(
+                    target=self._batch_dispatcher, daemon=True, name='transcribe-batcher'
+                )
+                self._batch_thread.start()
+
+    def _batch_dispatcher(self):
+        """Собирать задания в батчи и отправлять их в пул"""
+        while True:
+            jobs = [self._batch_queue.get()]
+            if jobs[0] is None:
+                self._fail_queued_jobs()
+                return
+            deadline = time.monotonic() + self.batch_window_sec
+            while len(jobs) < self.batch_max_jobs:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self._batch_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if job is None:
+                    self._batch_queue.put(None)
+                    break
+                jobs.append(job)
+
+            # Задания с разными параметрами нельзя распознавать одним проходом
+            groups: Dict[str, list] = {}
+            for job in jobs:
+                groups.setdefault(repr(sorted(job[1].items())), []).append(job)
+            for group in groups.values():
+                self._dispatch_batch(group)
+
+    def _fail_queued_jobs(self):
+        """Сервис остановлен: задания, оставшиеся в очереди батчей, больше никто не выполнит"""
+        while True:
+            try:
+                job = self._batch_queue.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None and not job[2].done():
+                job[2].set_exception(CancelledError("Сервис транскрипции остановлен"))
+
+    def _dispatch_batch(self, jobs: list):
+        """Отправить батч в воркер и разложить результаты по заданиям"""
+        futures = [job[2] for job in jobs]
+        try:
+            batch_future = self._get_executor().submit(
+                _run_batched_jobs, [job[0] for job in jobs], jobs[0][1],
+                self.model_config, self.batch_size
+            )
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        logger.info(f"Батч транскрипции: заданий {len(jobs)}, batch_size {self.batch_size}")
+
+        def route(done: Future):
+            # Батч отменен (shutdown с cancel_futures): задания уже RUNNING, cancel() на них не действует
+            if done.cancelled():
+                for future in futures:
+                    future.set_exception(CancelledError("Батч транскрипции отменен"))
+                return
+            error = done.exception()
+            for index, future in enumerate(futures):
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(done.result()[index])
+
+        batch_future.add_done_callback(route)
+
+    async def submit_async(self, audio: AudioInput, options: Optional[Dict[str, Any]] = None,
+                           callback: Optional[Callable[[Future], None]] = None) -> Dict[str, Any]:
+        """Асинхронно дождаться результата, не блокируя event loop"""
+        return await asyncio.wrap_future(self.submit(audio, options, callback))
+
+    def transcribe(self, audio: AudioInput, options: Optional[Dict[str, Any]] = None,
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Синхронно выполнить задание (для фоновых потоков): ждет свободного места в очереди"""
+        return self.submit(audio, options, block=True).result(timeout=timeout)
+
+    def transcribe_parallel(self, path: str, chunks: Optional[int] = None, overlap_sec: float = 1.0,
+                            options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Распознать длинную запись кусками параллельно на всех воркерах (блокирующий вызов)"""
+        options = dict(options or DEFAULT_TRANSCRIBE_OPTIONS)
+        count = chunks or self.workers
+        started = time.monotonic()
+
+        total_sec, plan = self._get_executor().submit(
+            _plan_chunks_job, path, count, overlap_sec, options.get('vad_parameters', {})
+        ).result()
+        logger.info(
+            f"Параллельная транскрипция: {total_sec:.0f} с, кусков {len(plan)}, "
+            f"перекрытие {overlap_sec:.1f} с"
+        )
+
+        futures = [
+            self.submit(AudioRange(path, chunk['start'], chunk['end']), options, block=True)
+            for chunk in plan
+        ]
+        results = [future.result() for future in futures]
+        segments = stitch_chunk_segments(
+            [(chunk, result['segments']) for chunk, result in zip(plan, results)]
+        )
+        logger.info(
+            f"Параллельная транскрипция завершена за {time.monotonic() - started:.1f} с, "
+            f"сегментов: {len(segments)}"
+        )
+        first = results[0] if results else {}
+        return {
+            'segments': segments,
+            'language': first.get('language', options.get('language')),
+            'language_probability': first.get('language_probability', 1.0),
+            'duration': total_sec,
+        }
+
+    def queue_length(self) -> int:
+        """Количество заданий в работе и в очереди"""
+        return self.pending
+
+    def describe(self) -> str:
+        """Краткое описание состояния пула для статуса"""
+        line = (
+            f"🧵 Транскрипция: воркеров {self.workers}, в очереди {self.pending}, "
+            f"готово {self.completed}, ошибок {self.failed}"
+        )
+        if self.batch_size > 0:
+            line += f", батчей {self.batches}"
+        if self.cpu_seconds > 0:
+            line += f", {self.audio_seconds / self.cpu_seconds:.2f} с аудио/с CPU"
+        if not self.use_processes:
+            line += f"\n{get_model_registry().describe()}"
+        return line
+
+    def shutdown(self, wait: bool = False):
+        """Остановить пул"""
+        if self._batch_thread is not None:
+            self._batch_queue.put(None)
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+                logger.info("Пул транскрипции остановлен")